@@ -1,20 +1,44 @@
 // src\lib\api\narratives_api.ts
 
 import { get } from 'svelte/store';
-import { narrativesStore, narrativesPublisherOptionsStore, selectedNarrativesFiltersStore, serverUrl } from '$lib/stores/narratives-stores';
-import type { NarrativesFilterOptions, PublisherOption } from '$lib/types/narratives-types';
+import { narrativesStore, narrativesAggregatesStore, narrativesPublisherOptionsStore, narrativesUpdateJobStore, selectedNarrativesFiltersStore, serverUrl } from '$lib/stores/narratives-stores';
+import type { NarrativesFilterOptions, NarrativesJob, PublisherOption } from '$lib/types/narratives-types';
 
 
 // const SERVER_URL = get(serverUrl);
 
-async function fetchData(url: string, options = {}): Promise<any> {
+// Responses that came with an ETag, keyed by URL and request body. The tag is sent back
+// as If-None-Match and a 304 reuses the stored data without downloading it again.
+const MAX_TAGGED_RESPONSES = 50;
+const taggedResponses = new Map<string, { etag: string; data: any }>();
+
+async function fetchData(url: string, options: RequestInit = {}): Promise<any> {
     const fullUrl = `${get(serverUrl)}${url}`; // Prepend the server URL to the endpoint path
+    const cacheKey = `${options.method ?? 'GET'} ${fullUrl} ${options.body ?? ''}`;
+    const tagged = taggedResponses.get(cacheKey);
+    const headers = new Headers(options.headers);
+    if (tagged) {
+        headers.set('If-None-Match', tagged.etag);
+    }
     try {
-        const response = await fetch(fullUrl, options);
+        const response = await fetch(fullUrl, { ...options, headers });
+        if (response.status === 304 && tagged) {
+            return tagged.data;
+        }
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        return await response.json();
+        const data = await response.json();
+        const etag = response.headers.get('ETag');
+        taggedResponses.delete(cacheKey);
+        if (etag) {
+            taggedResponses.set(cacheKey, { etag, data });
+            if (taggedResponses.size > MAX_TAGGED_RESPONSES) {
+                // Maps iterate in insertion order, so the first key is the least recently stored
+                taggedResponses.delete(taggedResponses.keys().next().value);
+            }
+        }
+        return data;
     } catch (error) {
         console.error('Fetch error:', error);
         throw error;
@@ -36,6 +60,42 @@ export async function fetchNarrativesData(filters: NarrativesFilterOptions = {})
     }
 }
 
+// Grouped counts, durations and sentiment computed by the server for the charts
+export async function fetchNarrativesAggregates(filters: NarrativesFilterOptions = {}): Promise<void> {
+    const options = {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filters }),
+    };
+    try {
+        const aggregates = await fetchData('/narratives-aggregates', options);
+        narrativesAggregatesStore.set(aggregates);
+    } catch (error) {
+        console.error('Error fetching narratives aggregates:', error);
+        narrativesAggregatesStore.set(null);
+    }
+}
+
+// The list view leaves transcripts out, so the full text is loaded on demand per item
+export async function fetchContentTranscript(contentId: string): Promise<string> {
+    const data = await fetchData(`/content/${encodeURIComponent(contentId)}/transcript`, { method: 'GET' });
+    return data.transcript;
+}
+
+const JOB_POLL_INTERVAL_MS = 2000;
+
+// Poll a background job until it finishes, publishing each report to narrativesUpdateJobStore
+async function waitForJob(jobId: string): Promise<NarrativesJob> {
+    while (true) {
+        const job: NarrativesJob = await fetchData(`/jobs/${jobId}?items=false`, { method: 'GET' });
+        narrativesUpdateJobStore.set(job);
+        if (job.status === 'completed' || job.status === 'failed') {
+            return job;
+        }
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
+
 export async function updateNarrativesDatabase(): Promise<void> {
     const options = {
         method: 'POST',
@@ -44,8 +104,10 @@ export async function updateNarrativesDatabase(): Promise<void> {
         // body: JSON.stringify({ someData: "example data" }),
     };
     try {
-        const updatedData = await fetchData('/update-narratives-database', options);
-        console.log('Database updated:', updatedData);
+        // The server answers straight away with a job ID and runs the update in the background
+        const { job_id } = await fetchData('/update-narratives-database', options);
+        const job = await waitForJob(job_id);
+        console.log(`Database updated: ${job.done} done, ${job.failed} failed`, job.errors);
         // Update the publisher options first
         await fetchNarrativesPublisherOptions();
 
@@ -58,6 +120,8 @@ export async function updateNarrativesDatabase(): Promise<void> {
         console.error('Error updating the database:', error);
         // Optionally set the store to an error state or keep the old data
         // narrativesDbStore.set([]); // Clear the store or set an error state as needed
+    } finally {
+        narrativesUpdateJobStore.set(null);
     }
 }
 
@@ -105,6 +169,23 @@ export async function addContentId(contentId: string): Promise<void> {
     }
 }
 
+// Function to add many content IDs at once; returns how many were added and skipped
+export async function addContentIds(contentIds: string[]): Promise<{ added: number; skipped: number }> {
+    const options = {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ content_ids: contentIds }),
+    };
+    try {
+        const result = await fetchData('/add-content-ids', options);
+        console.log(`${result.added} content IDs added, ${result.skipped} skipped`);
+        return { added: result.added, skipped: result.skipped };
+    } catch (error) {
+        console.error('Failed to add content IDs:', error);
+        throw error;
+    }
+}
+
 export async function updateContentIdTopic(contentId: string, newTopic: string): Promise<void> {
     const options = {
       method: 'POST',
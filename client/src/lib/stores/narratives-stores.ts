@@ -1,12 +1,13 @@
 // src\lib\stores\narratives-stores.ts
 
 import { writable, derived } from 'svelte/store';
-import type { NarrativesDB, PublisherOption } from '$lib/types/narratives-types'
+import type { NarrativesAggregates, NarrativesDB, NarrativesJob, PublisherOption } from '$lib/types/narratives-types'
 import { groupNarrativesByDatePublishedAndPublisher } from '$lib/utils/narratives-utils';
 import { createPersistentStore, createSessionStore } from '$lib/utils/utils';
 
 export const narrativesStore = writable<NarrativesDB[]>([]);
 export const narrativesPostStore = writable<NarrativesDB[]>([]);
+export const narrativesAggregatesStore = writable<NarrativesAggregates | null>(null);
 
 export const narrativesPublisherOptionsStore = writable<PublisherOption[]>([]);
 
@@ -35,5 +36,7 @@ export const isNarrativesDatabaseWindowOpen = writable(false);
 export const isNarrativesDatabaseAddWindowOpen = writable(false);
 export const isShareNarrativesPostWindowOpen = writable(false);
 export const isUpdatingDatabase = writable(false);
+// Progress of the running /update-narratives-database job, see /jobs/<id>
+export const narrativesUpdateJobStore = writable<NarrativesJob | null>(null);
 
 export const serverUrl = createSessionStore('serverUrl', 'http://localhost:5000');
\ No newline at end of file
@@ -9,8 +9,9 @@ export interface NarrativesDB {
     date_added: string,
     duration: number,
     platform: string,
-    transcript: string,
+    transcript?: string, // Not part of the default projection, see fetchContentTranscript
     summary: string,
+    summary_preview?: string,
     sentiment_analysis: number,
     macro_topic: string,
     publisher_political_orientation: string,
@@ -29,6 +30,44 @@ export interface NarrativesFilterOptions {
     datePublishedRange?: { start: string; end: string };
 }
 
+// One group of a /narratives-aggregates breakdown
+export interface NarrativesAggregateGroup {
+    value: string;
+    count: number;
+    total_duration: number;
+    avg_duration: number | null;
+    avg_sentiment: number | null;
+}
+
+export interface NarrativesAggregates {
+    total: NarrativesAggregateGroup;
+    publisher: NarrativesAggregateGroup[];
+    country: NarrativesAggregateGroup[];
+    macro_topic: NarrativesAggregateGroup[];
+    platform: NarrativesAggregateGroup[];
+    publisher_political_orientation: NarrativesAggregateGroup[];
+    date_added_month: NarrativesAggregateGroup[];
+    date_published_month: NarrativesAggregateGroup[];
+}
+
+// Progress report of a background job from /jobs/<id>
+export interface NarrativesJob {
+    id: string;
+    kind: string;
+    status: 'queued' | 'running' | 'completed' | 'failed';
+    error: string | null;
+    total: number;
+    pending: number;
+    running: number;
+    done: number;
+    failed: number;
+    throughput: number | null;
+    eta_seconds: number | null;
+    concurrency: number;
+    running_by_host: Record<string, number>;
+    errors: { item: string; error: string }[];
+}
+
 export interface PublisherOption {
     publishers?: string;
     publishers_political_orientation?: string;
@@ -1,6 +1,11 @@
 // src\lib\utils\narratives-utils.ts
 
-import type { NarrativesDB } from '$lib/types/narratives-types';
+import { derived, type Readable } from 'svelte/store';
+import type {
+    NarrativesDB,
+    NarrativesAggregates,
+    NarrativesAggregateGroup
+} from '$lib/types/narratives-types';
 
 export function groupNarrativesByDatePublishedAndPublisher(narratives: NarrativesDB[]): Record<string, any> {
     // First, group by date_published
@@ -46,3 +51,60 @@ export function groupNarrativesByDatePublishedAndPublisher(narratives: Narrative
 
     return groupedByDatePublishedAndPublisher;
 }
+
+// Same shape as the /narratives-aggregates response, computed from rows already on the client
+// (e.g. the narratives of a post), so the charts can draw either.
+export function aggregateNarratives(narratives: NarrativesDB[]): NarrativesAggregates {
+    const groupBy = (key: (narrative: NarrativesDB) => string | null | undefined) => {
+        const groups = new Map<string, NarrativesDB[]>();
+        for (const narrative of narratives) {
+            const value = key(narrative) || 'Unknown';
+            if (!groups.has(value)) {
+                groups.set(value, []);
+            }
+            groups.get(value).push(narrative);
+        }
+        return Array.from(groups, ([value, rows]) => summariseGroup(value, rows));
+    };
+    const bySize = (groups: NarrativesAggregateGroup[]) =>
+        groups.sort((a, b) => b.count - a.count || a.value.localeCompare(b.value));
+    const byValue = (groups: NarrativesAggregateGroup[]) =>
+        groups.sort((a, b) => a.value.localeCompare(b.value));
+
+    return {
+        total: summariseGroup('all', narratives),
+        publisher: bySize(groupBy((d) => d.publisher)),
+        country: bySize(groupBy((d) => d.country)),
+        macro_topic: bySize(groupBy((d) => d.macro_topic)),
+        platform: bySize(groupBy((d) => d.platform)),
+        publisher_political_orientation: bySize(groupBy((d) => d.publisher_political_orientation)),
+        date_added_month: byValue(groupBy((d) => d.date_added?.slice(0, 7))),
+        date_published_month: byValue(groupBy((d) => d.date_published?.slice(0, 7)))
+    };
+}
+
+function summariseGroup(value: string, rows: NarrativesDB[]): NarrativesAggregateGroup {
+    // Blank or missing values are left out of the averages, as on the server
+    const numbers = (values: unknown[]) =>
+        values.filter((v) => v != null && `${v}` !== '').map(Number).filter((v) => !Number.isNaN(v));
+    const durations = numbers(rows.map((d) => d.duration));
+    const sentiments = numbers(rows.map((d) => d.sentiment_analysis));
+    const totalDuration = durations.reduce((sum, d) => sum + d, 0);
+    const totalSentiment = sentiments.reduce((sum, d) => sum + d, 0);
+    return {
+        value,
+        count: rows.length,
+        total_duration: totalDuration,
+        avg_duration: durations.length ? totalDuration / durations.length : null,
+        avg_sentiment: sentiments.length ? totalSentiment / sentiments.length : null
+    };
+}
+
+// The aggregates a chart draws: the server's when the page passes an aggregatesStore,
+// otherwise computed from the rows of its dataStore.
+export function chartAggregates(
+    dataStore: Readable<NarrativesDB[]>,
+    aggregatesStore?: Readable<NarrativesAggregates | null>
+): Readable<NarrativesAggregates | null> {
+    return aggregatesStore ?? derived(dataStore, ($rows) => ($rows ? aggregateNarratives($rows) : null));
+}
@@ -7,26 +7,51 @@ import json
 import os
 import sys
 import logging
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from db.db_manager import DBManager
+from db.result_cache import make_cache_key, normalise_filters
+from response_compression import compress_body, init_compression, negotiate_encoding, should_compress
+from job_queue import JobQueue
+from scraper.utils.host_limits import HostLimits
+from scraper.utils.page_cache import configure_page_cache
+from processor.response_cache import configure_response_cache
 from processor.openai_chatbot import OpenAIChatbot
 
 # Flask app definition
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag'])  # Let the client read ETags for If-None-Match
+init_compression(app)  # gzip/brotli for JSON responses, negotiated by Accept-Encoding
 
 ENVIRONMENT = 'development'  # 'development' or 'production'
 
+MAX_BULK_CONTENT_IDS = 10000  # Upper bound for one /add-content-ids request
+SCRAPE_CONCURRENCY = 8  # Content IDs scraped and processed at once; HostLimits caps each site
+PAGE_CACHE_PATH = 'page_cache.db'
+PAGE_CACHE_TTL = 7 * 24 * 3600  # Seconds before a cached page is revalidated
+PAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PAGE_CACHE_ONLY = False  # True to reprocess from cached pages without any network access
+RESPONSE_CACHE_PATH = 'response_cache.db'
+RESPONSE_CACHE_TTL = 30 * 24 * 3600  # Seconds an OpenAI completion is reused for
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
 # Call the setup_logging function at the beginning
 setup_logging(ENVIRONMENT)
 
+# A single DBManager is shared by all server threads; it hands out pooled connections.
 db_manager = DBManager('narratives.db')
-db_manager.connect()
 db_manager.create_library_table()
 db_manager.create_publisher_options_table()
 db_manager.create_api_keys_table()
-db_manager.close()
+
+# Scraped pages and transcripts are kept on disk, so re-scraping doesn't download them again.
+page_cache = configure_page_cache(PAGE_CACHE_PATH, PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES, PAGE_CACHE_ONLY)
+
+# OpenAI completions are kept on disk too, so re-summarising doesn't pay for the same prompts twice.
+response_cache = configure_response_cache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES)
+
+# Long-running work such as the database update sweep runs here, outside the request.
+job_queue = JobQueue()
 
 # Initialize the Chatbot Handler globally but don't create the assistant yet.
 chatbot_handler = OpenAIChatbot(db_path='narratives.db')
@@ -35,9 +60,7 @@ chatbot_handler = OpenAIChatbot(db_path='narratives.db')
 @app.route('/fetch-api-keys', methods=['GET'])
 def fetch_api_keys():
     try:
-        db_manager.connect()
         api_keys = db_manager.fetch_api_keys()
-        db_manager.close()
         return jsonify(api_keys), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -49,9 +72,7 @@ def update_api_key():
         data = request.json
         api = data.get('api')
         key = data.get('key')
-        db_manager.connect()
         db_manager.update_api_key(api, key)
-        db_manager.close()
         return jsonify({"message": "API key updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -59,38 +80,203 @@ def update_api_key():
 
 @app.route('/update-narratives-database', methods=['POST'])
 def update_narratives_database():
+    """
+    Start scraping and processing every content ID with a pipeline stage due to run
+    (see DBManager.fetch_unprocessed_content_ids) as a background job and return its
+    ID; follow it with /jobs/<id>. A request made while an update is running joins
+    that job instead of starting another. Up to SCRAPE_CONCURRENCY content IDs are
+    handled at once, within per-site limits.
+    """
     try:
-        db_manager.connect()
-
-        # Fetch all content IDs with empty transcripts
+        # Fetch the content IDs with a stage pending or due for a retry
         unprocessed_content_ids = db_manager.fetch_unprocessed_content_ids()
+        job, coalesced = job_queue.submit(
+            'update-narratives-database', unprocessed_content_ids, db_manager.update_content_id,
+            concurrency=SCRAPE_CONCURRENCY, limits=HostLimits())
+
+        message = "Joined the running database update" if coalesced else "Database update started"
+        response = jsonify({"message": message, "job_id": job.id, "coalesced": coalesced,
+                            "total": len(job.items)})
+        response.headers['Location'] = f"/jobs/{job.id}"
+        return response, 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        for content_id in unprocessed_content_ids:
-            db_manager.scrape_content_id(content_id)
-            db_manager.process_content_id(content_id)
 
-        db_manager.close()
+@app.route('/pipeline-state', methods=['GET'])
+def fetch_pipeline_state():
+    """Counts of content IDs per stage and status, and the poisoned stages sweeps skip."""
+    try:
+        return jsonify(db_manager.fetch_pipeline_summary()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify({"message": "Database updated successfully"}), 200
+
+@app.route('/retry-content-ids', methods=['POST'])
+def retry_content_ids():
+    """Reset the failed and poisoned stages of {"content_ids": [...]} so the next update retries them."""
+    try:
+        content_ids = (request.get_json(silent=True) or {}).get('content_ids')
+        if not isinstance(content_ids, list) or not content_ids:
+            return jsonify({"error": "Expected a list of content IDs"}), 400
+        if len(content_ids) > MAX_BULK_CONTENT_IDS:
+            return jsonify({"error": f"At most {MAX_BULK_CONTENT_IDS} content IDs per request"}), 400
+
+        reset = db_manager.reset_pipeline_state(content_ids)
+        return jsonify({"message": "Content IDs will be retried by the next update", "reset": reset}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def fetch_job(job_id):
+    """Progress of a background job: per-item status, throughput, ETA and errors."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict(include_items=request.args.get('items', 'true') != 'false')), 200
+
+
+def ndjson_chunks(batches):
+    """Serialise batches of rows into NDJSON chunks, one chunk per batch."""
+    try:
+        for batch in batches:
+            yield ''.join(json.dumps(row) + '\n' for row in batch)
+    except Exception as e:
+        app.logger.error(f"Error streaming narratives data: {str(e)}")
+    finally:
+        batches.close()
+
+
+def json_body(data):
+    """Serialise data as jsonify does, for the result cache. Empty results give None and are not cached."""
+    return jsonify(data).get_data() if data else None
+
+
+def cached_json_response(key, produce):
+    """
+    Respond with the JSON body for a result cache key, tagged with an ETag. When the
+    request's If-None-Match has the current tag, answer 304 without querying or
+    serialising anything. The body is compressed in the negotiated encoding and the
+    compressed bytes are cached next to the plain ones. Returns None if ``produce``
+    gives no body.
+    """
+    # Taken before the body is built: a write in between gives a new body an old tag,
+    # which only costs the client one extra download, never a stale 304.
+    generation = db_manager.current_generation()
+    encoding = negotiate_encoding()
+    # Each encoding is a different representation, so it gets its own strong tag
+    etag = db_manager.result_etag(make_cache_key(key, encoding), generation)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, mimetype='application/json')
+    else:
+        body = db_manager.cached_result(key, produce, generation)
+        if body is None:
+            return None
+        response = Response(body, mimetype='application/json')
+        if should_compress(body, encoding):
+            response.set_data(db_manager.cached_result(
+                make_cache_key(key, encoding), lambda: compress_body(body, encoding), generation))
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    # Clients may keep the response but must revalidate it before every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 @app.route('/fetch-narratives-data', methods=['POST'])
 def fetch_narratives():
     filters = request.json.get('filters', {})
-    data = db_manager.fetch_filtered_data(filters)
-    if data:
-        return jsonify(data)
+    # Projection: the default leaves out the transcript, see /content/<content_id>/transcript
+    fields = request.json.get('fields')
+
+    try:
+        # Keyset pagination: when a limit is given, return one page plus the cursor of the next
+        if 'limit' in request.json:
+            limit = request.json.get('limit')
+            cursor = request.json.get('cursor')
+            sort = request.json.get('sort', '-date_added')
+
+            def fetch_page():
+                data, next_cursor = db_manager.fetch_filtered_page(
+                    filters, limit, cursor=cursor, sort=sort, fields=fields)
+                return json_body({"data": data, "next_cursor": next_cursor})
+
+            key = make_cache_key('fetch-narratives-data', normalise_filters(filters), fields, limit, cursor, sort)
+            return cached_json_response(key, fetch_page)
+
+        # Streaming: one JSON object per line, written batch by batch as the cursor is read
+        if request.json.get('stream') or request.accept_mimetypes.best == 'application/x-ndjson':
+            batches = db_manager.iter_filtered_data(filters, fields)
+            return Response(stream_with_context(ndjson_chunks(batches)), mimetype='application/x-ndjson')
+
+        key = make_cache_key('fetch-narratives-data', normalise_filters(filters), fields)
+        response = cached_json_response(key, lambda: json_body(db_manager.fetch_filtered_data(filters, fields)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if response:
+        return response
     else:
         return jsonify({"error": "Data not found"}), 404
 
 
+@app.route('/search-narratives', methods=['POST'])
+def search_narratives():
+    """Full-text search ranked by relevance, combined with the same filters as /fetch-narratives-data."""
+    try:
+        results = db_manager.search_library(
+            request.json.get('query', ''),
+            filters=request.json.get('filters', {}),
+            limit=request.json.get('limit', 50),
+            offset=request.json.get('offset', 0),
+            fields=request.json.get('fields'))
+        return jsonify(results), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/narratives-aggregates', methods=['POST'])
+def narratives_aggregates():
+    """
+    Grouped counts, durations and sentiment for the dashboard charts, with the same
+    filters as /fetch-narratives-data.
+    """
+    try:
+        filters = (request.get_json(silent=True) or {}).get('filters', {})
+        key = make_cache_key('narratives-aggregates', normalise_filters(filters))
+        return cached_json_response(key, lambda: json_body(db_manager.fetch_aggregates(filters)))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss statistics of the result cache, the scrapers' page cache and the OpenAI response cache."""
+    return jsonify({**db_manager.result_cache.stats(), "write_generation": db_manager.current_generation(),
+                    "page_cache": page_cache.stats(), "response_cache": response_cache.stats()}), 200
+
+
+@app.route('/content/<path:content_id>/transcript', methods=['GET'], merge_slashes=False)
+def fetch_content_transcript(content_id):
+    """Load the full transcript of one item. content_id must be URL-encoded by the client."""
+    try:
+        transcript = db_manager.fetch_transcript(content_id)
+        if transcript is None:
+            return jsonify({"error": "Content ID not found"}), 404
+        return jsonify({"content_id": content_id, "transcript": transcript}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/fetch-publisher-options', methods=['GET'])
 def fetch_publisher_options():
-    publisher_options = db_manager.fetch_publisher_options()
-    if publisher_options:
-        return jsonify(publisher_options), 200
+    key = make_cache_key('fetch-publisher-options')
+    response = cached_json_response(key, lambda: json_body(db_manager.fetch_publisher_options()))
+    if response:
+        return response
     else:
         return jsonify({"error": "No publisher options found"}), 404
 
@@ -99,15 +285,10 @@ def fetch_publisher_options():
 def edit_publisher_options():
     try:
         updates = request.json.get('publisherOptions', [])
-        db_manager.connect()
-        for update in updates:
-            publisher = update.get('publisher')
-            publisher_political_orientation = update.get('publisher_political_orientation')
-            country = update.get('country')
-            db_manager.edit_publisher_option(publisher, publisher_political_orientation, country)
-        db_manager.close()
+        # One transaction for the whole batch
+        updated = db_manager.edit_publisher_options(updates)
 
-        return jsonify({"message": "Publisher options updated successfully"}), 200
+        return jsonify({"message": "Publisher options updated successfully", "updated": updated}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -117,9 +298,7 @@ def add_content_id():
     try:
         content_id = request.json.get('content_id')
 
-        db_manager.connect()
         added = db_manager.add_content_id(content_id)
-        db_manager.close()
 
         if added:
             return jsonify({"message": "Content ID added successfully"}), 200
@@ -130,6 +309,31 @@ def add_content_id():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/add-content-ids', methods=['POST'])
+def add_content_ids():
+    """
+    Bulk version of /add-content-id. Accepts a JSON body {"content_ids": [...]} or
+    an uploaded text file (form field 'file') with one URL per line.
+    """
+    try:
+        if 'file' in request.files:
+            text = request.files['file'].read().decode('utf-8-sig')
+            content_ids = [line.strip() for line in text.splitlines()
+                           if line.strip() and not line.lstrip().startswith('#')]
+        else:
+            content_ids = (request.get_json(silent=True) or {}).get('content_ids')
+
+        if not isinstance(content_ids, list):
+            return jsonify({"error": "Expected a list of content IDs or an uploaded file"}), 400
+        if len(content_ids) > MAX_BULK_CONTENT_IDS:
+            return jsonify({"error": f"At most {MAX_BULK_CONTENT_IDS} content IDs per request"}), 400
+
+        counts = db_manager.add_content_ids(content_ids)
+        return jsonify({"message": "Content IDs added successfully", **counts}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/update-content-id-topic', methods=['POST'])
 def update_content_id_topic():
     try:
@@ -137,9 +341,7 @@ def update_content_id_topic():
         content_id = data.get('content_id')
         new_topic = data.get('topic')
 
-        db_manager.connect()
         db_manager.update_content_id_topic(content_id, new_topic)
-        db_manager.close()
 
         return jsonify({"message": "Article topic updated successfully"}), 200
     except Exception as e:
@@ -0,0 +1,87 @@
+"""
+Benchmark the OpenAI calls and tokens it takes to summarise a transcript with the
+old chunker, which cut the text every 1000 characters, against the token-aware
+chunker that fills half the model context per chunk on sentence boundaries.
+No requests are made: each map call is assumed to return a summary of
+initial_max_tokens tokens, which the reduce call then reads. Tokens are counted
+with tiktoken when it is installed and estimated otherwise.
+
+Run from the server directory:
+    python -m benchmarks.bench_chunking
+"""
+
+# benchmarks/bench_chunking.py
+
+import random
+from processor.openai_summarisation import (CHUNK_CONTEXT_FRACTION, DEFAULT_CONTEXT_TOKENS,
+                                            MODEL_CONTEXT_TOKENS, SUMMARY_MODEL)
+from processor.token_chunker import chunk_by_tokens, estimate_tokens, get_token_counter
+
+WORDS_PER_MINUTE = 150
+MAP_PROMPT = "You are a highly knowledgeable assistant. Summarize the following text: "
+REDUCE_PROMPT_TOKENS = 90  # The reduce instructions
+MESSAGE_OVERHEAD_TOKENS = 11  # Role and framing tokens of a two-message request
+MAP_SUMMARY_TOKENS = 300  # initial_max_tokens
+VOCABULARY = ("the market inflation rates central bank said prices rose fell investors economy growth "
+              "policy quarter year percent analysts expect government housing energy jobs report").split()
+
+
+def old_chunk_text(text, max_chunk_size=1000):
+    """The chunker this benchmark compares against, as it was."""
+    words = text.split()
+    chunks = []
+    current_chunk = []
+    current_length = 0
+    for word in words:
+        if current_length + len(word) > max_chunk_size:
+            chunks.append(' '.join(current_chunk))
+            current_chunk = [word]
+            current_length = len(word)
+        else:
+            current_chunk.append(word)
+            current_length += len(word) + 1
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+    return chunks
+
+
+def make_transcript(minutes, seed=0):
+    """Sentences of 6 to 24 words, in paragraphs of about five sentences."""
+    rng = random.Random(seed)
+    sentences, words = [], 0
+    while words < minutes * WORDS_PER_MINUTE:
+        length = rng.randint(6, 24)
+        sentences.append(' '.join(rng.choice(VOCABULARY) for _ in range(length)).capitalize() + '.')
+        words += length
+    return '\n\n'.join(' '.join(sentences[i:i + 5]) for i in range(0, len(sentences), 5))
+
+
+def cost(chunks, count_tokens):
+    """(calls, input tokens, output tokens) to map the chunks and reduce their summaries."""
+    prompt = count_tokens(MAP_PROMPT) + MESSAGE_OVERHEAD_TOKENS
+    map_input = sum(count_tokens(chunk) + prompt for chunk in chunks)
+    reduce_input = len(chunks) * MAP_SUMMARY_TOKENS + REDUCE_PROMPT_TOKENS + MESSAGE_OVERHEAD_TOKENS
+    return len(chunks) + 1, map_input + reduce_input, len(chunks) * MAP_SUMMARY_TOKENS
+
+
+def main():
+    count_tokens = get_token_counter(SUMMARY_MODEL)
+    max_tokens = int(MODEL_CONTEXT_TOKENS.get(SUMMARY_MODEL, DEFAULT_CONTEXT_TOKENS) * CHUNK_CONTEXT_FRACTION)
+    print(f"{SUMMARY_MODEL}, {max_tokens} tokens per chunk, token counts "
+          f"{'estimated' if count_tokens is estimate_tokens else 'from tiktoken'}")
+    print(f"{'':>15} | {'1000 characters':^21} | {'token-aware':^21} |")
+    print(f"{'minutes':>7} {'tokens':>7} | {'calls':>5} {'input':>7} {'output':>7} | "
+          f"{'calls':>5} {'input':>7} {'output':>7} | {'mid-sentence cuts':>17}")
+    for minutes in (5, 15, 30, 60, 120):
+        transcript = make_transcript(minutes)
+        old_chunks = old_chunk_text(transcript)
+        new_chunks = chunk_by_tokens(transcript, max_tokens, count_tokens)
+        cuts = sum(not chunk.endswith('.') for chunk in old_chunks[:-1]), \
+            sum(not chunk.endswith('.') for chunk in new_chunks[:-1])
+        print(f"{minutes:>7} {count_tokens(transcript):>7} | "
+              f"{'%5d %7d %7d' % cost(old_chunks, count_tokens)} | "
+              f"{'%5d %7d %7d' % cost(new_chunks, count_tokens)} | {cuts[0]:>8} -> {cuts[1]}")
+
+
+if __name__ == '__main__':
+    main()
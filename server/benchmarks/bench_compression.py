@@ -0,0 +1,73 @@
+"""
+Benchmark negotiated compression of the /fetch-narratives-data payload.
+
+Serves the full default projection of a synthetic library through a Flask app with
+response compression, once per encoding, and reports bytes on the wire, the
+server time to compress, the client time to decode, and the resulting latency on
+slow and fast links. Cached responses reuse their compressed bytes, so for them
+only the transfer and decode time remain.
+
+Run from the server directory:
+    python -m benchmarks.bench_compression [rows]
+"""
+
+# benchmarks/bench_compression.py
+
+import gzip
+import sys
+import time
+from flask import Flask, jsonify
+from benchmarks.synthetic_library import build_library, discard_library
+from response_compression import ENCODINGS, init_compression
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+LINKS = {'10 Mbit/s': 10e6 / 8, '100 Mbit/s': 100e6 / 8}
+DECODERS = {None: lambda body: body, 'gzip': gzip.decompress, 'br': lambda body: brotli.decompress(body)}
+
+
+def timed(function, repeat=3):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(rows=20_000):
+    db_manager = build_library(rows, transcript_words=50)
+    data = db_manager.fetch_filtered_data({})
+
+    app = Flask(__name__)
+    init_compression(app)
+    app.add_url_rule('/fetch-narratives-data', 'fetch', lambda: jsonify(data))
+    client = app.test_client()
+
+    print(f"{rows} rows, default projection")
+    print(f"{'encoding':10} {'bytes':>12} {'server':>10} {'decode':>9}" +
+          ''.join(f" {name + ' total':>18} {'(cached)':>9}" for name in LINKS))
+    baseline = None
+    for encoding in (None, *ENCODINGS):
+        headers = {'Accept-Encoding': encoding} if encoding else {}
+        server_time, response = timed(lambda: client.get('/fetch-narratives-data', headers=headers))
+        assert response.headers.get('Content-Encoding') == encoding
+        size = len(response.data)
+        decode_time, _ = timed(lambda: DECODERS[encoding](response.data))
+        baseline = baseline or server_time
+        compress_time = server_time - baseline
+        line = f"{encoding or 'identity':10} {size:12,d} {server_time * 1000:8.1f}ms {decode_time * 1000:7.1f}ms"
+        for bandwidth in LINKS.values():
+            wire = size / bandwidth
+            line += f" {(server_time + wire + decode_time) * 1000:16.0f}ms"
+            line += f" {(server_time - compress_time + wire + decode_time) * 1000:7.0f}ms"
+        print(line)
+
+    discard_library(db_manager)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,67 @@
+"""
+Benchmark the /update-narratives-database job over a backlog of 500 content IDs
+spread over bbc.co.uk, cnbc.com and youtube.com. Scraping is simulated by a fixed
+network latency per item followed by the real database write, so the numbers show
+how throughput scales with the job's concurrency under the per-host limits, and
+the peak number of items in flight per host shows where the caps take over.
+
+Run from the server directory:
+    python -m benchmarks.bench_concurrent_scraping [items] [latency_ms]
+"""
+
+# benchmarks/bench_concurrent_scraping.py
+
+import sys
+import threading
+import time
+from collections import Counter
+from benchmarks.synthetic_library import build_library, discard_library
+from job_queue import JobQueue
+from scraper.utils.host_limits import HostLimits
+
+HOSTS = ['https://www.bbc.co.uk/news/', 'https://www.cnbc.com/2024/', 'https://www.youtube.com/watch?v=']
+CONCURRENCY_LEVELS = (1, 4, 8, 16)
+
+
+def main(items=500, latency_ms=20):
+    db_manager = build_library(items, transcript_words=50)
+    # The jobs are keyed by URL for the host limits; each URL stands for one library row
+    stored_ids = [row[0] for row in db_manager.query("SELECT content_id FROM library")]
+    urls = {f"{HOSTS[i % len(HOSTS)]}{i}": content_id for i, content_id in enumerate(stored_ids)}
+
+    limits = HostLimits()
+    lock = threading.Lock()
+    running, peak = Counter(), Counter()
+
+    def process(url):
+        host = limits.host_of(url)
+        with lock:
+            running[host] += 1
+            peak[host] = max(peak[host], running[host])
+        try:
+            time.sleep(latency_ms / 1000)  # The page fetch
+        finally:
+            with lock:
+                running[host] -= 1
+        db_manager.store_transcript(urls[url], f"Transcript of {url}")
+
+    job_queue = JobQueue()
+    print(f"{items} content IDs over {len(HOSTS)} hosts, {latency_ms} ms per fetch, limits {HostLimits().limits}")
+    baseline = None
+    for concurrency in CONCURRENCY_LEVELS:
+        peak.clear()
+        job, _ = job_queue.submit(f'update-{concurrency}', list(urls), process,
+                                  concurrency=concurrency, limits=HostLimits())
+        job.finished.wait()
+        report = job.to_dict(include_items=False)
+        baseline = baseline or report['throughput']
+        print(f"concurrency {concurrency:2d}  {report['elapsed_seconds']:6.2f} s  "
+              f"{report['throughput']:7.1f} items/s  ({report['throughput'] / baseline:.1f}x)  "
+              f"{report['failed']} failed  peak per host {dict(peak)}")
+    job_queue.shutdown()
+
+    discard_library(db_manager)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
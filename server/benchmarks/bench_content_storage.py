@@ -0,0 +1,71 @@
+"""
+Benchmark moving transcripts out of library into compressed library_content rows.
+
+Builds a synthetic library with transcripts inline (the old layout), measures the
+database size and the time of typical filter and aggregation queries, then runs
+the migration plus a VACUUM and measures again.
+
+Run from the server directory:
+    python -m benchmarks.bench_content_storage [rows]
+"""
+
+# benchmarks/bench_content_storage.py
+
+import sys
+import time
+from benchmarks.synthetic_library import build_library, database_size, discard_library
+from db.content_codec import DEFAULT_CODEC
+
+QUERIES = {
+    'list view, all rows': lambda db: db.fetch_filtered_data({}),
+    'list view, Web + Economy': lambda db: db.fetch_filtered_data(
+        {'platforms': ['Web'], 'macro_topics': ['Economy']}),
+    'avg sentiment by platform': lambda db: db.query(
+        "SELECT platform, COUNT(*), AVG(sentiment_analysis) FROM library GROUP BY platform"),
+    'count by topic, 2023': lambda db: db.query(
+        "SELECT macro_topic, COUNT(*) FROM library WHERE date_added BETWEEN '2023-01-01' AND '2023-12-31' "
+        "GROUP BY macro_topic"),
+}
+
+
+def measure(db_manager, repeat=3):
+    timings = {}
+    for name, query in QUERIES.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query(db_manager)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+
+def main(rows=50_000):
+    db_manager = build_library(rows, migrate=False)
+    size_before = database_size(db_manager)
+    before = measure(db_manager)
+
+    start = time.perf_counter()
+    db_manager.create_library_table()
+    migrate_time = time.perf_counter() - start
+    start = time.perf_counter()
+    db_manager.vacuum()
+    vacuum_time = time.perf_counter() - start
+    size_after = database_size(db_manager)
+    after = measure(db_manager)
+    stats = db_manager.content_storage_stats()
+
+    print(f"{rows} rows, codec {DEFAULT_CODEC}")
+    print(f"transcripts: {stats['raw_bytes'] / 1e6:.1f} MB raw -> {stats['stored_bytes'] / 1e6:.1f} MB stored "
+          f"({stats['raw_bytes'] / max(stats['stored_bytes'], 1):.1f}x)")
+    print(f"database file: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB "
+          f"(migration {migrate_time:.1f}s, vacuum + reindex {vacuum_time:.1f}s)")
+    for name in QUERIES:
+        print(f"{name:28} {before[name] * 1000:8.1f} ms -> {after[name] * 1000:8.1f} ms "
+              f"({before[name] / after[name]:.1f}x)")
+
+    discard_library(db_manager)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,50 @@
+"""
+Benchmark parsing the saved BBC, CNBC and YouTube pages in tests/fixtures: the
+full BeautifulSoup tree with each installed tree builder, against the head-only
+metadata fast path with each installed head parser.
+
+Run from the server directory:
+    python -m benchmarks.bench_html_parsing [repeats]
+"""
+
+# benchmarks/bench_html_parsing.py
+
+import os
+import sys
+import time
+from scraper.utils import html_parser
+from scraper.utils.html_parser import extract_metadata, make_soup
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures')
+PAGES = ('bbc_article.html', 'cnbc_article.html', 'youtube_watch.html')
+
+
+def per_parse(function, html, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function(html)
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main(repeats=20):
+    soup_backends = ['html.parser'] + (['lxml'] if html_parser.SOUP_FEATURES == 'lxml' else [])
+    selectolax = html_parser.SelectolaxParser
+    head_backends = [('html.parser', None)] + ([('selectolax', selectolax)] if selectolax else [])
+
+    for name in PAGES:
+        with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+            html = f.read()
+        print(f"{name} ({len(html) / 1000:.0f} kB)")
+        baseline = per_parse(lambda page: make_soup(page, 'html.parser'), html, repeats)
+        for features in soup_backends:
+            elapsed = per_parse(lambda page: make_soup(page, features), html, repeats)
+            print(f"  full soup, {features:12s} {elapsed:8.2f} ms  ({baseline / elapsed:5.1f}x)")
+        for label, parser in head_backends:
+            html_parser.SelectolaxParser = parser
+            elapsed = per_parse(extract_metadata, html, repeats)
+            print(f"  head only, {label:12s} {elapsed:8.2f} ms  ({baseline / elapsed:5.1f}x)")
+        html_parser.SelectolaxParser = selectolax
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,56 @@
+"""
+Benchmark the full-text search over a synthetic 100k-row library.
+
+Compares DBManager.search_library (FTS5, bm25 ranked, top 50) against a LIKE scan
+that finds every matching row, which is the work the client had to do before by
+pulling the whole library and grepping it.
+
+Run from the server directory:
+    python -m benchmarks.bench_search [rows]
+"""
+
+# benchmarks/bench_search.py
+
+import sys
+import time
+from benchmarks.synthetic_library import build_library, database_size, discard_library
+
+QUERIES = ['inflation', 'climate energy', 'ukraine war', 'vacc*', 'drought crop farm']
+
+
+def timed(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(rows=100_000):
+    start = time.perf_counter()
+    db_manager = build_library(rows)
+    print(f"Built {rows} rows (indexed by triggers) in {time.perf_counter() - start:.1f}s, "
+          f"database {database_size(db_manager) / 1e6:.0f} MB")
+
+    for text in QUERIES:
+        fts_time, results = timed(lambda: db_manager.search_library(text, limit=50, fields=['content_id', 'title']))
+        filtered_time, _ = timed(lambda: db_manager.search_library(
+            text, {'publishers': ['BBC News'], 'platforms': ['Web']}, limit=50, fields=['content_id']))
+        # Transcripts live compressed in library_content, so the scan has to decompress them
+        like = ' AND '.join(
+            "(title LIKE ? OR summary LIKE ? OR decompress_text(content.codec, content.transcript) LIKE ?)"
+            for _ in text.split())
+        like_params = [f"%{term.rstrip('*')}%" for term in text.split() for _ in range(3)]
+        like_time, _ = timed(lambda: db_manager.query(
+            f"SELECT library.content_id FROM library "
+            f"LEFT JOIN library_content AS content ON content.content_id = library.content_id "
+            f"WHERE {like}", like_params), repeat=1)
+        print(f"{text!r:28} fts {fts_time * 1000:7.1f} ms  fts+filters {filtered_time * 1000:7.1f} ms  "
+              f"LIKE scan {like_time * 1000:8.1f} ms  ({len(results)} results)")
+
+    discard_library(db_manager)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,109 @@
+"""
+Helpers shared by the benchmarks: build a DBManager over a temporary database and
+fill its library with synthetic rows that look like scraped articles and videos.
+"""
+
+# benchmarks/synthetic_library.py
+
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from db.db_manager import DBManager
+
+WORDS = (
+    "inflation market economy election government policy climate energy growth bank "
+    "rates interest war conflict trade tariff tax budget deficit jobs labour wages "
+    "housing price stock bond oil gas technology ai chip regulation court vote "
+    "minister president parliament europe china america russia ukraine africa india "
+    "health vaccine hospital school university research science space football "
+    "tennis music film culture travel weather storm flood drought crop farm food"
+).split()
+PUBLISHERS = ['BBC News', 'CNBC', 'Bloomberg', 'Reuters', 'The Economist', 'Al Jazeera',
+              'Fox News', 'CNN', 'The Guardian', 'Financial Times']
+COUNTRIES = ['UK', 'US', 'Qatar', 'Germany', 'France']
+TOPICS = ['Economy', 'Politics', 'Technology', 'Health', 'Sport', 'Culture']
+ORIENTATIONS = ['Left', 'Centre-left', 'Centre', 'Centre-right', 'Right']
+
+
+# Zipf-like word frequencies, so some terms are everywhere and others are rare.
+WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(WORDS, WEIGHTS, k=count))
+
+
+def synthetic_rows(count, transcript_words=400, seed=42):
+    """Yield tuples for INSERT INTO library (see SYNTHETIC_COLUMNS)."""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    for i in range(count):
+        publisher = rng.choice(PUBLISHERS)
+        platform = 'YouTube' if rng.random() < 0.3 else 'Web'
+        added = start + timedelta(minutes=7 * i)
+        yield (
+            f"https://example.com/{platform.lower()}/{i}",
+            words(rng, 8).capitalize(),
+            publisher,
+            (added - timedelta(days=rng.randint(0, 30))).strftime('%Y-%m-%d %H:%M:%S'),
+            added.strftime('%Y-%m-%d %H:%M:%S'),
+            str(rng.randint(1, 60)),
+            platform,
+            words(rng, transcript_words),
+            words(rng, 120),
+            round(rng.uniform(-1, 1), 2),
+            rng.choice(TOPICS),
+            rng.choice(ORIENTATIONS),
+            rng.choice(COUNTRIES),
+            f"https://example.com/img/{i}.jpg",
+        )
+
+
+SYNTHETIC_COLUMNS = (
+    'content_id', 'title', 'publisher', 'date_published', 'date_added', 'duration',
+    'platform', 'transcript', 'summary', 'sentiment_analysis', 'macro_topic',
+    'publisher_political_orientation', 'country', 'reference_image',
+)
+
+
+def build_library(count, transcript_words=400, directory=None, migrate=True):
+    """
+    Create a DBManager over a new temporary database holding ``count`` synthetic rows.
+
+    The rows are written with their transcripts inline in library, the layout of
+    older databases. Unless ``migrate`` is False they are then moved to compressed
+    library_content storage, as happens when the server starts.
+    """
+    directory = directory or tempfile.mkdtemp(prefix='narratives-bench-')
+    db_manager = DBManager(os.path.join(directory, 'narratives.db'))
+    db_manager.create_library_table()
+    db_manager.create_publisher_options_table()
+    db_manager.create_api_keys_table()
+
+    placeholders = ', '.join('?' for _ in SYNTHETIC_COLUMNS)
+    insert = f"INSERT INTO library ({', '.join(SYNTHETIC_COLUMNS)}) VALUES ({placeholders})"
+    with db_manager.pool.transaction() as conn:
+        conn.executemany(insert, synthetic_rows(count, transcript_words))
+        conn.executemany(
+            "INSERT OR IGNORE INTO publisher_options VALUES (?, ?, ?)",
+            [(publisher, ORIENTATIONS[i % len(ORIENTATIONS)], COUNTRIES[i % len(COUNTRIES)])
+             for i, publisher in enumerate(PUBLISHERS)])
+    if migrate:
+        db_manager.create_library_table()
+    return db_manager
+
+
+def database_size(db_manager):
+    """Size in bytes of the database file plus its WAL."""
+    with db_manager.pool.connection() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return sum(os.path.getsize(db_manager.db_name + suffix)
+               for suffix in ('', '-wal') if os.path.exists(db_manager.db_name + suffix))
+
+
+def discard_library(db_manager):
+    """Close a library made by build_library and delete its temporary directory."""
+    db_manager.close()
+    shutil.rmtree(os.path.dirname(db_manager.db_name), ignore_errors=True)
@@ -0,0 +1,132 @@
+"""
+This module contains the ConnectionPool class which hands out long-lived SQLite
+connections to the threads serving requests. Connections are configured once
+when they are opened (WAL journal mode, synchronous=NORMAL and a busy timeout)
+and are returned to the pool instead of being closed after every call.
+"""
+
+# db/connection_pool.py
+
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """
+    A checked-out pool of SQLite connections.
+
+    A thread checks a connection out with ``connection()`` and gives it back
+    when the block exits. Nested ``connection()`` blocks on the same thread
+    reuse the connection that thread already holds, so DBManager methods can
+    call each other freely. Writes go through ``transaction()``, which also
+    holds a process-wide write lock so concurrent writers queue up in Python
+    rather than spinning on SQLITE_BUSY.
+    """
+
+    def __init__(self, db_name, max_idle=8, busy_timeout=5000, on_connect=None):
+        self.db_name = db_name
+        self.max_idle = max_idle
+        self.busy_timeout = busy_timeout
+        self.on_connect = on_connect  # Called with each new connection, e.g. to register SQL functions
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._closed = False
+        self.logger = logging.getLogger('DBManager')
+        self._configure_database()
+
+    def _configure_database(self):
+        """Switch the database file to WAL mode. The setting persists in the file."""
+        conn = self._open()
+        try:
+            mode = conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+            if mode.lower() != 'wal':
+                self.logger.warning(f"Could not enable WAL journal mode, using {mode}")
+        finally:
+            self._release(conn)
+
+    def _open(self):
+        """Open and configure a new connection."""
+        conn = sqlite3.connect(
+            self.db_name, timeout=self.busy_timeout / 1000, check_same_thread=False)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        conn.execute('PRAGMA foreign_keys=ON')
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the current thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Check out a connection and run the block as one serialised write transaction."""
+        with self._write_lock, self.connection() as conn:
+            if getattr(self._local, 'tx_depth', 0):
+                # Nested inside an outer transaction on this thread; the outer block commits.
+                self._local.tx_depth += 1
+                try:
+                    yield conn
+                finally:
+                    self._local.tx_depth -= 1
+                return
+
+            self._local.tx_depth = 1
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.tx_depth = 0
+
+    def close_all(self):
+        """Close every idle connection. Checked-out connections close when released."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
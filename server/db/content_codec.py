@@ -0,0 +1,45 @@
+"""
+This module compresses the large text bodies (transcripts) that DBManager stores
+in the library_content table. zstd is used when the optional ``zstandard`` package
+is installed, otherwise zlib. Every blob is stored with the name of its codec, so
+a database written with one codec can still be read after switching to the other.
+"""
+
+# db/content_codec.py
+
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+DEFAULT_CODEC = 'zstd' if zstandard else 'zlib'
+
+
+def compress_text(text, codec=DEFAULT_CODEC):
+    """Compress text with the given codec and return the bytes."""
+    data = text.encode('utf-8')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd codec requested but the zstandard package is not installed")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == 'zlib':
+        return zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompress_text(codec, data):
+    """Decompress bytes written by compress_text. Also registered as a SQL function."""
+    if data is None:
+        return None
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd-compressed content needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    if codec == 'zlib':
+        return zlib.decompress(data).decode('utf-8')
+    raise ValueError(f"Unknown codec: {codec}")
@@ -1,125 +1,740 @@
 """
 This module contains the DBManager class which provides methods for interacting
-with a SQLite database. It allows for connecting to the database, creating a
-library table, executing queries, and fetching data from the database.
+with a SQLite database. It allows for creating the library tables, executing
+queries, and fetching data from the database. Connections come from a
+ConnectionPool so they are reused across calls and threads.
 """
 
+import base64
+import hashlib
+import json
 import logging
 import sqlite3
-import os
+import threading
+import time
+import uuid
 from datetime import datetime
+from db.connection_pool import ConnectionPool
+from db.content_codec import DEFAULT_CODEC, compress_text, decompress_text
+from db.result_cache import ResultCache
 from scraper.factory import get_scraper
+from scraper.utils.url_utils import canonicalize_url
 from processor.factory import get_processor
 
+# Secondary indexes on the library table. Each categorical filter column is paired
+# with date_added so "filter + date range" is answered from a single index, and the
+# date columns are paired with content_id to give keyset pagination a stable order.
+LIBRARY_INDEXES = {
+    'idx_library_publisher': 'publisher, date_added',
+    'idx_library_platform': 'platform, date_added',
+    'idx_library_macro_topic': 'macro_topic, date_added',
+    'idx_library_date_added': 'date_added, content_id',
+    'idx_library_date_published': 'date_published, content_id',
+}
+
+# Columns that /fetch-narratives-data can project. The transcript is left out of the
+# default projection; list views use the summary or its short preview instead and
+# the full text is loaded on demand with fetch_transcript.
+LIBRARY_COLUMNS = (
+    'content_id', 'title', 'publisher', 'author', 'date_published', 'date_added',
+    'duration', 'platform', 'transcript', 'summary', 'summary_preview',
+    'sentiment_analysis', 'macro_topic', 'publisher_political_orientation',
+    'country', 'sent_by', 'comments', 'reference_image',
+)
+DEFAULT_FIELDS = tuple(column for column in LIBRARY_COLUMNS if column != 'transcript')
+SUMMARY_PREVIEW_LENGTH = 280
+
+# Transcripts live compressed in library_content, one row per content_id, so scans
+# of library for filtering and aggregation don't drag the large text through the
+# page cache. library.transcript is kept only for databases written before this
+# table existed and is emptied by migrate_transcripts. transcript_hash identifies
+# identical transcripts under different content_ids, whose summary is then reused.
+LIBRARY_CONTENT_SQL = '''
+CREATE TABLE IF NOT EXISTS library_content (
+    content_id VARCHAR(200) PRIMARY KEY REFERENCES library (content_id) ON DELETE CASCADE,
+    codec TEXT NOT NULL,
+    raw_size INTEGER NOT NULL,
+    transcript BLOB NOT NULL,
+    transcript_hash TEXT
+)
+'''
+CONTENT_HASH_INDEX_SQL = '''
+CREATE INDEX IF NOT EXISTS idx_library_content_hash ON library_content (transcript_hash)
+'''
+
+# An upsert rather than INSERT OR REPLACE, so replacing a transcript fires the
+# update trigger that keeps the search index right.
+UPSERT_CONTENT_SQL = '''
+INSERT INTO library_content (content_id, codec, raw_size, transcript, transcript_hash) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (content_id) DO UPDATE SET
+    codec = excluded.codec, raw_size = excluded.raw_size, transcript = excluded.transcript,
+    transcript_hash = excluded.transcript_hash
+'''
+
+# A publisher's political orientation and country are kept once, in publisher_options,
+# and looked up for each library row when it is read. Publishers without them are 'Unknown'.
+# library still has the columns of the old denormalised copies; they are left NULL.
+PUBLISHER_FIELDS = ('publisher_political_orientation', 'country')
+PUBLISHER_OPTIONS_SQL = '''
+CREATE TABLE IF NOT EXISTS publisher_options (
+    publisher TEXT PRIMARY KEY,
+    publisher_political_orientation TEXT,
+    country TEXT
+)
+'''
+PUBLISHER_FIELD_SQL = (
+    "COALESCE((SELECT publisher_options.{field} FROM publisher_options "
+    "WHERE publisher_options.publisher = library.publisher), 'Unknown')"
+)
+
+# Select-list expressions for fields that are not stored as plain library columns.
+FIELD_EXPRESSIONS = {
+    'transcript': (
+        "(SELECT decompress_text(library_content.codec, library_content.transcript) "
+        "FROM library_content WHERE library_content.content_id = library.content_id)"
+    ),
+    **{field: PUBLISHER_FIELD_SQL.format(field=field) for field in PUBLISHER_FIELDS},
+}
+
+# Full-text index over the library. It is an external-content FTS5 table: it stores
+# only the index and reads the text back through library_fts_source, a view that
+# joins library to the decompressed transcript. The triggers on library and
+# library_content keep the index in step with every write. Each 'delete' has to
+# pass exactly the values that were indexed, which is why the library triggers
+# look up the current transcript and the library_content triggers the current
+# title and summary.
+SEARCH_INDEX_SQL = (
+    '''
+    CREATE VIEW IF NOT EXISTS library_fts_source AS
+    SELECT library.rowid AS rowid, library.title AS title, library.summary AS summary,
+           decompress_text(library_content.codec, library_content.transcript) AS transcript
+    FROM library
+    LEFT JOIN library_content ON library_content.content_id = library.content_id
+    ''',
+    '''
+    CREATE VIRTUAL TABLE library_fts USING fts5(
+        title, summary, transcript,
+        content='library_fts_source', content_rowid='rowid', tokenize='porter unicode61'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS library_fts_insert AFTER INSERT ON library BEGIN
+        INSERT INTO library_fts (rowid, title, summary, transcript)
+        SELECT rowid, title, summary, transcript FROM library_fts_source WHERE rowid = new.rowid;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS library_fts_delete BEFORE DELETE ON library BEGIN
+        INSERT INTO library_fts (library_fts, rowid, title, summary, transcript)
+        SELECT 'delete', rowid, title, summary, transcript FROM library_fts_source WHERE rowid = old.rowid;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS library_fts_update AFTER UPDATE OF title, summary ON library BEGIN
+        INSERT INTO library_fts (library_fts, rowid, title, summary, transcript)
+        SELECT 'delete', old.rowid, old.title, old.summary, transcript
+        FROM library_fts_source WHERE rowid = new.rowid;
+        INSERT INTO library_fts (rowid, title, summary, transcript)
+        SELECT rowid, title, summary, transcript FROM library_fts_source WHERE rowid = new.rowid;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS library_content_fts_insert AFTER INSERT ON library_content BEGIN
+        INSERT INTO library_fts (library_fts, rowid, title, summary, transcript)
+        SELECT 'delete', rowid, title, summary, NULL FROM library WHERE content_id = new.content_id;
+        INSERT INTO library_fts (rowid, title, summary, transcript)
+        SELECT rowid, title, summary, decompress_text(new.codec, new.transcript)
+        FROM library WHERE content_id = new.content_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS library_content_fts_update AFTER UPDATE ON library_content BEGIN
+        INSERT INTO library_fts (library_fts, rowid, title, summary, transcript)
+        SELECT 'delete', rowid, title, summary, decompress_text(old.codec, old.transcript)
+        FROM library WHERE content_id = old.content_id;
+        INSERT INTO library_fts (rowid, title, summary, transcript)
+        SELECT rowid, title, summary, decompress_text(new.codec, new.transcript)
+        FROM library WHERE content_id = new.content_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS library_content_fts_delete AFTER DELETE ON library_content BEGIN
+        INSERT INTO library_fts (library_fts, rowid, title, summary, transcript)
+        SELECT 'delete', rowid, title, summary, decompress_text(old.codec, old.transcript)
+        FROM library WHERE content_id = old.content_id;
+        INSERT INTO library_fts (rowid, title, summary, transcript)
+        SELECT rowid, title, summary, NULL FROM library WHERE content_id = old.content_id;
+    END
+    ''',
+)
+
+# Objects of the first search index, which read transcripts from library directly.
+LEGACY_SEARCH_INDEX_OBJECTS = (
+    ('trigger', 'library_fts_insert'),
+    ('trigger', 'library_fts_delete'),
+    ('trigger', 'library_fts_update'),
+    ('table', 'library_fts'),
+)
+
+# bm25 column weights for (title, summary, transcript): a hit in the title counts
+# for more than one buried in a long transcript.
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+MAX_SEARCH_RESULTS = 200
+
+# Columns that /fetch-narratives-data can be sorted and paginated on.
+SORT_KEYS = ('date_added', 'date_published')
+MAX_PAGE_SIZE = 1000
+
+# Breakdowns returned by /narratives-aggregates. Each maps a dimension name to the
+# expression giving a row's group; '{row}' is the table alias or trigger row (new/old).
+# 'total' has a single group holding the figures for the whole selection. The
+# publisher-level dimensions are not rolled up themselves: they are summed from the
+# publisher groups at read time, so editing a publisher never touches the rollups.
+AGGREGATE_DIMENSIONS = {
+    'total': "'all'",
+    'publisher': "{row}.publisher",
+    'country': "{row}.country",
+    'macro_topic': "{row}.macro_topic",
+    'platform': "{row}.platform",
+    'publisher_political_orientation': "{row}.publisher_political_orientation",
+    'date_added_month': "substr({row}.date_added, 1, 7)",
+    'date_published_month': "substr({row}.date_published, 1, 7)",
+}
+ROLLUP_DIMENSIONS = tuple(dimension for dimension in AGGREGATE_DIMENSIONS if dimension not in PUBLISHER_FIELDS)
+DATE_DIMENSIONS = ('date_added_month', 'date_published_month')
+UNKNOWN_GROUP = 'Unknown'  # Group for rows where the dimension is NULL
+
+# library.duration is TEXT; blank or missing durations are left out of the averages.
+DURATION_EXPRESSION = "CAST(NULLIF({row}.duration, '') AS REAL)"
+ROLLUP_COLUMNS = ('dimension', 'value', 'items', 'duration_items', 'duration_sum',
+                  'sentiment_items', 'sentiment_sum')
+# Columns of library the rollups depend on; updates to any other column don't touch them.
+ROLLUP_SOURCE_COLUMNS = ('publisher', 'macro_topic', 'platform', 'date_added', 'date_published',
+                         'duration', 'sentiment_analysis')
+
+# Running totals per (dimension, group) over the whole library, so the unfiltered
+# aggregates are read in O(groups). Triggers on library add each inserted row,
+# subtract each deleted row, and move updated rows between groups.
+LIBRARY_ROLLUPS_SQL = '''
+CREATE TABLE IF NOT EXISTS library_rollups (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    duration_items INTEGER NOT NULL,
+    duration_sum REAL NOT NULL,
+    sentiment_items INTEGER NOT NULL,
+    sentiment_sum REAL NOT NULL,
+    PRIMARY KEY (dimension, value)
+) WITHOUT ROWID
+'''
+
+# Every content_id goes through these stages in order, and pipeline_state records
+# how far it got, so a sweep picks each item up at its first unfinished stage. A
+# stage is 'pending' until it first runs, then 'done', or 'failed' until its retry
+# at next_retry_at. Failed stages back off exponentially, and after
+# MAX_STAGE_ATTEMPTS failures a stage is 'poisoned': sweeps skip the item until
+# reset_pipeline_state is called for it.
+PIPELINE_STAGES = ('scraped', 'summarised', 'analysed')
+MAX_STAGE_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 24 * 60 * 60
+MAX_ERROR_LENGTH = 1000
+PIPELINE_STATE_SQL = '''
+CREATE TABLE IF NOT EXISTS pipeline_state (
+    content_id VARCHAR(200) NOT NULL REFERENCES library (content_id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_retry_at REAL,
+    updated_at REAL,
+    PRIMARY KEY (content_id, stage)
+) WITHOUT ROWID
+'''
+# Only unfinished stages are indexed, so finding pending work doesn't scan the finished library.
+PIPELINE_STATE_INDEX_SQL = '''
+CREATE INDEX IF NOT EXISTS idx_pipeline_state_unfinished ON pipeline_state (content_id) WHERE status != 'done'
+'''
+PIPELINE_STATE_TRIGGER_SQL = f'''
+CREATE TRIGGER IF NOT EXISTS pipeline_state_insert AFTER INSERT ON library BEGIN
+    INSERT OR IGNORE INTO pipeline_state (content_id, stage) VALUES
+    {', '.join(f"(new.content_id, '{stage}')" for stage in PIPELINE_STAGES)};
+END
+'''
+# How to tell from the stored data that a stage of an existing row is already done
+PIPELINE_DONE_CONDITIONS = {
+    'scraped': "library_content.content_id IS NOT NULL",
+    'summarised': "COALESCE(library.summary, '') != ''",
+    'analysed': "COALESCE(library.duration, '') != ''",
+}
+STAGE_ORDER = f"CASE stage {' '.join(f'WHEN {stage!r} THEN {i}' for i, stage in enumerate(PIPELINE_STAGES))} END"
+
+
+def transcript_hash(transcript):
+    """A hash of a transcript's words, the same whatever whitespace separates them."""
+    return hashlib.sha256(' '.join(transcript.split()).encode('utf-8')).hexdigest()
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a stage that has failed ``attempts`` times."""
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def make_summary_preview(summary, length=SUMMARY_PREVIEW_LENGTH):
+    """Shorten a summary to at most ``length`` characters, cutting on a word boundary."""
+    if not summary:
+        return summary
+    summary = ' '.join(summary.split())
+    if len(summary) <= length:
+        return summary
+    return summary[:length].rsplit(' ', 1)[0] + '...'
+
+
+# Messages of the errors SQLite raises for a malformed MATCH expression, as opposed to
+# a broken database; the search route answers the former with a 400.
+FTS_QUERY_ERRORS = ('fts5: syntax error', 'unterminated string', 'unknown special query')
+
+
+def to_fts_query(text):
+    """
+    Turn free text from the search box into an FTS5 query. Every term is quoted so
+    punctuation can't be read as query syntax; the terms are ANDed together and a
+    trailing '*' on a term is kept as a prefix search.
+    """
+    terms = []
+    for term in text.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*').replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ('*' if prefix else ''))
+    if not terms:
+        raise ValueError("Search query is empty")
+    return ' '.join(terms)
+
+
+def rollup_statements(row, sign):
+    """Upserts adding (sign 1) or subtracting (sign -1) one library row to its rollup groups."""
+    duration = DURATION_EXPRESSION.format(row=row)
+    statements = []
+    for dimension in ROLLUP_DIMENSIONS:
+        expression = AGGREGATE_DIMENSIONS[dimension]
+        value = f"COALESCE({expression.format(row=row)}, '{UNKNOWN_GROUP}')"
+        statements.append(f'''
+        INSERT INTO library_rollups ({', '.join(ROLLUP_COLUMNS)})
+        VALUES ('{dimension}', {value}, {sign}, {sign} * ({duration} IS NOT NULL),
+                {sign} * COALESCE({duration}, 0), {sign} * ({row}.sentiment_analysis IS NOT NULL),
+                {sign} * COALESCE({row}.sentiment_analysis, 0))
+        ON CONFLICT (dimension, value) DO UPDATE SET
+            items = items + excluded.items,
+            duration_items = duration_items + excluded.duration_items,
+            duration_sum = duration_sum + excluded.duration_sum,
+            sentiment_items = sentiment_items + excluded.sentiment_items,
+            sentiment_sum = sentiment_sum + excluded.sentiment_sum;
+        ''')
+    return ''.join(statements)
+
+
+ROLLUP_TRIGGERS = ('library_rollups_insert', 'library_rollups_delete', 'library_rollups_update')
+
+
+def rollup_trigger_sql():
+    """The triggers that keep library_rollups in step with library."""
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS library_rollups_insert AFTER INSERT ON library BEGIN"
+        f"{rollup_statements('new', 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS library_rollups_delete AFTER DELETE ON library BEGIN"
+        f"{rollup_statements('old', -1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS library_rollups_update AFTER UPDATE OF "
+        f"{', '.join(ROLLUP_SOURCE_COLUMNS)} ON library BEGIN"
+        f"{rollup_statements('old', -1)}{rollup_statements('new', 1)} END",
+    )
+
+
+def rollup_read_sql():
+    """Read the rollups, summing the publisher groups into the publisher-level dimensions."""
+    sums = ', '.join(f"SUM(library_rollups.{column})" for column in ROLLUP_COLUMNS[2:])
+    derived = [
+        f"SELECT '{field}', COALESCE(publisher_options.{field}, '{UNKNOWN_GROUP}') AS value, {sums} "
+        f"FROM library_rollups LEFT JOIN publisher_options ON publisher_options.publisher = library_rollups.value "
+        f"WHERE library_rollups.dimension = 'publisher' AND library_rollups.items > 0 GROUP BY value"
+        for field in PUBLISHER_FIELDS
+    ]
+    stored = (f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM library_rollups "
+              f"WHERE dimension IN ({', '.join(repr(d) for d in ROLLUP_DIMENSIONS)})")
+    return ' UNION ALL '.join([stored, *derived])
+
+
+def format_aggregates(rows):
+    """
+    Shape (dimension, value, items, duration_items, duration_sum, sentiment_items,
+    sentiment_sum) rows into the /narratives-aggregates response: one list of groups
+    per dimension, largest first (dates in order), and the overall figures as 'total'.
+    """
+    result = {dimension: [] for dimension in AGGREGATE_DIMENSIONS}
+    for dimension, value, items, duration_items, duration_sum, sentiment_items, sentiment_sum in rows:
+        if items <= 0:
+            continue  # Every row of the group has been deleted or moved elsewhere
+        result[dimension].append({
+            "value": value,
+            "count": items,
+            "total_duration": duration_sum,
+            "avg_duration": duration_sum / duration_items if duration_items else None,
+            "avg_sentiment": sentiment_sum / sentiment_items if sentiment_items else None,
+        })
+
+    for dimension, groups in result.items():
+        if dimension in DATE_DIMENSIONS:
+            groups.sort(key=lambda group: group['value'])
+        else:
+            groups.sort(key=lambda group: (-group['count'], group['value']))
+
+    totals = result.pop('total')
+    result['total'] = totals[0] if totals else {
+        "value": 'all', "count": 0, "total_duration": 0.0, "avg_duration": None, "avg_sentiment": None}
+    return result
+
+
+def encode_cursor(sort, value, content_id):
+    """Encode the position of the last row of a page as an opaque cursor string."""
+    raw = json.dumps([sort, value, content_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (sort, value, content_id)."""
+    try:
+        sort, value, content_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("Invalid cursor")
+    return sort, value, content_id
+
 
 class DBManager:
     """
-    This class...
+    This class wraps the narratives database. Every method checks a connection
+    out of the shared pool, so a single instance can be used from all server threads.
     """
 
-    def __init__(self, db_name):
+    def __init__(self, db_name, busy_timeout=5000, cache_max_bytes=64 * 1024 * 1024):
         self.db_name = db_name
-        self.conn = None
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.pool = ConnectionPool(db_name, busy_timeout=busy_timeout, on_connect=self.configure_connection)
+        # Serialised query responses, valid while write_generation is unchanged
+        self.result_cache = ResultCache(max_bytes=cache_max_bytes)
+        self.write_generation = 0
+        self._generation_lock = threading.Lock()
+        # A connection of our own that never writes: its PRAGMA data_version changes
+        # whenever any other connection commits, including other processes'.
+        self._watch_conn = None
+        self._data_version = None
+        # write_generation restarts at 0 with the process, so ETags also carry an instance id
+        self.instance_id = uuid.uuid4().hex
 
-    def connect(self):
-        """Connect to the SQLite database."""
-        if not os.path.isfile(self.db_name):
-            self.conn = sqlite3.connect(self.db_name)
-        else:
-            self.conn = sqlite3.connect(self.db_name)
+    def configure_connection(self, conn):
+        """Register the SQL functions the schema relies on with a new pooled connection."""
+        conn.create_function('decompress_text', 2, decompress_text, deterministic=True)
 
     def close(self):
-        """Close the SQLite database connection."""
-        if self.conn:
-            self.conn.close()
+        """Close the pooled SQLite connections."""
+        self.pool.close_all()
+        with self._generation_lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+
+    def bump_write_generation(self):
+        """
+        Mark the library as changed, invalidating every cached result. Methods that
+        write to library or publisher_options call this after their transaction
+        commits, so a result computed from the old data is never stored as current.
+        """
+        with self._generation_lock:
+            self.write_generation += 1
+
+    def current_generation(self):
+        """
+        The write generation, first bumped if the database was written to outside
+        this DBManager (a pipeline worker in another process, the sqlite3 CLI).
+        Cached results and ETags are keyed by this rather than write_generation.
+        """
+        with self._generation_lock:
+            if self._watch_conn is None:
+                self._watch_conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            data_version = self._watch_conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                if self._data_version is not None:
+                    self.write_generation += 1
+                self._data_version = data_version
+            return self.write_generation
 
     def create_library_table(self):
         """Create the library table if it doesn't already exist."""
-        cursor = self.conn.cursor()
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='library'")
+            if cursor.fetchone() is None:
+                sql_cmd = '''
+                CREATE TABLE library (
+                    content_id VARCHAR(200) PRIMARY KEY,
+                    title TEXT,
+                    publisher TEXT,
+                    author TEXT,
+                    date_published DATETIME,
+                    date_added DATETIME,
+                    duration TEXT,
+                    platform TEXT,
+                    transcript TEXT,
+                    summary TEXT,
+                    sentiment_analysis REAL,
+                    macro_topic TEXT,
+                    publisher_political_orientation TEXT,
+                    country TEXT,
+                    sent_by TEXT,
+                    comments TEXT,
+                    reference_image TEXT,
+                    summary_preview TEXT
+                );
+                '''
+                cursor.execute(sql_cmd)
+
+            self.migrate_library_columns(cursor)
+
+            for index_name, columns in LIBRARY_INDEXES.items():
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON library ({columns})")
+
+            cursor.execute(LIBRARY_CONTENT_SQL)
+            self.migrate_content_columns(cursor)
+            self.drop_legacy_search_index(cursor)
+            self.migrate_transcripts(cursor)
+            self.create_search_index(cursor)
+            self.create_rollups(cursor)
+            # After create_rollups, whose triggers no longer watch the publisher columns
+            self.migrate_publisher_fields(cursor)
+            self.create_pipeline_state(cursor)
+
+    def create_search_index(self, cursor):
+        """Create the library_fts full-text index and its triggers, indexing existing rows."""
         cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='library'")
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='library_fts'")
         if cursor.fetchone() is None:
-            sql_cmd = '''
-            CREATE TABLE library (
-                content_id VARCHAR(200) PRIMARY KEY,
-                title TEXT,
-                publisher TEXT,
-                author TEXT,
-                date_published DATETIME,
-                date_added DATETIME,
-                duration TEXT,
-                platform TEXT,
-                transcript TEXT,
-                summary TEXT,
-                sentiment_analysis REAL,
-                macro_topic TEXT,
-                publisher_political_orientation TEXT,
-                country TEXT,
-                sent_by TEXT,
-                comments TEXT,
-                reference_image TEXT
-            );
-            '''
+            for sql_cmd in SEARCH_INDEX_SQL:
+                cursor.execute(sql_cmd)
+            cursor.execute("INSERT INTO library_fts (library_fts) VALUES ('rebuild')")
+            self.logger.info("Built full-text search index for library")
+
+    def create_rollups(self, cursor):
+        """
+        Create the library_rollups table, totalling existing rows. The triggers are
+        recreated every time so their definitions follow ROLLUP_DIMENSIONS, and
+        groups of dimensions that are no longer rolled up are dropped.
+        """
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='library_rollups'")
+        exists = cursor.fetchone() is not None
+        for trigger in ROLLUP_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        if exists:
+            cursor.execute(
+                f"DELETE FROM library_rollups WHERE dimension NOT IN ({', '.join('?' for _ in ROLLUP_DIMENSIONS)})",
+                ROLLUP_DIMENSIONS)
+        else:
+            cursor.execute(LIBRARY_ROLLUPS_SQL)
+            query, params = self.build_aggregate_query({}, ROLLUP_DIMENSIONS)
+            cursor.execute(f"INSERT INTO library_rollups ({', '.join(ROLLUP_COLUMNS)}) {query}", params)
+            self.logger.info("Built aggregate rollups for library")
+        for sql_cmd in rollup_trigger_sql():
             cursor.execute(sql_cmd)
-            self.conn.commit()
+
+    def create_pipeline_state(self, cursor):
+        """
+        Create the pipeline_state table and the trigger adding the stages of new
+        library rows. When the table is new, the stages existing rows have already
+        been through are marked done from the data they hold.
+        """
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='pipeline_state'")
+        exists = cursor.fetchone() is not None
+        cursor.execute(PIPELINE_STATE_SQL)
+        cursor.execute(PIPELINE_STATE_INDEX_SQL)
+        cursor.execute(PIPELINE_STATE_TRIGGER_SQL)
+        if exists:
+            return
+        now = time.time()
+        for stage in PIPELINE_STAGES:
+            cursor.execute(f'''
+            INSERT OR IGNORE INTO pipeline_state (content_id, stage, status, updated_at)
+            SELECT library.content_id, ?,
+                   CASE WHEN {PIPELINE_DONE_CONDITIONS[stage]} THEN 'done' ELSE 'pending' END, ?
+            FROM library
+            LEFT JOIN library_content ON library_content.content_id = library.content_id
+            ''', (stage, now))
+        self.logger.info("Built pipeline state for library")
+
+    def rebuild_rollups(self):
+        """Recompute library_rollups from scratch."""
+        query, params = self.build_aggregate_query({}, ROLLUP_DIMENSIONS)
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM library_rollups")
+            conn.execute(f"INSERT INTO library_rollups ({', '.join(ROLLUP_COLUMNS)}) {query}", params)
+        self.bump_write_generation()  # Cached /narratives-aggregates bodies were read from the old rollups
+
+    def drop_legacy_search_index(self, cursor):
+        """Drop a search index built before transcripts moved to library_content."""
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='view' AND name='library_fts_source'")
+        if cursor.fetchone() is not None:
+            return
+        for object_type, name in LEGACY_SEARCH_INDEX_OBJECTS:
+            cursor.execute(f"DROP {object_type.upper()} IF EXISTS {name}")
+
+    def rebuild_search_index(self):
+        """Re-index every library row, e.g. after a VACUUM renumbered the rowids."""
+        self.execute_query("INSERT INTO library_fts (library_fts) VALUES ('rebuild')")
+
+    def migrate_content_columns(self, cursor, batch_size=500):
+        """Add transcript_hash to a library_content table created without it, hashing the stored transcripts."""
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(library_content)")}
+        if 'transcript_hash' not in existing:
+            cursor.execute("ALTER TABLE library_content ADD COLUMN transcript_hash TEXT")
+            rows = cursor.connection.execute("SELECT content_id, codec, transcript FROM library_content")
+            hashed = 0
+            while True:
+                batch = rows.fetchmany(batch_size)
+                if not batch:
+                    break
+                cursor.executemany(
+                    "UPDATE library_content SET transcript_hash = ? WHERE content_id = ?",
+                    [(transcript_hash(decompress_text(codec, data)), content_id) for content_id, codec, data in batch])
+                hashed += len(batch)
+            self.logger.info(f"Added transcript_hash column to library_content ({hashed} rows backfilled)")
+        cursor.execute(CONTENT_HASH_INDEX_SQL)
+
+    def migrate_transcripts(self, cursor, batch_size=500):
+        """Move transcripts still stored inline in library into compressed library_content rows."""
+        rows = cursor.connection.execute(
+            "SELECT content_id, transcript FROM library WHERE transcript IS NOT NULL")
+        migrated = raw_bytes = stored_bytes = 0
+        while True:
+            batch = rows.fetchmany(batch_size)
+            if not batch:
+                break
+            blobs = []
+            for content_id, transcript in batch:
+                if not transcript:
+                    continue
+                data = compress_text(transcript)
+                raw_size = len(transcript.encode('utf-8'))
+                blobs.append((content_id, DEFAULT_CODEC, raw_size, data, transcript_hash(transcript)))
+                raw_bytes += raw_size
+                stored_bytes += len(data)
+            cursor.executemany(UPSERT_CONTENT_SQL, blobs)
+            migrated += len(blobs)
+
+        cursor.execute("UPDATE library SET transcript = NULL WHERE transcript IS NOT NULL")
+        if migrated:
+            self.logger.info(
+                f"Moved {migrated} transcripts to library_content: {raw_bytes} bytes compressed "
+                f"to {stored_bytes} bytes. Run DBManager.vacuum() to give the space back to the OS.")
+
+    def content_storage_stats(self):
+        """Report how many transcripts are stored and their raw and compressed sizes."""
+        rows, raw_bytes, stored_bytes = self.query(
+            "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(transcript)), 0) FROM library_content")[0]
+        return {"transcripts": rows, "raw_bytes": raw_bytes, "stored_bytes": stored_bytes}
+
+    def vacuum(self):
+        """
+        Rebuild the database file to release free pages, e.g. after migrate_transcripts.
+        VACUUM can renumber library rowids, so the search index is rebuilt afterwards.
+        """
+        with self.pool.transaction() as conn:
+            conn.execute("VACUUM")
+            conn.execute("INSERT INTO library_fts (library_fts) VALUES ('rebuild')")
+        self.bump_write_generation()
+
+    def migrate_library_columns(self, cursor):
+        """Add columns introduced after the library table was first created."""
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(library)")}
+        if 'summary_preview' not in existing:
+            cursor.execute("ALTER TABLE library ADD COLUMN summary_preview TEXT")
+            rows = cursor.execute(
+                "SELECT content_id, summary FROM library WHERE summary IS NOT NULL").fetchall()
+            cursor.executemany(
+                "UPDATE library SET summary_preview = ? WHERE content_id = ?",
+                [(make_summary_preview(summary), content_id) for content_id, summary in rows])
+            self.logger.info(f"Added summary_preview column to library ({len(rows)} rows backfilled)")
+
+    def migrate_publisher_fields(self, cursor):
+        """
+        Move orientation and country from the denormalised library columns into
+        publisher_options, for publishers that have no entry there yet, and clear them.
+        """
+        # Library reads look orientation and country up in publisher_options, so it must exist
+        cursor.execute(PUBLISHER_OPTIONS_SQL)
+        cursor.execute("DROP INDEX IF EXISTS idx_library_country")
+        if not cursor.execute("SELECT 1 FROM library WHERE country IS NOT NULL "
+                              "OR publisher_political_orientation IS NOT NULL LIMIT 1").fetchone():
+            return
+        cursor.execute('''
+        INSERT OR IGNORE INTO publisher_options (publisher, publisher_political_orientation, country)
+        SELECT publisher, MAX(publisher_political_orientation), MAX(country)
+        FROM library WHERE publisher IS NOT NULL GROUP BY publisher
+        ''')
+        cursor.execute("UPDATE library SET publisher_political_orientation = NULL, country = NULL "
+                       "WHERE publisher_political_orientation IS NOT NULL OR country IS NOT NULL")
+        self.logger.info(f"Moved publisher orientation and country out of {cursor.rowcount} library rows")
 
     def create_publisher_options_table(self):
         """Create the publisher_options table if it doesn't already exist."""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='publisher_options'")
-        if cursor.fetchone() is None:
-            sql_cmd = '''
-            CREATE TABLE publisher_options (
-                publisher TEXT PRIMARY KEY,
-                publisher_political_orientation TEXT,
-                country TEXT
-            );
-            '''
-            cursor.execute(sql_cmd)
-            self.conn.commit()
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='publisher_options'")
+            if cursor.fetchone() is None:
+                cursor.execute(PUBLISHER_OPTIONS_SQL)
 
     def create_api_keys_table(self):
         """Create the api_keys table if it doesn't already exist."""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='api_keys'")
-        if cursor.fetchone() is None:
-            sql_cmd = '''
-            CREATE TABLE api_keys (
-                api TEXT PRIMARY KEY,
-                key TEXT
-            );
-            '''
-            cursor.execute(sql_cmd)
-            self.conn.commit()
-        
-        # Check if 'openai_api_key' already exists
-        cursor.execute("SELECT 1 FROM api_keys WHERE api = ?", ('openai_api_key',))
-        if cursor.fetchone() is None:
-            # Prepopulate the table with an entry for openai_api_key if it doesn't exist
-            cursor.execute("INSERT INTO api_keys (api, key) VALUES (?, ?)", ('openai_api_key', ''))
-            self.conn.commit()
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='api_keys'")
+            if cursor.fetchone() is None:
+                sql_cmd = '''
+                CREATE TABLE api_keys (
+                    api TEXT PRIMARY KEY,
+                    key TEXT
+                );
+                '''
+                cursor.execute(sql_cmd)
+
+            # Check if 'openai_api_key' already exists
+            cursor.execute("SELECT 1 FROM api_keys WHERE api = ?", ('openai_api_key',))
+            if cursor.fetchone() is None:
+                # Prepopulate the table with an entry for openai_api_key if it doesn't exist
+                cursor.execute("INSERT INTO api_keys (api, key) VALUES (?, ?)", ('openai_api_key', ''))
 
     def execute_query(self, query, params=()):
-        """Execute a SQL query with optional parameters."""
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        self.conn.commit()
-        return cursor
+        """Execute a SQL query with optional parameters inside a write transaction."""
+        with self.pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor
 
     def query(self, query, params=()):
         """Fetch results from a SQL query with optional parameters."""
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        return cursor.fetchall()
-    
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
     def fetch_api_keys(self):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM api_keys")
-        columns = [column[0] for column in cursor.description]
-        data = cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM api_keys")
+            columns = [column[0] for column in cursor.description]
+            data = cursor.fetchall()
         data_dicts = [dict(zip(columns, row)) for row in data]
         return data_dicts
 
@@ -132,27 +747,59 @@ class DBManager:
         self.execute_query(query, (api, key))
 
     def add_content_id(self, content_id):
-        """Add content with the given content_id and set date_added to the current time."""
+        """
+        Add content with the given content_id, in its canonical form (see
+        canonicalize_url), and set date_added to the current time.
+        """
+        if isinstance(content_id, str):
+            content_id = canonicalize_url(content_id)
         current_time = datetime.now()
         formatted_time = current_time.strftime('%Y-%m-%d %H:%M:%S')
 
-        try:
-            self.connect()
+        with self.pool.transaction():
             # Check if content_id already exists
             exists = self.query(
-                'SELECT * FROM library WHERE content_id = ?', (content_id,))
+                'SELECT 1 FROM library WHERE content_id = ?', (content_id,))
             if not exists:
                 # Insert new content_id using the existing execute_query method
                 self.execute_query(
                     'INSERT INTO library (content_id, date_added) VALUES (?, ?)', (content_id, formatted_time))
-                self.logger.info(f"Added content_id = {content_id}")
-                return True  # Indicates that the content_id was added
-            else:
-                self.logger.warning(f"content_id already exists. Skipping {content_id}.")
-                return False  # Indicates that the content_id already exists
-        finally:
-            self.close()
-    
+        if exists:
+            self.logger.warning(f"content_id already exists. Skipping {content_id}.")
+            return False  # Indicates that the content_id already exists
+        self.bump_write_generation()
+        self.logger.info(f"Added content_id = {content_id}")
+        return True  # Indicates that the content_id was added
+
+    def add_content_ids(self, content_ids):
+        """
+        Add many content_ids in one transaction, skipping any that already exist.
+
+        The content_ids are canonicalised (see canonicalize_url), and blank and
+        duplicate entries are dropped in memory, then the rest go to a single
+        executemany of INSERT OR IGNORE. Returns the number of content_ids added
+        and skipped.
+        """
+        current_time = datetime.now()
+        formatted_time = current_time.strftime('%Y-%m-%d %H:%M:%S')
+
+        cleaned = [canonicalize_url(content_id) for content_id in content_ids
+                   if isinstance(content_id, str) and content_id.strip()]
+        unique = list(dict.fromkeys(cleaned))
+
+        with self.pool.transaction() as conn:
+            cursor = conn.executemany(
+                'INSERT OR IGNORE INTO library (content_id, date_added) VALUES (?, ?)',
+                [(content_id, formatted_time) for content_id in unique])
+            # rowcount counts the rows inserted into library only, not the trigger writes
+            added = max(cursor.rowcount, 0)
+        if added:
+            self.bump_write_generation()
+
+        skipped = len(content_ids) - added
+        self.logger.info(f"Bulk added {added} content_ids, skipped {skipped}")
+        return {"added": added, "skipped": skipped}
+
     def update_content_id_topic(self, content_id, new_topic):
         query = '''
         UPDATE library
@@ -160,136 +807,251 @@ class DBManager:
         WHERE content_id = ?
         '''
         self.execute_query(query, (new_topic, content_id))
-
+        self.bump_write_generation()
 
     def fetch_unprocessed_content_ids(self):
-        """Fetch all content IDs from the database where the transcript is empty."""
+        """
+        Fetch the content IDs with a stage left to run: those whose first unfinished
+        stage is pending, or failed and due for a retry. Items waiting out a backoff
+        and poisoned items are left out.
+        """
         try:
-            self.connect()
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT content_id FROM library WHERE transcript IS NULL OR transcript = ""')
-            unprocessed_content_ids = [row[0] for row in cursor.fetchall()]
+            rows = self.query(f'''
+            WITH next_stage AS (
+                SELECT content_id, status, next_retry_at,
+                       ROW_NUMBER() OVER (PARTITION BY content_id ORDER BY {STAGE_ORDER}) AS position
+                FROM pipeline_state WHERE status != 'done'
+            )
+            SELECT content_id FROM next_stage
+            WHERE position = 1 AND (status = 'pending' OR (status = 'failed' AND next_retry_at <= ?))
+            ORDER BY content_id
+            ''', (time.time(),))
+            unprocessed_content_ids = [row[0] for row in rows]
             return unprocessed_content_ids
         except sqlite3.Error as e:
             self.logger.error(f"Error fetching unprocessed content IDs. Error: {e}")
             return []
-        finally:
-            self.close()
+
+    def fetch_pipeline_state(self, content_id):
+        """The pipeline_state of each stage of a content_id, keyed by stage."""
+        rows = self.execute_query_fetchall(
+            "SELECT stage, status, attempts, last_error, next_retry_at, updated_at "
+            "FROM pipeline_state WHERE content_id = ?", (content_id,))
+        return {row.pop('stage'): row for row in rows}
+
+    def fetch_pipeline_summary(self):
+        """
+        How many content_ids are at each status of each stage, and the poisoned
+        stages with their last error.
+        """
+        counts = {stage: {} for stage in PIPELINE_STAGES}
+        for stage, status, items in self.query(
+                "SELECT stage, status, COUNT(*) FROM pipeline_state GROUP BY stage, status"):
+            counts.setdefault(stage, {})[status] = items
+        poisoned = self.execute_query_fetchall(
+            "SELECT content_id, stage, attempts, last_error, updated_at FROM pipeline_state "
+            "WHERE status = 'poisoned' ORDER BY updated_at DESC", ())
+        return {"stages": counts, "poisoned": poisoned}
+
+    def record_stage_done(self, content_id, stage):
+        """Mark a stage of a content_id as done."""
+        self.execute_query('''
+        INSERT INTO pipeline_state (content_id, stage, status, updated_at) VALUES (?, ?, 'done', ?)
+        ON CONFLICT (content_id, stage) DO UPDATE SET
+            status = 'done', last_error = NULL, next_retry_at = NULL, updated_at = excluded.updated_at
+        ''', (content_id, stage, time.time()))
+
+    def record_stage_failure(self, content_id, stage, error):
+        """
+        Count a failed attempt at a stage of a content_id and schedule its retry with
+        exponential backoff, or poison the stage once it has failed MAX_STAGE_ATTEMPTS times.
+        """
+        now = time.time()
+        message = f"{type(error).__name__}: {error}"[:MAX_ERROR_LENGTH]
+        with self.pool.transaction() as conn:
+            row = conn.execute("SELECT attempts FROM pipeline_state WHERE content_id = ? AND stage = ?",
+                               (content_id, stage)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            if attempts >= MAX_STAGE_ATTEMPTS:
+                status, next_retry_at = 'poisoned', None
+            else:
+                status, next_retry_at = 'failed', now + retry_delay(attempts)
+            conn.execute('''
+            INSERT INTO pipeline_state (content_id, stage, status, attempts, last_error, next_retry_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (content_id, stage) DO UPDATE SET
+                status = excluded.status, attempts = excluded.attempts, last_error = excluded.last_error,
+                next_retry_at = excluded.next_retry_at, updated_at = excluded.updated_at
+            ''', (content_id, stage, status, attempts, message, next_retry_at, now))
+        if status == 'poisoned':
+            self.logger.error(f"Giving up on {stage} for content_id = {content_id} after {attempts} attempts")
+
+    def reset_pipeline_state(self, content_ids):
+        """
+        Make the failed and poisoned stages of content_ids due again with no attempts
+        counted, so the next sweep retries them. Returns the number of stages reset.
+        """
+        placeholders = ','.join('?' for _ in content_ids)
+        cursor = self.execute_query(f'''
+        UPDATE pipeline_state SET status = 'pending', attempts = 0, last_error = NULL,
+            next_retry_at = NULL, updated_at = ?
+        WHERE content_id IN ({placeholders}) AND status IN ('failed', 'poisoned')
+        ''', (time.time(), *content_ids))
+        return cursor.rowcount
 
     def add_publisher_in_publisher_options(self, publisher):
         """Add a publisher to the publisher_options table if it doesn't already exist."""
         try:
-            self.connect()
-            exists = self.query(
-                'SELECT * FROM publisher_options WHERE publisher = ?', (publisher,))
-            if not exists:
-                # Insert new publisher
-                self.execute_query(
-                    'INSERT INTO publisher_options (publisher) VALUES (?)', (publisher,))
+            cursor = self.execute_query(
+                'INSERT OR IGNORE INTO publisher_options (publisher) VALUES (?)', (publisher,))
+            if cursor.rowcount:
                 self.logger.info(f"Added new publisher = {publisher}")
         except Exception as e:
             self.logger.error(f"Error adding publisher = {publisher}. Error: {e}")
-        finally:
-            self.close()
 
     def scrape_content_id(self, content_id):
         """Scrape the content_id URL to update database fields."""
-        scraper = get_scraper(content_id)
-
-        title = scraper.scrape_title()
-        transcript = scraper.scrape_transcript()
-        date_published = scraper.scrape_date_published()
-        publisher = scraper.scrape_publisher()
-        reference_image = scraper.scrape_reference_image()
+        result = get_scraper(content_id).scrape()
 
         if "youtube.com" in content_id:
             platform = 'YouTube'
         else:
             platform = 'Web'
 
-        # Check for publisher in publisher_options table
-        self.connect()
-        publisher_info = self.query(
-            'SELECT publisher_political_orientation, country FROM publisher_options WHERE publisher = ?', (publisher,))
-        
-        if publisher_info:
-            # If publisher exists, use the existing political orientation and country
-            publisher_political_orientation, country = publisher_info[0]
-        else:
-            # If publisher does not exist, set as Unknown
-            publisher_political_orientation, country = "Unknown", "Unknown"
-
-        self.add_publisher_in_publisher_options(publisher)
-
         try:
-            self.connect()
-            query = '''
-            UPDATE library
-            SET title = ?, transcript = ?, date_published = ?, 
-            publisher = ?, reference_image = ?, publisher_political_orientation = ?, 
-            country = ?, platform = ?
-            WHERE content_id = ?
-            '''
-            params = (title, transcript, date_published,
-                      publisher, reference_image, publisher_political_orientation, country, platform, content_id)
-            self.execute_query(query, params)
-            self.logger.info(f"Scraped content_id = {content_id}")
-        except sqlite3.IntegrityError as e:
-            self.logger.error(f"Error scraping content_id = {content_id}. Error: {e}")
-        finally:
-            self.close()
+            with self.pool.transaction():
+                # Orientation and country are read from publisher_options, 'Unknown' until edited
+                self.add_publisher_in_publisher_options(result.publisher)
 
-    def process_content_id(self, content_id):
-        """Process the content_id to update the duration in the database."""
-        try:
-            self.connect()
-            # Get the transcript from the database
-            transcript_query = "SELECT transcript FROM library WHERE content_id = ?"
-            transcript_result = self.query(transcript_query, (content_id,))
-
-            # Ensure that a transcript was found
-            if transcript_result:
-                # Assuming transcript is the first column
-                transcript = transcript_result[0][0]
-
-                # Get the duration processor and analyse the transcript
-                duration_processor = get_processor('duration')
-                duration_in_minutes = duration_processor.analyse_duration(
-                    transcript)
-
-                # summarisation_processor = get_processor('summarisation')
-                # summary, sentiment_analysis = summarisation_processor.process_text(
-                #     transcript)
-                
-                summarisation_processor = get_processor('openai_summarisation')
-                summary = summarisation_processor.process_text(
-                    transcript)
-                
-                sentiment_analysis = 0
-
-                # Update the duration in the database
+                # A duration the page states is kept; analyse_content_id only estimates missing ones
                 query = '''
                 UPDATE library
-                SET duration = ?, summary = ?, sentiment_analysis = ?
+                SET title = ?, date_published = ?,
+                publisher = ?, reference_image = ?, platform = ?, duration = COALESCE(?, duration)
                 WHERE content_id = ?
                 '''
-                params = (duration_in_minutes, summary,
-                          sentiment_analysis, content_id)
+                params = (result.title, result.date_published, result.publisher, result.reference_image,
+                          platform, result.duration, content_id)
                 self.execute_query(query, params)
-                self.logger.info(f"Processed content_id = {content_id}")
-            else:
-                print(f"No transcript found for content_id {content_id}")
+                self.store_transcript(content_id, result.transcript)
+            self.bump_write_generation()
+            self.logger.info(f"Scraped content_id = {content_id}")
+        except sqlite3.IntegrityError as e:
+            self.logger.error(f"Error scraping content_id = {content_id}. Error: {e}")
 
-        except sqlite3.Error as e:
-            self.logger.error(f"Error processing content_id = {content_id}. Error: {e}")
+    def fetch_matching_summary(self, content_id):
+        """
+        The summary of another content_id whose transcript is identical to this
+        one's, and that content_id, or (None, None) if none has been summarised.
+        """
+        rows = self.query('''
+        SELECT library.content_id, library.summary FROM library_content
+        JOIN library ON library.content_id = library_content.content_id
+        WHERE library_content.transcript_hash = (
+            SELECT transcript_hash FROM library_content WHERE content_id = ?)
+        AND library_content.content_id != ? AND COALESCE(library.summary, '') != ''
+        LIMIT 1
+        ''', (content_id, content_id))
+        return rows[0] if rows else (None, None)
+
+    def summarise_content_id(self, content_id):
+        """
+        Summarise the stored transcript of a content_id, raising if there is none to
+        summarise. A summary already made of an identical transcript is reused.
+        """
+        transcript = self.fetch_transcript(content_id)
+        if not transcript:
+            raise RuntimeError(f"No transcript found for content_id {content_id}")
+
+        source, summary = self.fetch_matching_summary(content_id)
+        if summary:
+            self.execute_query("UPDATE library SET summary = ?, summary_preview = ? WHERE content_id = ?",
+                               (summary, make_summary_preview(summary), content_id))
+            self.bump_write_generation()
+            self.logger.info(f"Reused the summary of {source} for content_id = {content_id}")
+            return
+
+        # summarisation_processor = get_processor('summarisation')
+        # summary, sentiment_analysis = summarisation_processor.process_text(
+        #     transcript)
+
+        summarisation_processor = get_processor('openai_summarisation')
+        summary = summarisation_processor.process_text(transcript)
+        if not summary:
+            raise RuntimeError(f"No summary was produced for {content_id}")
+
+        query = '''
+        UPDATE library
+        SET summary = ?, summary_preview = ?
+        WHERE content_id = ?
+        '''
+        self.execute_query(query, (summary, make_summary_preview(summary), content_id))
+        self.bump_write_generation()
+        self.logger.info(f"Summarised content_id = {content_id}")
+
+    def analyse_content_id(self, content_id):
+        """
+        Work out the sentiment of a content_id from its stored transcript, and its
+        duration unless the scraper read the real one from the page.
+        """
+        transcript = self.fetch_transcript(content_id)
+        if not transcript:
+            raise RuntimeError(f"No transcript found for content_id {content_id}")
+
+        # Get the duration processor and analyse the transcript
+        duration_processor = get_processor('duration')
+        duration_in_minutes = duration_processor.analyse_duration(transcript)
+        sentiment_analysis = 0
+
+        query = '''
+        UPDATE library
+        SET duration = COALESCE(NULLIF(duration, ''), ?), sentiment_analysis = ?
+        WHERE content_id = ?
+        '''
+        self.execute_query(query, (duration_in_minutes, sentiment_analysis, content_id))
+        self.bump_write_generation()
+        self.logger.info(f"Analysed content_id = {content_id}")
+
+    def process_content_id(self, content_id):
+        """Summarise and analyse the content_id, logging rather than raising errors."""
+        try:
+            self.summarise_content_id(content_id)
+            self.analyse_content_id(content_id)
+            self.logger.info(f"Processed content_id = {content_id}")
         except Exception as e:
             self.logger.error(f"Error processing content_id = {content_id}. Error: {e}")
-        finally:
-            self.close()
 
-    def fetch_filtered_data(self, filters):
-        """Fetch filtered data from the database."""
-        base_query = "SELECT * FROM library WHERE 1=1"
+    def scrape_stage(self, content_id):
+        """The 'scraped' stage: scrape_content_id logs its errors, so check that a transcript was stored."""
+        self.scrape_content_id(content_id)
+        if not self.fetch_transcript(content_id):
+            raise RuntimeError(f"No transcript was scraped for {content_id}")
+
+    def update_content_id(self, content_id):
+        """
+        Run the stages of one content_id that aren't done yet, in PIPELINE_STAGES
+        order, recording each outcome in pipeline_state. The first failure is
+        recorded and raised, and a later sweep resumes from that stage, so a failed
+        summary never costs another scrape.
+        """
+        stages = {
+            'scraped': self.scrape_stage,
+            'summarised': self.summarise_content_id,
+            'analysed': self.analyse_content_id,
+        }
+        state = self.fetch_pipeline_state(content_id)
+        for stage in PIPELINE_STAGES:
+            if state.get(stage, {}).get('status') == 'done':
+                continue
+            try:
+                stages[stage](content_id)
+            except Exception as e:
+                self.record_stage_failure(content_id, stage, e)
+                raise
+            self.record_stage_done(content_id, stage)
+
+    def build_filter_conditions(self, filters):
+        """Translate the dashboard filters into SQL conditions and their parameters."""
         params = []
         query_parts = []
 
@@ -305,9 +1067,18 @@ class DBManager:
             params.extend(filters['platforms'])
 
         if 'countries' in filters and filters['countries']:
-            placeholders = ','.join(['?' for _ in filters['countries']])
-            query_parts.append(f"country IN ({placeholders})")
-            params.extend(filters['countries'])
+            # Country belongs to the publisher: match the publishers of those countries,
+            # which lets idx_library_publisher answer the query.
+            countries = [country for country in filters['countries'] if country != 'Unknown']
+            conditions = []
+            if countries:
+                placeholders = ','.join(['?' for _ in countries])
+                conditions.append(
+                    f"publisher IN (SELECT publisher FROM publisher_options WHERE country IN ({placeholders}))")
+                params.extend(countries)
+            if len(countries) < len(filters['countries']):
+                conditions.append(f"{FIELD_EXPRESSIONS['country']} = 'Unknown'")
+            query_parts.append(f"({' OR '.join(conditions)})")
 
         if 'macro_topics' in filters and filters['macro_topics']:
             placeholders = ','.join(['?' for _ in filters['macro_topics']])
@@ -322,74 +1093,322 @@ class DBManager:
             query_parts.append("date_published BETWEEN ? AND ?")
             params.extend([filters['datePublishedRange']['start'], filters['datePublishedRange']['end']])
 
+        return query_parts, params
+
+    def resolve_fields(self, fields=None):
+        """Validate a requested projection, falling back to DEFAULT_FIELDS."""
+        if not fields:
+            return list(DEFAULT_FIELDS)
+        if not isinstance(fields, (list, tuple)) or not all(isinstance(field, str) for field in fields):
+            raise ValueError("fields must be a list of column names")
+        unknown = [field for field in fields if field not in LIBRARY_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(map(str, unknown))}")
+        return list(dict.fromkeys(fields))
+
+    def select_list(self, fields):
+        """Render resolved fields as a select list over library."""
+        return ', '.join(
+            f"{FIELD_EXPRESSIONS[field]} AS {field}" if field in FIELD_EXPRESSIONS else f"library.{field}"
+            for field in fields)
+
+    def build_filtered_query(self, filters, fields=None):
+        """Build the projected, filtered library query and its parameters."""
+        columns = self.select_list(self.resolve_fields(fields))
+        base_query = f"SELECT {columns} FROM library WHERE 1=1"
+        query_parts, params = self.build_filter_conditions(filters)
+
         if query_parts:
             full_query = f"{base_query} AND {' AND '.join(query_parts)}"
         else:
             full_query = base_query
+        return full_query, params
+
+    def fetch_filtered_data(self, filters, fields=None):
+        """Fetch the requested fields of the filtered library rows."""
+        full_query, params = self.build_filtered_query(filters, fields)
 
         # Fetch the filtered data
         return self.execute_query_fetchall(full_query, params)
 
+    def iter_filtered_data(self, filters, fields=None, batch_size=500):
+        """Yield the filtered library rows in lists of at most ``batch_size`` dicts."""
+        # Build the query eagerly so invalid fields raise here rather than mid-stream.
+        full_query, params = self.build_filtered_query(filters, fields)
+        return self.iter_query_batches(full_query, params, batch_size)
+
+    def iter_query_batches(self, query, params, batch_size=500):
+        """
+        Execute a query and yield its rows in lists of at most ``batch_size`` dicts.
+
+        The cursor is drained with fetchmany, so only one batch is held in memory
+        at a time. A pooled connection stays checked out until the generator is
+        exhausted or closed.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(columns, row)) for row in rows]
+
+    def search_library(self, text, filters=None, limit=50, offset=0, fields=None):
+        """
+        Full-text search over titles, summaries and transcripts, ranked by bm25.
+
+        Each result has the requested fields plus ``rank`` (lower is better) and a
+        ``snippet`` of the best matching column with the hits wrapped in <mark>.
+        The dashboard filters narrow the results in the same query. A malformed
+        query raises ValueError; database errors are raised as they are.
+        """
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 0 < limit <= MAX_SEARCH_RESULTS:
+            raise ValueError(f"limit must be an integer between 1 and {MAX_SEARCH_RESULTS}")
+        if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+            raise ValueError("offset must be a non-negative integer")
+
+        columns = self.select_list(self.resolve_fields(fields))
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        query_parts, params = self.build_filter_conditions(filters or {})
+        query_parts.insert(0, "library_fts MATCH ?")
+        params.insert(0, to_fts_query(text))
+
+        query = f'''
+        SELECT {columns},
+               bm25(library_fts, {weights}) AS rank,
+               snippet(library_fts, -1, '<mark>', '</mark>', '...', 24) AS snippet
+        FROM library_fts
+        JOIN library ON library.rowid = library_fts.rowid
+        WHERE {' AND '.join(query_parts)}
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+        '''
+        params.extend([limit, offset])
+        # Unlike execute_query_fetchall, errors are raised: a failed search isn't "no results"
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.execute(query, params)
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            if str(e).startswith(FTS_QUERY_ERRORS):
+                raise ValueError(f"Invalid search query: {e}") from e
+            raise
+        return [dict(zip(columns, row)) for row in rows]
+
+    def build_page_query(self, filters, limit, cursor=None, sort='-date_added', fields=None):
+        """
+        Build the keyset-paginated query for fetch_filtered_page.
+
+        ``sort`` is one of SORT_KEYS, optionally prefixed with '-' for descending
+        order. Rows are ordered by (sort column, content_id) and ``cursor`` marks
+        the last row already returned. SQLite sorts NULLs first, so ascending pages
+        start with the rows that have no date and descending pages end with them.
+        """
+        if not isinstance(sort, str):
+            raise ValueError("sort must be a string such as '-date_added'")
+        descending = sort.startswith('-')
+        column = sort.lstrip('-')
+        if column not in SORT_KEYS:
+            raise ValueError(f"Unsupported sort key: {column}")
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 0 < limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be an integer between 1 and {MAX_PAGE_SIZE}")
+
+        # The cursor is built from the sort column and content_id, so always select them.
+        columns = self.resolve_fields(fields)
+        for required in ('content_id', column):
+            if required not in columns:
+                columns.append(required)
+
+        query_parts, params = self.build_filter_conditions(filters)
+
+        if cursor:
+            cursor_sort, value, content_id = decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValueError("Cursor does not match the requested sort")
+            if descending and value is None:
+                query_parts.append(f"({column} IS NULL AND content_id < ?)")
+                params.append(content_id)
+            elif descending:
+                query_parts.append(
+                    f"({column} < ? OR ({column} = ? AND content_id < ?) OR {column} IS NULL)")
+                params.extend([value, value, content_id])
+            elif value is None:
+                query_parts.append(
+                    f"(({column} IS NULL AND content_id > ?) OR {column} IS NOT NULL)")
+                params.append(content_id)
+            else:
+                query_parts.append(f"({column} > ? OR ({column} = ? AND content_id > ?))")
+                params.extend([value, value, content_id])
+
+        direction = 'DESC' if descending else 'ASC'
+        where = f"WHERE {' AND '.join(query_parts)}" if query_parts else ""
+        # Fetch one extra row to learn whether another page follows.
+        query = (f"SELECT {self.select_list(columns)} FROM library {where} "
+                 f"ORDER BY {column} {direction}, content_id {direction} LIMIT ?")
+        params.append(limit + 1)
+        return query, params
+
+    def fetch_filtered_page(self, filters, limit, cursor=None, sort='-date_added', fields=None):
+        """Fetch one keyset-paginated page of filtered data and the cursor of the next page."""
+        query, params = self.build_page_query(filters, limit, cursor, sort, fields)
+        rows = self.execute_query_fetchall(query, params)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort, last[sort.lstrip('-')], last['content_id'])
+        return rows, next_cursor
+
+    def build_aggregate_query(self, filters, dimensions=tuple(AGGREGATE_DIMENSIONS)):
+        """
+        Build a query grouping the filtered library rows by each of ``dimensions``,
+        returning rows in the layout of library_rollups.
+        """
+        query_parts, params = self.build_filter_conditions(filters)
+        where = f"WHERE {' AND '.join(query_parts)}" if query_parts else ""
+        duration = DURATION_EXPRESSION.format(row='filtered')
+        selects = [
+            f"SELECT '{dimension}', "
+            f"COALESCE({AGGREGATE_DIMENSIONS[dimension].format(row='filtered')}, '{UNKNOWN_GROUP}') AS value, "
+            f"COUNT(*), COUNT({duration}), COALESCE(SUM({duration}), 0), "
+            f"COUNT(filtered.sentiment_analysis), COALESCE(SUM(filtered.sentiment_analysis), 0) "
+            f"FROM filtered GROUP BY value"
+            for dimension in dimensions
+        ]
+        # The filtered rows are read once into the CTE and grouped once per dimension.
+        columns = self.select_list([*ROLLUP_SOURCE_COLUMNS,
+                                    *(field for field in PUBLISHER_FIELDS if field in dimensions)])
+        query = (f"WITH filtered AS MATERIALIZED (SELECT {columns} "
+                 f"FROM library {where}) {' UNION ALL '.join(selects)}")
+        return query, params
+
+    def result_etag(self, key, generation=None):
+        """
+        A strong ETag for the result of ``key`` at a write generation, by default the
+        current one. It changes whenever the library is written to, from this process
+        or another, or the process restarts.
+        """
+        if generation is None:
+            generation = self.current_generation()
+        raw = f"{self.instance_id}:{generation}:{key}".encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()[:32]
+
+    def cached_result(self, key, produce, generation=None):
+        """
+        Return the serialised result for ``key`` from the result cache, or compute it
+        with ``produce()`` and cache it. ``produce`` returns the body bytes, or None
+        for a result that should not be cached. Callers deriving several entries from
+        one result pass the ``generation`` they read before computing it.
+        """
+        # Read the generation first: if a write commits while produce() runs, the
+        # entry is stored under the old generation and is never served.
+        if generation is None:
+            generation = self.current_generation()
+        body = self.result_cache.get(key, generation)
+        if body is None:
+            body = produce()
+            if body is not None:
+                self.result_cache.put(key, generation, body)
+        return body
+
+    def fetch_aggregates(self, filters):
+        """
+        Counts, total and average duration and average sentiment of the filtered library,
+        grouped by each of AGGREGATE_DIMENSIONS. Without filters they are read from
+        library_rollups; with filters they are computed from the matching rows.
+        """
+        query_parts, _ = self.build_filter_conditions(filters)
+        if query_parts:
+            rows = self.query(*self.build_aggregate_query(filters))
+        else:
+            rows = self.query(rollup_read_sql())
+        return format_aggregates(rows)
+
+    def fetch_transcript(self, content_id):
+        """Fetch the full transcript of a single content_id, or None if it doesn't exist."""
+        rows = self.query(f"SELECT {FIELD_EXPRESSIONS['transcript']} FROM library WHERE content_id = ?",
+                          (content_id,))
+        if not rows:
+            return None
+        return rows[0][0] or ''
+
+    def store_transcript(self, content_id, transcript):
+        """Compress and store the transcript of a content_id; an empty transcript removes it."""
+        if not transcript:
+            self.execute_query("DELETE FROM library_content WHERE content_id = ?", (content_id,))
+            self.bump_write_generation()
+            return
+        self.execute_query(
+            UPSERT_CONTENT_SQL,
+            (content_id, DEFAULT_CODEC, len(transcript.encode('utf-8')), compress_text(transcript),
+             transcript_hash(transcript)))
+        self.bump_write_generation()
+
     def execute_query_fetchall(self, query, params):
         """Execute a query and fetch all results."""
         data_dicts = []
         try:
-            self.connect()
-            cursor = self.conn.cursor()
-            cursor.execute(query, params)
-            columns = [column[0] for column in cursor.description]
-            data = cursor.fetchall()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                columns = [column[0] for column in cursor.description]
+                data = cursor.fetchall()
             data_dicts = [dict(zip(columns, row)) for row in data]
         except sqlite3.Error as e:
-            print(f"Database error: {e}")
-        finally:
-            self.close()
+            self.logger.error(f"Database error: {e}")
         return data_dicts
 
     def fetch_publisher_options(self):
         """Fetch all publisher options from the database."""
         try:
-            self.connect()
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT publisher, publisher_political_orientation, country FROM publisher_options")
+            data = self.query(
+                "SELECT publisher, publisher_political_orientation, country FROM publisher_options")
             columns = ['publisher', 'publisher_political_orientation', 'country']
-            data = cursor.fetchall()
             # Create a list of dictionaries, each representing a row from the publisher_options table
             data_dicts = [dict(zip(columns, row)) for row in data]
             return data_dicts
         except Exception as e:
             self.logger.error(f"Error fetching publisher options. Error: {e}")
             return []
-        finally:
-            self.close()
 
     def edit_publisher_option(self, publisher, publisher_political_orientation, country):
         """Update a publisher's political orientation and country in the database."""
         try:
-            # Update the publisher_options table
-            query_publisher_options = '''
-            UPDATE publisher_options
-            SET publisher_political_orientation = ?, country = ?
-            WHERE publisher = ?
-            '''
-            self.execute_query(query_publisher_options, (publisher_political_orientation, country, publisher))
-            self.logger.info(f"Updated publisher options for {publisher}")
-
-            # Update the library table
-            query_library = '''
-            UPDATE library
-            SET publisher_political_orientation = ?, country = ?
-            WHERE publisher = ?
-            '''
-            self.execute_query(query_library, (publisher_political_orientation, country, publisher))
-            self.logger.info(f"Updated library entries for publisher {publisher}")
+            self.edit_publisher_options([{
+                'publisher': publisher,
+                'publisher_political_orientation': publisher_political_orientation,
+                'country': country,
+            }])
         except sqlite3.Error as e:
             self.logger.error(f"Error updating publisher option for {publisher}. Error: {e}")
 
+    def edit_publisher_options(self, updates):
+        """
+        Update the political orientation and country of many publishers in one
+        transaction: either every update is applied or none is. Library rows read
+        these through publisher_options, so no library row is rewritten. Returns
+        the number of publishers updated.
+        """
+        query = '''
+        UPDATE publisher_options
+        SET publisher_political_orientation = ?, country = ?
+        WHERE publisher = ?
+        '''
+        params = [(update.get('publisher_political_orientation'), update.get('country'), update.get('publisher'))
+                  for update in updates]
+        with self.pool.transaction() as conn:
+            updated = max(conn.executemany(query, params).rowcount, 0)
+        self.bump_write_generation()
+        self.logger.info(f"Updated publisher options for {updated} of {len(params)} publishers")
+        return updated
+
 
 # if __name__ == '__main__':
 #     db_manager = DBManager('generic_database.db')
-#     db_manager.connect()
 #     db_manager.create_library_table()
 #     db_manager.create_publisher_options_table()
 #     db_manager.close()
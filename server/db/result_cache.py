@@ -0,0 +1,100 @@
+"""
+This module contains the ResultCache class, an in-process LRU cache for serialised
+query responses. Every entry is stored with the DBManager write generation it was
+computed at, and is only served while that generation is still current, so any
+committed write invalidates the whole cache without having to track which entries
+it affects.
+"""
+
+# db/result_cache.py
+
+import json
+import threading
+from collections import OrderedDict
+
+
+def normalise_filters(filters):
+    """
+    Reduce a filter dict to a canonical form for use in cache keys: empty filters
+    are dropped and the values of list filters are de-duplicated and sorted, since
+    neither changes the result.
+    """
+    normalised = {}
+    for name, value in (filters or {}).items():
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = sorted(set(map(str, value)))
+        normalised[name] = value
+    return normalised
+
+
+def make_cache_key(*parts):
+    """Build a cache key from JSON-serialisable parts."""
+    return json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class ResultCache:
+    """
+    A thread-safe LRU cache of response bytes, bounded by their total size.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (generation, body)
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, generation):
+        """Return the cached body for key if it was stored at ``generation``, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                # Written before the last database write; it can never be served again.
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, generation, body):
+        """Store a body computed at ``generation``, evicting the least recently used entries."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (generation, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, body = self._entries.pop(key)
+        self.size -= len(body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Hit and miss counts and current size, for sizing max_bytes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self.size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,232 @@
+"""
+This module contains the JobQueue class which runs long operations, such as the
+scrape-and-summarise sweep behind /update-narratives-database, on a worker pool
+inside the server process. A request enqueues a job and returns its ID straight
+away; /jobs/<id> then reports per-item progress, throughput, ETA and errors.
+"""
+
+# job_queue.py
+
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+ITEM_STATUSES = ('pending', 'running', 'done', 'failed')
+
+
+class Job:
+    """
+    A named batch of items processed by ``concurrency`` JobQueue workers. Items can
+    be added while the job runs; each item is processed at most once.
+
+    With ``limits`` (an object with ``host_of(item)`` and ``limit(host)``, such as
+    scraper.utils.host_limits.HostLimits) no more than ``limit(host)`` items of one
+    host run at a time. Workers skip over items of a host that is at its cap, so
+    one slow site doesn't hold up the others.
+    """
+
+    def __init__(self, kind, process_item, concurrency=1, limits=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.process_item = process_item
+        self.concurrency = concurrency
+        self.limits = limits
+        self.running_by_host = Counter()
+        self.status = 'queued'  # queued -> running -> completed | failed
+        self.items = OrderedDict()  # item -> {"status": ..., "error": ...}
+        self.pending = deque()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.finished = threading.Event()  # Set once the job has completed or failed
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # Notified when an item is added or finishes
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def add_items(self, items):
+        """Queue the items not already part of the job. Returns how many were added."""
+        added = 0
+        for item in items:
+            if item not in self.items:
+                self.items[item] = {"status": 'pending', "error": None}
+                self.pending.append(item)
+                added += 1
+        if added:
+            self._changed.notify_all()  # Callers hold the job lock
+        return added
+
+    def host_of(self, item):
+        return self.limits.host_of(item) if self.limits else None
+
+    def take_ready_item(self):
+        """Remove and return the first pending item whose host is below its limit."""
+        for index, item in enumerate(self.pending):
+            host = self.host_of(item)
+            if host is None or self.running_by_host[host] < self.limits.limit(host):
+                del self.pending[index]
+                return item
+        return None
+
+    def next_item(self):
+        """
+        Take the next item that may run now, waiting while every pending item's host
+        is at its limit or while other workers may still add to the job. Returns None
+        when the job is over; the last worker out marks it completed.
+        """
+        with self._changed:
+            while self.active:
+                item = self.take_ready_item()
+                if item is not None:
+                    self.items[item]['status'] = 'running'
+                    self.running_by_host[self.host_of(item)] += 1
+                    return item
+                if not self.pending and not self.running_by_host.total():
+                    self.status = 'completed'
+                    self.finished_at = time.time()
+                    self.finished.set()
+                    self._changed.notify_all()
+                    break
+                self._changed.wait()
+            return None
+
+    def finish_item(self, item, error=None):
+        with self._changed:
+            self.items[item] = {"status": 'failed' if error else 'done', "error": error}
+            self.running_by_host[self.host_of(item)] -= 1
+            self._changed.notify_all()
+
+    def fail(self, error):
+        """Stop the job after an unexpected error; idle workers wake up and exit."""
+        with self._changed:
+            self.status = 'failed'
+            self.error = error
+            self.finished_at = time.time()
+            self.finished.set()
+            self._changed.notify_all()
+
+    def to_dict(self, include_items=True):
+        """Progress report: counts per status, throughput in items per second, ETA and errors."""
+        with self._lock:
+            counts = {status: 0 for status in ITEM_STATUSES}
+            for state in self.items.values():
+                counts[state['status']] += 1
+            finished = counts['done'] + counts['failed']
+            remaining = counts['pending'] + counts['running']
+            elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+            throughput = finished / elapsed if elapsed > 0 else None
+            report = {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "error": self.error,
+                "total": len(self.items),
+                **counts,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_seconds": elapsed,
+                "throughput": throughput,
+                "concurrency": self.concurrency,
+                "running_by_host": {host: count for host, count in self.running_by_host.items()
+                                    if host is not None and count},
+                "eta_seconds": remaining / throughput if throughput and self.active else None,
+                "errors": [{"item": item, "error": state['error']}
+                           for item, state in self.items.items() if state['status'] == 'failed'],
+            }
+            if include_items:
+                report["items"] = [{"item": item, **state} for item, state in self.items.items()]
+            return report
+
+
+class JobQueue:
+    """
+    Runs jobs on a small thread pool. Submitting a kind of job while one of the
+    same kind is queued or running coalesces into it: the new items are appended
+    to the running job rather than processed a second time by another one.
+    """
+
+    def __init__(self, max_workers=2, keep_finished=50):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.keep_finished = keep_finished
+        self.jobs = OrderedDict()  # id -> Job, oldest first
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def submit(self, kind, items, process_item, concurrency=1, limits=None):
+        """
+        Enqueue ``process_item(item)`` for every item under a job of ``kind``, run by
+        ``concurrency`` workers within the per-host ``limits`` (see Job).
+        Returns (job, coalesced), where coalesced is True if a running job was reused.
+        """
+        with self._lock:
+            job = self.active_job(kind)
+            if job is not None:
+                with job._lock:
+                    # Re-check under the job lock: the worker may have just finished it
+                    if job.active:
+                        added = job.add_items(items)
+                        self.logger.info(f"Coalesced {kind} request into job {job.id} ({added} new items)")
+                        return job, True
+
+            job = Job(kind, process_item, concurrency, limits)
+            with job._lock:
+                job.add_items(items)
+            self.jobs[job.id] = job
+            self.prune()
+        self.executor.submit(self.run, job)
+        self.logger.info(f"Queued {kind} job {job.id} with {len(job.items)} items")
+        return job, False
+
+    def active_job(self, kind):
+        for job in reversed(self.jobs.values()):
+            if job.kind == kind and job.active:
+                return job
+        return None
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def prune(self):
+        """Forget the oldest finished jobs beyond keep_finished."""
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self.jobs[job_id]
+
+    def run(self, job):
+        """Run a job on its own ``job.concurrency`` worker threads and wait for it to finish."""
+        with job._lock:
+            job.status = 'running'
+            job.started_at = time.time()
+        with ThreadPoolExecutor(max_workers=job.concurrency, thread_name_prefix=f'job-{job.kind}') as workers:
+            for _ in range(job.concurrency):
+                workers.submit(self.work, job)
+        if job.status == 'completed':
+            self.logger.info(f"Job {job.id} completed: {job.to_dict(include_items=False)['done']} items done")
+
+    def work(self, job):
+        """Worker: process the job's items until it is over."""
+        try:
+            while True:
+                item = job.next_item()
+                if item is None:
+                    break
+                try:
+                    job.process_item(item)
+                    job.finish_item(item)
+                except Exception as e:
+                    self.logger.error(f"Job {job.id}: error processing {item}. Error: {e}")
+                    job.finish_item(item, str(e))
+        except Exception as e:
+            job.fail(str(e))
+            self.logger.error(f"Job {job.id} failed. Error: {e}")
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
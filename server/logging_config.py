@@ -23,9 +23,13 @@ def setup_logging(environment):
         'DBManager': {'filename': 'logs/DBManager.log', 'level': logging.INFO},
         'Summariser': {'filename': 'logs/Summariser.log', 'level': logging.INFO},
         'OpenAISummariser': {'filename': 'logs/OpenAISummariser.log', 'level': logging.INFO},
+        'TokenChunker': {'filename': 'logs/TokenChunker.log', 'level': logging.INFO},
         'BBCScraper': {'filename': 'logs/BBCScraper.log', 'level': logging.INFO},
         'CNBCScraper': {'filename': 'logs/CNBCScraper.log', 'level': logging.INFO},
         'YouTubeScraper': {'filename': 'logs/YouTubeScraper.log', 'level': logging.INFO},
+        'ScrapingUtils': {'filename': 'logs/ScrapingUtils.log', 'level': logging.INFO},
+        'GenericScraper': {'filename': 'logs/GenericScraper.log', 'level': logging.INFO},
+        'ScraperRegistry': {'filename': 'logs/ScraperRegistry.log', 'level': logging.INFO},
         'OpenAIChatbot': {'filename': 'logs/OpenAIChatbot.log', 'level': logging.INFO}
     }
 
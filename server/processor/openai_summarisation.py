@@ -7,12 +7,34 @@ This...
 import logging
 import openai
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from .response_cache import get_response_cache, request_key
+from .token_chunker import chunk_by_tokens, get_token_counter
+
+# Chunk summaries are requested in parallel on one pool shared by every summariser,
+# so the items an update job processes at once draw on the same bounded set of
+# OpenAI calls rather than each opening their own.
+MAP_CONCURRENCY = 8
+summary_executor = ThreadPoolExecutor(max_workers=MAP_CONCURRENCY, thread_name_prefix='openai-summary')
+
+SUMMARY_MODEL = "gpt-3.5-turbo"
+MODEL_CONTEXT_TOKENS = {'gpt-3.5-turbo': 16385}
+DEFAULT_CONTEXT_TOKENS = 4096  # For models missing from MODEL_CONTEXT_TOKENS
+# Share of the model context each chunk may fill; the rest is left for the prompt and the summary
+CHUNK_CONTEXT_FRACTION = 0.5
 
 class OpenAISummariser:
-    def __init__(self, db_path='narratives.db'):
+    def __init__(self, db_path='narratives.db', executor=None, model=SUMMARY_MODEL,
+                 context_fraction=CHUNK_CONTEXT_FRACTION, cache=None):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.api_key = self.load_api_key_from_db(db_path)
         self.client = openai.OpenAI(api_key=self.api_key)
+        self.executor = executor or summary_executor
+        self.model = model
+        self.count_tokens = get_token_counter(model)
+        self.max_chunk_tokens = int(MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS) * context_fraction)
+        # Completions are served from the response cache when one is configured
+        self.cache = cache or get_response_cache()
 
     def load_api_key_from_db(self, db_path):
         try:
@@ -30,57 +52,63 @@ class OpenAISummariser:
             self.logger.error(f"Failed to load API key from database: {e}")
             raise
 
-    def chunk_text(self, text, max_chunk_size=1000):
-        """Splits the text into manageable chunks."""
-        words = text.split()
-        chunks = []
-        current_chunk = []
-        current_length = 0
-
-        for word in words:
-            if current_length + len(word) > max_chunk_size:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_length = len(word)
-            else:
-                current_chunk.append(word)
-                current_length += len(word) + 1  # Include space
-
-        # Add the last chunk if it contains any words
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        
-        return chunks
+    def chunk_text(self, text, max_chunk_tokens=None):
+        """
+        Splits the text into chunks of at most max_chunk_tokens tokens of the model,
+        by default the model's share of context for a chunk, on sentence boundaries.
+        """
+        return chunk_by_tokens(text, max_chunk_tokens or self.max_chunk_tokens, self.count_tokens)
 
-    def recursive_summarize(self, text, instructions, temperature=0.3, max_tokens=1000):
-        """Recursively summarizes the text to achieve a more concise summary."""
+    def recursive_summarize(self, text, instructions, temperature=0.3, max_tokens=1000, use_cache=True):
+        """
+        Recursively summarizes the text to achieve a more concise summary. An identical
+        request answered before is served from the response cache unless use_cache is False.
+        """
         conversation = [
             {"role": "system", "content": "You are a highly knowledgeable assistant."},
             {"role": "user", "content": instructions.format(text=text)}
         ]
+        parameters = dict(temperature=temperature, max_tokens=max_tokens, n=1, stop=None)
+        cache = self.cache if use_cache else None
+        if cache:
+            key = request_key(self.model, conversation, **parameters)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
         response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
+            model=self.model,
             messages=conversation,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            n=1,
-            stop=None
+            **parameters
         )
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        if cache and content:
+            cache.put(key, self.model, content)
+        return content
 
-    def process_text(self, text, temperature=0.5, initial_max_tokens=300, final_max_tokens=1000):
+    def summarize_chunks(self, chunks, temperature, max_tokens, use_cache=True):
+        """
+        Summarise each chunk on the shared executor, returning the summaries in chunk
+        order. If one fails, the chunks not yet started are cancelled and the error raised.
+        """
+        futures = [self.executor.submit(self.recursive_summarize, chunk, "Summarize the following text: {text}",
+                                        temperature, max_tokens, use_cache)
+                   for chunk in chunks]
         try:
-            chunks = self.chunk_text(text)
-            summaries = []
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
 
-            for chunk in chunks:
-                summary = self.recursive_summarize(chunk, "Summarize the following text: {text}", temperature, initial_max_tokens)
-                summaries.append(summary)
+    def process_text(self, text, temperature=0.5, initial_max_tokens=300, final_max_tokens=1000, use_cache=True):
+        try:
+            chunks = self.chunk_text(text)
+            summaries = self.summarize_chunks(chunks, temperature, initial_max_tokens, use_cache)
 
             combined_summary = ' '.join(summaries)
 
             # final_summary = self.recursive_summarize(combined_summary, "Summarize this text to about 500 words: {text}", temperature, final_max_tokens)
-            final_summary = self.recursive_summarize(combined_summary, "Summarizes this text to about 500 words focusing on the main theme, key points, author's sentiment, and conclusions. Includes: 1. Intro Overview, highlighting video's main objective. 2. Key Points, summarizing main discussions. 3. Author's Sentiment, outlining the tone and viewpoint. 4. Conclusions, noting final thoughts and implications. --> {text}", temperature, final_max_tokens)
+            final_summary = self.recursive_summarize(combined_summary, "Summarizes this text to about 500 words focusing on the main theme, key points, author's sentiment, and conclusions. Includes: 1. Intro Overview, highlighting video's main objective. 2. Key Points, summarizing main discussions. 3. Author's Sentiment, outlining the tone and viewpoint. 4. Conclusions, noting final thoughts and implications. --> {text}", temperature, final_max_tokens, use_cache)
 
             self.logger.info("Processed text")
             return final_summary
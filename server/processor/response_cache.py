@@ -0,0 +1,148 @@
+"""
+This module contains the ResponseCache class, an on-disk cache of OpenAI chat
+completions keyed by a hash of the request: the model, the messages and the
+sampling parameters. Summarising a transcript again, after a failed update or for
+duplicate content, then costs no requests for the prompts already answered.
+Completions expire after a TTL, and the least recently used are evicted once the
+cache outgrows its size cap.
+"""
+
+# processor/response_cache.py
+
+import hashlib
+import json
+import threading
+import time
+from db.connection_pool import ConnectionPool
+from db.content_codec import DEFAULT_CODEC, compress_text, decompress_text
+
+DEFAULT_TTL = 30 * 24 * 3600  # Seconds a completion is served for
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # Compressed bytes kept before evicting
+
+RESPONSE_CACHE_SQL = (
+    '''
+    CREATE TABLE IF NOT EXISTS responses (
+        request_hash TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        created_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses(accessed_at)',
+    'CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at)',
+)
+
+
+def request_key(model, messages, **parameters):
+    """The cache key of a chat completion request: a hash of everything that shapes the answer."""
+    request = json.dumps({"model": model, "messages": messages, "parameters": parameters},
+                         sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """A size-capped, least-recently-used cache of completion texts with a TTL."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.pool = ConnectionPool(path)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        with self.pool.transaction() as conn:
+            for statement in RESPONSE_CACHE_SQL:
+                conn.execute(statement)
+
+    def get(self, key):
+        """The cached completion for key, or None if there is none or it has expired."""
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT codec, data, created_at FROM responses WHERE request_hash = ?',
+                               (key,)).fetchone()
+        now = time.time()
+        if row is not None and now - row[2] >= self.ttl:
+            with self.pool.transaction() as conn:
+                conn.execute('DELETE FROM responses WHERE request_hash = ?', (key,))
+            self.count('expired')
+            row = None
+        if row is None:
+            self.count('misses')
+            return None
+        with self.pool.transaction() as conn:
+            conn.execute('UPDATE responses SET accessed_at = ? WHERE request_hash = ?', (now, key))
+        self.count('hits')
+        return decompress_text(row[0], row[1])
+
+    def put(self, key, model, text):
+        """Store the completion for key, then evict down to max_bytes."""
+        data = compress_text(text)
+        now = time.time()
+        with self.pool.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO responses (request_hash, model, codec, size, data, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (key, model, DEFAULT_CODEC, len(data), data, now, now))
+            self.evict(conn)
+
+    def total_size(self, conn):
+        return conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def evict(self, conn):
+        """Drop expired completions, then the least recently used ones until under max_bytes."""
+        conn.execute('DELETE FROM responses WHERE created_at <= ?', (time.time() - self.ttl,))
+        size = self.total_size(conn)
+        while size > self.max_bytes:
+            oldest = conn.execute(
+                'SELECT request_hash, size FROM responses ORDER BY accessed_at LIMIT 1').fetchone()
+            if oldest is None:
+                break
+            conn.execute('DELETE FROM responses WHERE request_hash = ?', (oldest[0],))
+            size -= oldest[1]
+
+    def clear(self):
+        with self.pool.transaction() as conn:
+            conn.execute('DELETE FROM responses')
+
+    def count(self, stat):
+        with self._stats_lock:
+            setattr(self, stat, getattr(self, stat) + 1)
+
+    def stats(self):
+        """Entry count, stored size and hit/miss/expiry counts."""
+        with self.pool.connection() as conn:
+            entries = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            size = self.total_size(conn)
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "expired": self.expired,
+            }
+
+    def close(self):
+        self.pool.close_all()
+
+
+_response_cache = None
+
+
+def configure_response_cache(path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+    """Set up the cache used by the summarisers. Without it, every prompt goes to OpenAI."""
+    global _response_cache
+    _response_cache = ResponseCache(path, ttl, max_bytes)
+    return _response_cache
+
+
+def get_response_cache():
+    """The cache configured with configure_response_cache, or None."""
+    return _response_cache
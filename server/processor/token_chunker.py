@@ -0,0 +1,80 @@
+"""
+This module contains the token-aware chunking used to split transcripts for
+summarisation. Text is measured in model tokens, exactly with tiktoken when it is
+installed and estimated from its length otherwise, and packed into chunks as full
+as a token budget allows, breaking between sentences and paragraphs.
+"""
+
+# processor/token_chunker.py
+
+import logging
+import math
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; token counts are estimated without it
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4  # Typical for English text with OpenAI's tokenizers
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+logger = logging.getLogger('TokenChunker')
+
+
+def estimate_tokens(text):
+    """An estimate of the number of tokens in text, for when tiktoken isn't available."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model):
+    """A function counting the tokens of a text for model: exact with tiktoken, estimated otherwise."""
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except Exception as e:  # An unknown model, or the encoding couldn't be downloaded
+            logger.warning(f"Estimating token counts, tiktoken has no encoding for {model}: {e}")
+        else:
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens
+
+
+def text_units(text, max_tokens, count_tokens):
+    """
+    Yield (unit, tokens, separator) for each sentence of text, or for each word of
+    a sentence longer than max_tokens. The separator is what joins the unit to the
+    one before it: a blank line at the start of a paragraph, otherwise a space.
+    """
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        separator = '\n\n'
+        for sentence in SENTENCE_BREAK.split(paragraph):
+            sentence = ' '.join(sentence.split())
+            if not sentence:
+                continue
+            tokens = count_tokens(sentence)
+            # Transcripts without punctuation arrive as one long "sentence"
+            for unit, unit_tokens in ([(sentence, tokens)] if tokens <= max_tokens else
+                                      ((word, count_tokens(word)) for word in sentence.split())):
+                yield unit, unit_tokens, separator
+                separator = ' '
+
+
+def chunk_by_tokens(text, max_tokens, count_tokens=estimate_tokens):
+    """
+    Split text into chunks of at most max_tokens tokens, each filled with as many
+    whole sentences as fit. A sentence is only split, between words, when it is
+    longer than a chunk. Whitespace within sentences is collapsed.
+    """
+    chunks, parts, used = [], [], 0
+    for unit, tokens, separator in text_units(text, max_tokens, count_tokens):
+        if parts and used + tokens + 1 > max_tokens:  # + 1 for the separator
+            chunks.append(''.join(parts))
+            parts, used = [], 0
+        parts.append(separator + unit if parts else unit)
+        used += tokens + (1 if len(parts) > 1 else 0)
+    if parts:
+        chunks.append(''.join(parts))
+    return chunks
@@ -0,0 +1,99 @@
+"""
+This module adds negotiated compression to the JSON responses of the Flask app.
+gzip is always available and brotli is used when the optional ``brotli`` package
+is installed. The encoding is picked from the request's Accept-Encoding, and only
+bodies above MIN_COMPRESS_SIZE are compressed. NDJSON streams are compressed
+chunk by chunk as they are written.
+"""
+
+# response_compression.py
+
+import gzip
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024  # Smaller bodies gain less than the headers and CPU cost
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Close to gzip's speed with noticeably smaller output
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson')
+
+# In order of preference when the client accepts several equally
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def negotiate_encoding():
+    """The best encoding the current request accepts, or None for identity."""
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def should_compress(body, encoding):
+    return encoding is not None and len(body) >= MIN_COMPRESS_SIZE
+
+
+def compress_body(body, encoding):
+    """Compress a complete response body."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress_stream(chunks, encoding):
+    """
+    Compress a streamed body. Each chunk is flushed as soon as it is compressed,
+    so the client can decode every chunk without waiting for the end of the stream.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    elif encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    else:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress_response(response):
+    """
+    after_request hook compressing JSON and NDJSON responses the client accepts
+    compressed. Responses that already set Content-Encoding, such as the cached
+    ones that store their compressed bytes, are left alone.
+    """
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or request.method == 'HEAD':
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        body = response.response
+        response.response = compress_stream(response.iter_encoded(), encoding)
+        if hasattr(body, 'close'):
+            # Still close the original stream, e.g. to return its pooled connection
+            response.call_on_close(body.close)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if not should_compress(body, encoding):
+            return response
+        response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Register response compression with a Flask app."""
+    app.after_request(compress_response)
@@ -1,20 +1,22 @@
 """
-This ...
+This module contains get_scraper, which picks the scraper for a content_id by its
+hostname from the scraper registry, falling back to the GenericScraper for sites
+without a scraper of their own.
 """
 
-from scraper.sources.bbc_scraper import BBCScraper
-from scraper.sources.cnbc_scraper import CNBCScraper
-from scraper.sources.youtube_scraper import YouTubeScraper
+# scraper\factory.py
+
+# Importing the site scrapers registers them
+from scraper.sources.bbc_scraper import BBCScraper  # noqa: F401
+from scraper.sources.cnbc_scraper import CNBCScraper  # noqa: F401
+from scraper.sources.youtube_scraper import YouTubeScraper  # noqa: F401
+from scraper.sources.generic_scraper import GenericScraper
+from scraper.registry import find_scraper, hostname_of
 # from scraper.sources.wikipedia_scraper import WikipediaScraper
 
 def get_scraper(content_id: str):
-    if "bbc.co.uk" in content_id:
-        return BBCScraper(content_id)
-    elif "cnbc.com" in content_id:
-        return CNBCScraper(content_id)
-    elif "youtube.com" in content_id:
-        return YouTubeScraper(content_id)
-    # elif "wikipedia.org" in content_id:
-    #     return WikipediaScraper(content_id)
-    else:
+    hostname = hostname_of(content_id)
+    if not hostname:
         raise ValueError("Unsupported URL")
+    scraper_class = find_scraper(hostname) or GenericScraper
+    return scraper_class(content_id)
@@ -0,0 +1,67 @@
+"""
+This module contains the scraper registry, which maps hostnames to the scraper
+classes for their sites. Scrapers in this package register themselves with the
+register_scraper decorator; scrapers in other installed packages are found
+through the ``narratives.scrapers`` entry point group, each entry point naming a
+hostname and pointing at its scraper class.
+"""
+
+# scraper\registry.py
+
+import logging
+import threading
+from importlib.metadata import entry_points
+from urllib.parse import urlsplit
+
+ENTRY_POINT_GROUP = 'narratives.scrapers'
+
+SCRAPERS = {}  # hostname -> scraper class
+_plugins_loaded = False
+_plugins_lock = threading.Lock()
+logger = logging.getLogger('ScraperRegistry')
+
+
+def register_scraper(*hostnames):
+    """
+    Class decorator registering a scraper for the given hostnames. A hostname also
+    covers its subdomains: 'bbc.co.uk' matches www.bbc.co.uk and m.bbc.co.uk.
+    """
+    def decorator(scraper_class):
+        for hostname in hostnames:
+            SCRAPERS[hostname.lower()] = scraper_class
+        return scraper_class
+    return decorator
+
+
+def load_plugins():
+    """Register the scrapers advertised by installed packages, once."""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    with _plugins_lock:
+        if _plugins_loaded:
+            return
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                SCRAPERS.setdefault(entry_point.name.lower(), entry_point.load())
+            except Exception as e:
+                logger.error(f"Could not load scraper plugin {entry_point.name} ({entry_point.value}): {e}")
+        _plugins_loaded = True
+
+
+def hostname_of(url):
+    return (urlsplit(url).hostname or '').lower()
+
+
+def find_scraper(hostname):
+    """
+    The scraper class registered for a hostname or the nearest parent domain, or
+    None. One dictionary lookup per label of the hostname.
+    """
+    load_plugins()
+    labels = hostname.split('.')
+    for start in range(len(labels)):
+        scraper_class = SCRAPERS.get('.'.join(labels[start:]))
+        if scraper_class is not None:
+            return scraper_class
+    return None
@@ -0,0 +1,138 @@
+"""
+This module defines the BaseScraper class, the common part of the site scrapers:
+fetching the page once through the page cache and reading the OpenGraph metadata
+most sites share. Site scrapers subclass it and override what their pages do
+differently, usually scrape_transcript and scrape_date_published. It also defines
+ScrapeResult, the record scrape() returns.
+"""
+
+# scraper\sources\base_scraper.py
+
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from scraper.utils.html_parser import ParsedPage
+from scraper.utils.scraping_utils import fetch_page
+
+
+@dataclass(slots=True)
+class ScrapeResult:
+    """Everything scraped from one content_id; a field is None when it wasn't found."""
+    content_id: str
+    title: str | None = None
+    transcript: str | None = None
+    date_published: str | None = None
+    publisher: str | None = None
+    reference_image: str | None = None
+    duration: float | None = None  # In minutes
+
+
+REQUIRED_FIELDS = ('title', 'transcript', 'date_published', 'publisher')  # Missing ones are logged
+
+
+class BaseScraper(ABC):
+    """
+    Fetches and parses one content_id. scrape() extracts every field at once; the
+    scrape_* methods read a single field, and return None, with a warning in the
+    log, when the page doesn't have what they look for. Subclasses
+    must implement scrape_transcript and scrape_date_published, which differ from
+    site to site.
+    """
+
+    def __init__(self, content_id):
+        self.content_id = content_id
+        self._page = None  # The fetched page, parsed on demand
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def get_page(self):
+        """Fetch the page, through the page cache, and return it as a ParsedPage."""
+        if not self._page:  # Check if the page has already been fetched
+            html = fetch_page(self.content_id)
+            if html:
+                self._page = ParsedPage(html)  # Cache the page
+            else:
+                self.logger.error(f"Failed to retrieve content from {self.content_id}")
+        return self._page
+
+    def scrape(self):
+        """
+        Extract every field into a ScrapeResult, then free the page, so a batch of
+        scrapes holds small records rather than parse trees. Calling a scrape_*
+        method afterwards fetches the page again.
+        """
+        try:
+            fields = self.extract()
+        finally:
+            self.release()
+        missing = [name for name in REQUIRED_FIELDS if not fields.get(name)]
+        if missing:
+            self.logger.warning(f"Not found in {self.content_id}: {', '.join(missing)}")
+        return ScrapeResult(content_id=self.content_id, **fields)
+
+    def extract(self):
+        """
+        The ScrapeResult fields of the page as a dict, in one pass over the fetched
+        page: the OpenGraph fields come from a single read of its head metadata, and
+        the site-specific fields from the same ParsedPage, whose full tree is built
+        at most once. Subclasses that read a page differently override this.
+        """
+        page = self.get_page()
+        if not page:
+            return {}
+        return {
+            "title": page.meta_content('og:title'),
+            "publisher": page.meta_content('og:site_name'),
+            "reference_image": page.meta_content('og:image'),
+            "date_published": self.scrape_date_published(),
+            "duration": self.scrape_duration(),
+            "transcript": self.scrape_transcript(),  # Last: the only field most sites need the full tree for
+        }
+
+    def release(self):
+        """Drop the fetched page and its parse tree."""
+        if self._page is not None:
+            self._page.close()
+            self._page = None
+
+    def get_soup(self):
+        """The BeautifulSoup tree of the whole page, for what the head metadata doesn't cover."""
+        page = self.get_page()
+        return page.soup if page else None
+
+    def scrape_meta(self, key, description):
+        """The content of the page's <meta> tag for key, logging a warning if it has none."""
+        page = self.get_page()
+        if page:
+            content = page.meta_content(key)
+            if content:
+                return content
+            else:
+                self.logger.warning(f"{description} tag not found.")
+        return None
+
+    def scrape_title(self):
+        """Scrape the title from the content_id."""
+        return self.scrape_meta('og:title', "Title")
+
+    @abstractmethod
+    def scrape_transcript(self):
+        """Scrape the transcript from the content_id."""
+
+    @abstractmethod
+    def scrape_date_published(self):
+        """Scrape the date published from the content_id."""
+
+    def scrape_publisher(self):
+        """Scrape the publisher from the content_id."""
+        return self.scrape_meta('og:site_name', "Publisher")
+
+    def scrape_reference_image(self):
+        """Scrape the reference image from the content_id."""
+        return self.scrape_meta('og:image', "Reference image")
+
+    def scrape_duration(self):
+        """
+        The length of the content in minutes, for pages that state it. Articles
+        don't, and their duration is estimated from the transcript when it is analysed.
+        """
+        return None
@@ -0,0 +1,163 @@
+"""
+This module defines the GenericScraper class, used for every site without a
+scraper of its own. It reads the OpenGraph tags and the schema.org JSON-LD most
+news sites publish, and finds the article text with a readability-style
+heuristic when the JSON-LD doesn't include it.
+"""
+
+# scraper\sources\generic_scraper.py
+
+from scraper.registry import hostname_of
+from scraper.sources.base_scraper import BaseScraper
+from scraper.utils.html_parser import json_ld_objects
+from scraper.utils.scraping_utils import standardize_date, clean_text
+
+ARTICLE_TYPES = {'Article', 'NewsArticle', 'ReportageNewsArticle', 'AnalysisNewsArticle', 'BlogPosting',
+                 'OpinionNewsArticle', 'ReviewNewsArticle', 'Report', 'WebPage', 'VideoObject'}
+TITLE_KEYS = ('og:title', 'twitter:title')
+DATE_KEYS = ('article:published_time', 'datePublished', 'og:published_time', 'pubdate', 'date')
+IMAGE_KEYS = ('og:image', 'og:image:url', 'twitter:image')
+BOILERPLATE_TAGS = ('script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'figure')
+MIN_PARAGRAPH_LENGTH = 40  # Shorter paragraphs are mostly captions, bylines and links
+SCORED_ANCESTORS = 3
+PARENT_SCORE_RATIO = 0.75
+
+
+def first_value(value):
+    """The first item of a JSON-LD value that may be a list."""
+    return value[0] if isinstance(value, list) and value else value
+
+
+def json_ld_string(value):
+    """A JSON-LD value that should be text, or None when a page gives an object or a number."""
+    value = first_value(value)
+    return value if isinstance(value, str) else None
+
+
+def json_ld_types(obj):
+    """The set of @type names of a JSON-LD object, which may give one type or a list."""
+    types = obj.get('@type')
+    return set(types) if isinstance(types, list) else {types}
+
+
+def json_ld_name(value):
+    """The name of a JSON-LD reference such as a publisher, given as a string or an object."""
+    value = first_value(value)
+    return value.get('name') if isinstance(value, dict) else value
+
+
+def json_ld_url(value):
+    """The URL of a JSON-LD image, given as a string or an ImageObject."""
+    value = first_value(value)
+    return value.get('url') if isinstance(value, dict) else value
+
+
+def article_text(soup):
+    """
+    The main text of a page: the paragraphs of the element whose paragraphs hold
+    the most text. A paragraph counts in full for its parent and at 1/n for its
+    n-th ancestor, and a parent is preferred when it scores nearly as well as its
+    best child. Boilerplate elements are removed from the soup first.
+    """
+    for tag in soup.find_all(BOILERPLATE_TAGS):
+        tag.decompose()
+    scores = {}
+    for paragraph in soup.find_all('p'):
+        length = len(paragraph.get_text(strip=True))
+        if length < MIN_PARAGRAPH_LENGTH:
+            continue
+        # Articles often wrap each paragraph in blocks of its own; credit the containers too
+        for depth, ancestor in enumerate(paragraph.parents, start=1):
+            if depth > SCORED_ANCESTORS or ancestor.name in ('body', '[document]'):
+                break
+            scores[id(ancestor)] = (scores.get(id(ancestor), (0, ancestor))[0] + length / depth, ancestor)
+    if not scores:
+        return None
+    score, best = max(scores.values(), key=lambda scored: scored[0])
+    # A wrapper around a single long paragraph can outscore the article holding it
+    while best.parent is not None and id(best.parent) in scores \
+            and scores[id(best.parent)][0] >= score * PARENT_SCORE_RATIO:
+        score, best = scores[id(best.parent)]
+    texts = [paragraph.get_text(' ', strip=True) for paragraph in best.find_all('p')]
+    return ' '.join(text for text in texts if text)
+
+
+class GenericScraper(BaseScraper):
+    """
+    Scrapes any article page. Everything is extracted in one pass over the page
+    on first use, and the scrape_* methods read from that.
+    """
+
+    def __init__(self, content_id):
+        super().__init__(content_id)
+        self._fields = None
+
+    def extract(self):
+        """
+        Title, transcript, date published, publisher and reference image, extracted
+        once; scrape() and the scrape_* methods read these.
+        """
+        if self._fields is not None:
+            return self._fields
+        self._fields = {}
+        page = self.get_page()
+        if not page:
+            return self._fields
+
+        meta = page.metadata['meta']
+        article = next((obj for obj in json_ld_objects(page.json_ld()) if json_ld_types(obj) & ARTICLE_TYPES), {})
+
+        title = (next((meta[key] for key in TITLE_KEYS if meta.get(key)), None)
+                 or json_ld_string(article.get('headline')))
+        date_published = (next((meta[key] for key in DATE_KEYS if meta.get(key)), None)
+                          or json_ld_string(article.get('datePublished'))
+                          or json_ld_string(article.get('uploadDate')))
+        publisher = meta.get('og:site_name') or json_ld_name(article.get('publisher'))
+        reference_image = next((meta[key] for key in IMAGE_KEYS if meta.get(key)), None) \
+            or json_ld_url(article.get('image')) or json_ld_url(article.get('thumbnailUrl'))
+        transcript = json_ld_string(article.get('articleBody'))
+
+        if not (title and date_published and transcript):
+            soup = page.soup
+            if not title and soup.title and soup.title.string:
+                title = soup.title.string.strip()
+            if not date_published:
+                time_tag = soup.find('time', datetime=True)
+                date_published = time_tag['datetime'] if time_tag else None
+            if not transcript:
+                transcript = article_text(soup)
+
+        self._fields = {
+            "title": title,
+            "transcript": clean_text(transcript) if transcript else None,
+            "date_published": standardize_date(date_published) if date_published else None,
+            "publisher": publisher or hostname_of(self.content_id).removeprefix('www.'),
+            "reference_image": reference_image,
+        }
+        return self._fields
+
+    def scrape_field(self, name, description):
+        value = self.extract().get(name)
+        if not value:
+            self.logger.warning(f"{description} not found.")
+        return value
+
+    def scrape_title(self):
+        """Scrape the title from the content_id."""
+        return self.scrape_field('title', "Title")
+
+    def scrape_transcript(self):
+        """Scrape the article text from the content_id."""
+        return self.scrape_field('transcript', "Article text")
+
+    def scrape_date_published(self):
+        """Scrape the date published from the content_id."""
+        return self.scrape_field('date_published', "Date published")
+
+    def scrape_publisher(self):
+        """Scrape the publisher from the content_id."""
+        return self.scrape_field('publisher', "Publisher")
+
+    def scrape_reference_image(self):
+        """Scrape the reference image from the content_id."""
+        return self.scrape_field('reference_image', "Reference image")
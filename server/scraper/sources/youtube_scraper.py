@@ -6,34 +6,113 @@ These functionalities serve as the foundation for extracting relevant informatio
 Note: The actual implementation of the scraping logic needs to be adapted based on the structure of the target web page.
 """
 
-import logging
+import json
 import re
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 from youtube_transcript_api import YouTubeTranscriptApi
-from scraper.utils.scraping_utils import safe_request, standardize_date, clean_text
+from scraper.registry import register_scraper
+from scraper.sources.base_scraper import BaseScraper
+from scraper.utils.scraping_utils import cached_json, fetch_page, standardize_date, clean_text
 
+PLAYER_RESPONSE_MARKER = re.compile(r'ytInitialPlayerResponse\s*=\s*(?=\{)')
+OEMBED_URL = 'https://www.youtube.com/oembed?format=json&url={url}'
+DEFAULT_LANGUAGES = ('en',)
 
-class YouTubeScraper:
+# Transcripts are fetched here while the scraper downloads the watch page
+transcript_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='youtube-transcript')
+
+
+def extract_player_response(html):
+    """
+    The ytInitialPlayerResponse object embedded in a watch page, decoded straight
+    from the page text without parsing the HTML, or None.
+    """
+    match = PLAYER_RESPONSE_MARKER.search(html)
+    if not match:
+        return None
+    try:
+        player_response, _ = json.JSONDecoder().raw_decode(html, match.end())
+    except ValueError:
+        return None
+    return player_response if isinstance(player_response, dict) else None
+
+
+def largest_thumbnail(thumbnails):
+    if not thumbnails:
+        return None
+    return max(thumbnails, key=lambda thumbnail: thumbnail.get('width', 0)).get('url')
+
+
+@register_scraper('youtube.com')
+class YouTubeScraper(BaseScraper):
     """
     This class is designed to scrape content from YouTube web pages and use the YouTube Transcript API for transcripts.
+
+    Metadata comes from the ytInitialPlayerResponse JSON in the watch page, or from
+    the oEmbed endpoint when the page can't be used; the page is parsed as HTML only
+    as a last resort. The transcript is fetched in the background as soon as the
+    metadata is first asked for.
     """
 
     def __init__(self, content_id):
-        self.content_id = content_id
+        super().__init__(content_id)
         self.video_id = self.extract_video_id(content_id)
-        self._soup = None  # Initialize a variable to cache the BeautifulSoup object
-        self.logger = logging.getLogger(self.__class__.__name__)
-
-    def get_soup(self):
-        """Use safe_request utility to make an HTTP request and return a BeautifulSoup object."""
-        if not self._soup:  # Check if the soup has already been fetched
-            response = safe_request(self.content_id)
-            if response:
-                self._soup = BeautifulSoup(
-                    response.text, 'html.parser')  # Cache the soup object
+        self._metadata = None  # title, date_published, publisher, reference_image, duration
+        self._transcript = None  # Future of the transcript fetch started by get_metadata
+
+    def get_metadata(self):
+        """The video's metadata, from the player response JSON or else from oEmbed."""
+        if self._metadata is None:
+            self.start_transcript()
+            self._metadata = {}
+            page = self.get_page()
+            player_response = extract_player_response(page.html) if page else None
+            if player_response:
+                self._metadata = self.metadata_from_player_response(player_response)
             else:
-                self.logger.error(f"Failed to retrieve content from {self.content_id}")
-        return self._soup  # Return the cached soup object
+                self.logger.warning(f"No player response in {self.content_id}, trying oEmbed")
+                self._metadata = self.metadata_from_oembed()
+        return self._metadata
+
+    def metadata_from_player_response(self, player_response):
+        details = player_response.get('videoDetails') or {}
+        microformat = (player_response.get('microformat') or {}).get('playerMicroformatRenderer') or {}
+        length_seconds = details.get('lengthSeconds') or microformat.get('lengthSeconds')
+        date_published = microformat.get('publishDate') or microformat.get('uploadDate')
+        return {
+            "title": details.get('title') or (microformat.get('title') or {}).get('simpleText'),
+            "date_published": standardize_date(date_published) if date_published else None,
+            "publisher": microformat.get('ownerChannelName') or details.get('author'),
+            "reference_image": largest_thumbnail((microformat.get('thumbnail') or {}).get('thumbnails')
+                                                 or (details.get('thumbnail') or {}).get('thumbnails')),
+            "duration": int(length_seconds) / 60 if length_seconds else None,
+        }
+
+    def metadata_from_oembed(self):
+        """Title, channel and thumbnail from the oEmbed endpoint; it has no date or duration."""
+        body = fetch_page(OEMBED_URL.format(url=quote(f"https://www.youtube.com/watch?v={self.video_id}", safe='')))
+        try:
+            oembed = json.loads(body) if body else {}
+        except ValueError:
+            self.logger.error(f"Invalid oEmbed response for {self.content_id}")
+            oembed = {}
+        return {
+            "title": oembed.get('title'),
+            "publisher": oembed.get('author_name'),
+            "reference_image": oembed.get('thumbnail_url'),
+        }
+
+    def start_transcript(self):
+        """Start fetching the transcript in the background, if it isn't already."""
+        if self._transcript is None:
+            self._transcript = transcript_executor.submit(self.fetch_transcript, DEFAULT_LANGUAGES)
+
+    def fetch_transcript(self, languages):
+        transcript_list = cached_json(
+            f"youtube-transcript:{self.video_id}:{','.join(languages)}",
+            lambda: YouTubeTranscriptApi.get_transcript(self.video_id, languages=list(languages)))
+        return clean_text(' '.join([item['text'] for item in transcript_list]))
 
     def extract_video_id(self, content_id):
         """Extract the video ID from the content_id if it is a URL; otherwise, return as is."""
@@ -41,37 +120,45 @@ class YouTubeScraper:
         match = re.search(url_pattern, content_id)
         return match.group(0) if match else content_id
 
+    def extract(self):
+        """
+        Every field from one decode of the player response (or one oEmbed request),
+        with the transcript fetched alongside. The watch page is only parsed as
+        HTML for fields neither of them gave.
+        """
+        metadata = self.get_metadata()
+        fields = {name: metadata.get(name)
+                  for name in ('title', 'date_published', 'publisher', 'reference_image', 'duration')}
+        for name in ('title', 'date_published', 'publisher', 'reference_image'):
+            if not fields[name]:
+                fields[name] = getattr(self, f'scrape_{name}')()
+        fields['transcript'] = self.scrape_transcript()
+        return fields
+
     def scrape_title(self):
         """Scrape the title from the content_id."""
-        soup = self.get_soup()
-        if soup:
-            title_tag = soup.find('meta', property='og:title')
-            if title_tag:
-                return title_tag.get('content')
-            else:
-                self.logger.warning("Title tag not found.")
-        return None
-    
+        return self.get_metadata().get('title') or super().scrape_title()
+
     def scrape_transcript(self, languages=['en']):
         """Fetch the transcript for a given video ID, if available."""
         try:
-            transcript_list = YouTubeTranscriptApi.get_transcript(self.video_id, languages=languages)
-            transcript_tmp = ' '.join([item['text'] for item in transcript_list])
-
-            transcript = clean_text(transcript_tmp)
-
-            return transcript
+            if tuple(languages) == DEFAULT_LANGUAGES:
+                self.start_transcript()
+                return self._transcript.result()
+            return self.fetch_transcript(tuple(languages))
         except Exception as e:
             self.logger.error(f"Could not fetch transcript for video {self.video_id}: {e}")
             return None
-    
+
     def scrape_date_published(self):
         """Scrape the date published from the content_id."""
-        soup = self.get_soup()
-        if soup:
-            date_published_tag = soup.find('meta', itemprop='datePublished')
-            if date_published_tag:
-                date_published_str = date_published_tag.get('content')
+        date_published = self.get_metadata().get('date_published')
+        if date_published:
+            return date_published
+        page = self.get_page()
+        if page:
+            date_published_str = page.meta_content('datePublished')
+            if date_published_str:
                 date_published = standardize_date(date_published_str)
                 return date_published
             else:
@@ -79,10 +166,14 @@ class YouTubeScraper:
         return None
 
     def scrape_publisher(self):
-        """Scrape the publisher from the content_id."""
+        """Scrape the publisher (the channel name) from the content_id."""
+        publisher = self.get_metadata().get('publisher')
+        if publisher:
+            return publisher
         soup = self.get_soup()
         if soup:
-            publisher_tag = soup.find(itemprop="author").contents[1]
+            author_tag = soup.find(itemprop="author")
+            publisher_tag = author_tag.find(itemprop="name") if author_tag else None
             if publisher_tag:
                 return publisher_tag['content']
             else:
@@ -91,14 +182,11 @@ class YouTubeScraper:
 
     def scrape_reference_image(self):
         """Scrape the reference image from the content_id."""
-        soup = self.get_soup()
-        if soup:
-            reference_image_tag = soup.find('meta', property='og:image')
-            if reference_image_tag:
-                return reference_image_tag.get('content')
-            else:
-                self.logger.warning("Reference image tag not found.")
-        return None
+        return self.get_metadata().get('reference_image') or super().scrape_reference_image()
+
+    def scrape_duration(self):
+        """The length of the video in minutes, if the player response gave it."""
+        return self.get_metadata().get('duration')
 
 # Example usage:
 # content_id = 'https://www.youtube.com/watch?v=Le122vas9aM'  # This is both the content_id and the video URL
@@ -0,0 +1,35 @@
+"""
+This module contains the HostLimits class, which maps content URLs to the host
+they are scraped from and says how many of them may be scraped at the same time.
+"""
+
+# scraper\utils\host_limits.py
+
+from urllib.parse import urlsplit
+
+# Simultaneous requests per site. A host matches its entry and every subdomain of it.
+DEFAULT_HOST_LIMITS = {
+    'bbc.co.uk': 4,
+    'cnbc.com': 4,
+    'youtube.com': 4,
+}
+DEFAULT_LIMIT = 2  # For any host without an entry
+
+
+class HostLimits:
+    """Per-host concurrency caps for scraping."""
+
+    def __init__(self, limits=None, default_limit=DEFAULT_LIMIT):
+        self.limits = dict(DEFAULT_HOST_LIMITS if limits is None else limits)
+        self.default_limit = default_limit
+
+    def host_of(self, url):
+        """The configured site a URL belongs to, or its hostname if none matches."""
+        hostname = (urlsplit(url).hostname or '').lower()
+        for host in self.limits:
+            if hostname == host or hostname.endswith('.' + host):
+                return host
+        return hostname
+
+    def limit(self, host):
+        return self.limits.get(host, self.default_limit)
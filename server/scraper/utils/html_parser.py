@@ -0,0 +1,178 @@
+"""
+This module contains the HTML parsing used by the scrapers. Full pages are parsed
+with BeautifulSoup on the fastest tree builder installed (lxml if available,
+otherwise Python's html.parser). The metadata most scrapers need, the og:* and
+other <meta> tags and the JSON-LD blocks, is read from the <head> alone, with
+selectolax when it is installed and a streaming html.parser otherwise, so a page
+whose head has everything is never parsed in full.
+"""
+
+# scraper\utils\html_parser.py
+
+import json
+import re
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401 -- only needed as a BeautifulSoup tree builder
+    SOUP_FEATURES = 'lxml'
+except ImportError:  # lxml is optional; html.parser is always available
+    SOUP_FEATURES = 'html.parser'
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:  # Older selectolax releases only have the Modest backend
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:  # selectolax is optional
+        SelectolaxParser = None
+
+HEAD_END = re.compile(r'</head\s*>|<body[\s>]', re.IGNORECASE)
+META_KEY_ATTRIBUTES = ('property', 'name', 'itemprop')
+JSON_LD_TYPE = 'application/ld+json'
+
+
+def make_soup(html, features=None):
+    """A BeautifulSoup tree of a page, built with SOUP_FEATURES unless told otherwise."""
+    return BeautifulSoup(html, features or SOUP_FEATURES)
+
+
+def head_of(html):
+    """The page up to the end of its <head>, or the whole page if it has no head."""
+    match = HEAD_END.search(html)
+    return html[:match.start()] if match else html
+
+
+def parse_json_ld(texts):
+    """Decode JSON-LD script bodies, skipping any that are not valid JSON."""
+    blocks = []
+    for text in texts:
+        try:
+            blocks.append(json.loads(text))
+        except (TypeError, ValueError):
+            continue
+    return blocks
+
+
+def json_ld_objects(blocks):
+    """Every object in decoded JSON-LD blocks, looking inside lists and @graph arrays."""
+    pending = list(blocks)
+    while pending:
+        block = pending.pop(0)
+        if isinstance(block, list):
+            pending[:0] = block
+        elif isinstance(block, dict):
+            yield block
+            if isinstance(block.get('@graph'), list):
+                pending[:0] = block['@graph']
+
+
+class _MetadataParser(HTMLParser):
+    """Collects <meta> contents and JSON-LD script bodies while tokenising, without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.json_ld_texts = []
+        self._json_ld = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            attributes = dict(attrs)
+            for name in META_KEY_ATTRIBUTES:
+                key = attributes.get(name)
+                if key and 'content' in attributes:
+                    self.meta.setdefault(key, attributes['content'])
+        elif tag == 'script' and dict(attrs).get('type') == JSON_LD_TYPE:
+            self._json_ld = []
+
+    def handle_data(self, data):
+        if self._json_ld is not None:
+            self._json_ld.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._json_ld is not None:
+            self.json_ld_texts.append(''.join(self._json_ld))
+            self._json_ld = None
+
+
+def extract_metadata(html):
+    """
+    The <meta> contents of a page's head, keyed by their property, name or itemprop
+    (the first tag wins, as with soup.find), and its decoded JSON-LD blocks:
+    {"meta": {...}, "json_ld": [...]}.
+    """
+    head = head_of(html)
+    if SelectolaxParser is not None:
+        tree = SelectolaxParser(head)
+        meta = {}
+        for node in tree.css('meta[content]'):
+            for name in META_KEY_ATTRIBUTES:
+                key = node.attributes.get(name)
+                if key:
+                    meta.setdefault(key, node.attributes['content'])
+        texts = [node.text(deep=True) for node in tree.css(f'script[type="{JSON_LD_TYPE}"]')]
+        return {"meta": meta, "json_ld": parse_json_ld(texts)}
+
+    parser = _MetadataParser()
+    parser.feed(head)
+    parser.close()
+    return {"meta": parser.meta, "json_ld": parse_json_ld(parser.json_ld_texts)}
+
+
+class ParsedPage:
+    """
+    A fetched page, parsed lazily: the head-only metadata on first use of
+    ``metadata`` and the full soup only if something asks for ``soup``.
+    """
+
+    def __init__(self, html):
+        self.html = html
+        self._metadata = None
+        self._soup = None
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = extract_metadata(self.html)
+        return self._metadata
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = make_soup(self.html)
+        return self._soup
+
+    def meta_content(self, key):
+        """
+        The content of the first <meta> whose property, name or itemprop is key.
+        Looked up in the head first; the full page is parsed only if the head lacks it.
+        """
+        content = self.metadata['meta'].get(key)
+        if content is not None:
+            return content
+        for name in META_KEY_ATTRIBUTES:
+            tag = self.soup.find('meta', attrs={name: key, 'content': True})
+            if tag:
+                return tag.get('content')
+        return None
+
+    def json_ld(self):
+        """The page's JSON-LD blocks, from the head, or from the full page if the head has none."""
+        blocks = self.metadata['json_ld']
+        if blocks:
+            return blocks
+        return parse_json_ld(tag.string for tag in self.soup.find_all('script', type=JSON_LD_TYPE))
+
+    def close(self):
+        """
+        Free the page text and the parse tree. BeautifulSoup trees are full of
+        reference cycles, so the tree is decomposed rather than left to the
+        cycle collector.
+        """
+        if self._soup is not None:
+            self._soup.decompose()
+        self._soup = None
+        self._metadata = None
+        self.html = None
@@ -0,0 +1,183 @@
+"""
+This module contains the PageCache class, an on-disk cache of the pages and API
+results the scrapers download, so re-scraping a content ID (to retry a failed
+summary or re-run processing) doesn't download it again. Bodies are compressed
+and stored once per distinct content hash; every cached URL or key points to a
+body together with the ETag and Last-Modified it was served with, which are used
+to revalidate it with a conditional request once it is older than the TTL.
+"""
+
+# scraper\utils\page_cache.py
+
+import hashlib
+import threading
+import time
+from collections import namedtuple
+from db.connection_pool import ConnectionPool
+from db.content_codec import DEFAULT_CODEC, compress_text, decompress_text
+
+DEFAULT_TTL = 7 * 24 * 3600  # Seconds a page is served without revalidating it
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # Compressed bytes kept before evicting
+
+PAGE_CACHE_SQL = (
+    '''
+    CREATE TABLE IF NOT EXISTS page_bodies (
+        content_hash TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        data BLOB NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS page_entries (
+        key TEXT PRIMARY KEY,
+        content_hash TEXT NOT NULL REFERENCES page_bodies(content_hash),
+        etag TEXT,
+        last_modified TEXT,
+        fetched_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_page_entries_accessed_at ON page_entries(accessed_at)',
+    'CREATE INDEX IF NOT EXISTS idx_page_entries_content_hash ON page_entries(content_hash)',
+)
+
+CachedPage = namedtuple('CachedPage', 'text etag last_modified fetched_at')
+
+
+class PageCache:
+    """
+    A size-capped, least-recently-used cache of text bodies keyed by URL (or any
+    other key, e.g. for transcript API results).
+
+    With ``cache_only`` set, fetch_page and cached_json in scraping_utils serve
+    whatever is cached, however old, and never go to the network.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, cache_only=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cache_only = cache_only
+        self.pool = ConnectionPool(path)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        with self.pool.transaction() as conn:
+            for statement in PAGE_CACHE_SQL:
+                conn.execute(statement)
+
+    def get(self, key):
+        """The cached page for key, fresh or not, or None."""
+        with self.pool.connection() as conn:
+            row = conn.execute('''
+                SELECT b.codec, b.data, e.etag, e.last_modified, e.fetched_at
+                FROM page_entries e JOIN page_bodies b ON b.content_hash = e.content_hash
+                WHERE e.key = ?
+            ''', (key,)).fetchone()
+        if row is None:
+            self.count('misses')
+            return None
+        with self.pool.transaction() as conn:
+            conn.execute('UPDATE page_entries SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        self.count('hits')
+        codec, data, etag, last_modified, fetched_at = row
+        return CachedPage(decompress_text(codec, data), etag, last_modified, fetched_at)
+
+    def is_fresh(self, page):
+        return time.time() - page.fetched_at < self.ttl
+
+    def put(self, key, text, etag=None, last_modified=None):
+        """Store a body for key, replacing what was cached, and evict down to max_bytes."""
+        content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        now = time.time()
+        with self.pool.transaction() as conn:
+            if conn.execute('SELECT 1 FROM page_bodies WHERE content_hash = ?', (content_hash,)).fetchone() is None:
+                data = compress_text(text)
+                conn.execute('INSERT INTO page_bodies (content_hash, codec, size, data) VALUES (?, ?, ?, ?)',
+                             (content_hash, DEFAULT_CODEC, len(data), data))
+            previous = conn.execute('SELECT content_hash FROM page_entries WHERE key = ?', (key,)).fetchone()
+            conn.execute('''
+                INSERT OR REPLACE INTO page_entries (key, content_hash, etag, last_modified, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, content_hash, etag, last_modified, now, now))
+            if previous and previous[0] != content_hash:
+                self.delete_orphan_bodies(conn, previous[0])
+            self.evict(conn)
+
+    def touch(self, key):
+        """Mark a cached page as fresh again after the server answered 304 Not Modified."""
+        now = time.time()
+        with self.pool.transaction() as conn:
+            conn.execute('UPDATE page_entries SET fetched_at = ?, accessed_at = ? WHERE key = ?', (now, now, key))
+        self.count('revalidated')
+
+    def total_size(self, conn):
+        return conn.execute('SELECT COALESCE(SUM(size), 0) FROM page_bodies').fetchone()[0]
+
+    def evict(self, conn):
+        """Drop the least recently used entries, and bodies no entry uses, until under max_bytes."""
+        size = self.total_size(conn)
+        while size > self.max_bytes:
+            oldest = conn.execute(
+                'SELECT key, content_hash FROM page_entries ORDER BY accessed_at LIMIT 1').fetchone()
+            if oldest is None:
+                break
+            conn.execute('DELETE FROM page_entries WHERE key = ?', (oldest[0],))
+            size -= self.delete_orphan_bodies(conn, oldest[1])
+
+    def delete_orphan_bodies(self, conn, content_hash):
+        """Delete a body once no entry refers to it. Returns the bytes freed."""
+        if conn.execute('SELECT 1 FROM page_entries WHERE content_hash = ? LIMIT 1', (content_hash,)).fetchone():
+            return 0
+        row = conn.execute('SELECT size FROM page_bodies WHERE content_hash = ?', (content_hash,)).fetchone()
+        conn.execute('DELETE FROM page_bodies WHERE content_hash = ?', (content_hash,))
+        return row[0] if row else 0
+
+    def clear(self):
+        with self.pool.transaction() as conn:
+            conn.execute('DELETE FROM page_entries')
+            conn.execute('DELETE FROM page_bodies')
+
+    def count(self, stat):
+        with self._stats_lock:
+            setattr(self, stat, getattr(self, stat) + 1)
+
+    def stats(self):
+        """Entry and body counts, stored size and hit/miss/revalidation counts."""
+        with self.pool.connection() as conn:
+            entries = conn.execute('SELECT COUNT(*) FROM page_entries').fetchone()[0]
+            bodies = conn.execute('SELECT COUNT(*) FROM page_bodies').fetchone()[0]
+            size = self.total_size(conn)
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bodies": bodies,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "revalidated": self.revalidated,
+                "cache_only": self.cache_only,
+            }
+
+    def close(self):
+        self.pool.close_all()
+
+
+_page_cache = None
+
+
+def configure_page_cache(path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, cache_only=False):
+    """Set up the cache used by the scrapers. Without it, every fetch goes to the network."""
+    global _page_cache
+    _page_cache = PageCache(path, ttl, max_bytes, cache_only)
+    return _page_cache
+
+
+def get_page_cache():
+    """The cache configured with configure_page_cache, or None."""
+    return _page_cache
@@ -1,27 +1,200 @@
 """
-This ...
+This module contains helpers shared by the scrapers: safe_request fetches pages
+over one pooled HTTP session with retries and backoff, fetch_page and cached_json
+go through the on-disk page cache first, and the remaining functions normalise
+the scraped dates and text.
 """
 
 # scraper\utils\scraping_utils.py
 
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import requests
-from requests.exceptions import RequestException
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, RequestException, Timeout
 from dateutil import parser
 import re
+from scraper.utils.page_cache import get_page_cache
 
+# Connection pools kept (one per host) and connections kept alive in each. The
+# pool size covers the largest per-host limit in scraper.utils.host_limits.
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 8
 
-def safe_request(url, max_retries=3, timeout=5):
-    """Attempt to make a request to the URL, with retries and timeout."""
-    for _ in range(max_retries):
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+BACKOFF_BASE = 0.5  # Seconds before the first retry, doubled on every attempt
+BACKOFF_MAX = 30.0
+DEFAULT_DEADLINE = 30.0  # Total seconds one safe_request may spend, retries included
+
+logger = logging.getLogger('ScrapingUtils')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """A requests Session whose HTTP and HTTPS connections are pooled and kept alive."""
+    session = requests.Session()
+    # Retries are done by safe_request, which can back off and respect the deadline
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    """The session shared by all scrapers and threads, created on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def configure_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """Replace the shared session with one using the given pool sizes."""
+    global _session
+    with _session_lock:
+        previous, _session = _session, create_session(pool_connections, pool_maxsize)
+    if previous is not None:
+        previous.close()
+    return _session
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Exponential backoff with full jitter: a random delay up to base * 2**attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after_delay(response):
+    """Seconds to wait according to a Retry-After header (seconds or an HTTP date), or None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def safe_request(url, max_retries=3, timeout=5, deadline=DEFAULT_DEADLINE, session=None, headers=None):
+    """
+    GET a URL over the shared session, making up to ``max_retries`` attempts.
+
+    Connection errors, timeouts and RETRYABLE_STATUSES are retried after an
+    exponential backoff with jitter, or after the server's Retry-After. Other
+    errors fail straight away. No attempt starts or waits past ``deadline``
+    seconds after the call. Returns the response, or None on failure.
+    """
+    session = session or get_session()
+    started = time.monotonic()
+    for attempt in range(max_retries):
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            logger.error(f"Giving up on {url}: the {deadline}s deadline has passed")
+            return None
+        retry_delay = None
         try:
-            response = requests.get(url, timeout=timeout)
-            response.raise_for_status()  # Raise an error for bad statuses
-            return response
+            response = session.get(url, headers=headers, timeout=min(timeout, remaining))
+            if response.status_code not in RETRYABLE_STATUSES:
+                response.raise_for_status()
+                return response
+            retry_delay = retry_after_delay(response)
+            response.close()  # Return the connection to the pool
+            logger.warning(f"Request to {url} returned {response.status_code} (attempt {attempt + 1}/{max_retries})")
+        except (ConnectionError, Timeout) as e:
+            logger.warning(f"Request to {url} failed (attempt {attempt + 1}/{max_retries}): {e}")
         except RequestException as e:
-            print(f"Request failed: {e}")
+            logger.error(f"Request to {url} failed: {e}")
+            return None
+
+        if attempt + 1 == max_retries:
+            break
+        delay = backoff_delay(attempt) if retry_delay is None else retry_delay
+        if time.monotonic() - started + delay >= deadline:
+            logger.error(f"Giving up on {url}: retrying in {delay:.1f}s would pass the {deadline}s deadline")
+            return None
+        time.sleep(delay)
+    logger.error(f"Giving up on {url} after {max_retries} attempts")
     return None  # Indicate failure after retries
 
 
+def fetch_page(url, cache=None):
+    """
+    The text of a page, from the page cache when possible. A cached page older
+    than the cache TTL is revalidated with If-None-Match/If-Modified-Since and a
+    304 reuses it. If the fetch fails, a stale copy is better than nothing.
+    In cache-only mode nothing is downloaded. Returns None on failure.
+    """
+    cache = cache or get_page_cache()
+    if cache is None:
+        response = safe_request(url)
+        return response.text if response is not None else None
+
+    page = cache.get(url)
+    if page is not None and (cache.cache_only or cache.is_fresh(page)):
+        return page.text
+    if cache.cache_only:
+        logger.warning(f"{url} is not in the page cache and the cache is in cache-only mode")
+        return None
+
+    headers = {}
+    if page is not None and page.etag:
+        headers['If-None-Match'] = page.etag
+    if page is not None and page.last_modified:
+        headers['If-Modified-Since'] = page.last_modified
+    response = safe_request(url, headers=headers)
+    if response is None:
+        if page is not None:
+            logger.warning(f"Serving a stale cached copy of {url}")
+            return page.text
+        return None
+    if response.status_code == 304 and page is not None:
+        cache.touch(url)
+        return page.text
+    cache.put(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.text
+
+
+def cached_json(key, produce, cache=None):
+    """
+    The JSON-serialisable result of ``produce()``, such as a transcript API call,
+    cached under key for the cache TTL. In cache-only mode a missing key raises
+    LookupError instead of calling produce.
+    """
+    cache = cache or get_page_cache()
+    if cache is None:
+        return produce()
+
+    page = cache.get(key)
+    if page is not None and (cache.cache_only or cache.is_fresh(page)):
+        return json.loads(page.text)
+    if cache.cache_only:
+        raise LookupError(f"{key} is not in the page cache and the cache is in cache-only mode")
+    try:
+        result = produce()
+    except Exception as e:
+        if page is None:
+            raise
+        logger.warning(f"Serving a stale cached copy of {key}: {e}")
+        return json.loads(page.text)
+    cache.put(key, json.dumps(result))
+    return result
+
+
 def standardize_date(date_string, output_format='%Y-%m-%d %H:%M:%S'):
     """Parse a date string into a standardized UTC format."""
     try:
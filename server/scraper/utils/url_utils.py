@@ -0,0 +1,72 @@
+"""
+This module contains canonicalize_url, which reduces the different URLs people
+share for one page to a single form, so the same article or video is only added,
+scraped and summarised once.
+"""
+
+# scraper\utils\url_utils.py
+
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a link was shared or clicked
+TRACKING_PARAMETERS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', 'ocid',
+    'cmpid', 'ref', 'ref_src', 'ref_url', '_ga', '__twitter_impression',
+}
+TRACKING_PREFIXES = ('utm_', 'at_', 'ga_', 'pk_', 'mkt_', '__cf_')  # at_* is BBC's campaign tagging
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+                 'youtube-nocookie.com', 'www.youtube-nocookie.com'}
+YOUTUBE_PATH_ID = re.compile(r'^/(?:shorts|embed|live|v)/([\w-]{11})')
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v={video_id}"
+
+
+def youtube_video_id(parts):
+    """The video ID of a split YouTube URL in any of its shapes, or None."""
+    hostname = (parts.hostname or '').lower()
+    if hostname == 'youtu.be':
+        video_id = parts.path.lstrip('/').split('/')[0]
+        return video_id or None
+    if hostname in YOUTUBE_HOSTS:
+        if parts.path == '/watch':
+            return dict(parse_qsl(parts.query)).get('v')
+        match = YOUTUBE_PATH_ID.match(parts.path)
+        if match:
+            return match.group(1)
+    return None
+
+
+def is_tracking_parameter(name):
+    name = name.lower()
+    return name in TRACKING_PARAMETERS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url):
+    """
+    The canonical form of a content URL. YouTube links (youtu.be, shorts, embeds,
+    watch URLs with timestamps or playlists) become www.youtube.com/watch?v=<id>.
+    Other URLs get a lower-case scheme and host, no default port, no fragment, and
+    no tracking parameters, with the remaining query parameters sorted. Strings
+    that aren't http(s) URLs are returned stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    video_id = youtube_video_id(parts)
+    if video_id:
+        return YOUTUBE_WATCH_URL.format(video_id=video_id)
+
+    try:
+        port = parts.port
+    except ValueError:  # Not a valid port; leave the URL to fail when it is fetched
+        return url
+    netloc = parts.hostname.lower()
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not is_tracking_parameter(name))
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
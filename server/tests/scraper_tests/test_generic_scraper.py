@@ -0,0 +1,102 @@
+# tests/test_generic_scraper.py
+
+import json
+import pytest
+import requests_mock
+from scraper import registry
+from scraper.factory import get_scraper
+from scraper.sources.base_scraper import BaseScraper
+from scraper.sources.bbc_scraper import BBCScraper
+from scraper.sources.generic_scraper import GenericScraper
+from scraper.sources.youtube_scraper import YouTubeScraper
+
+URL = "https://www.example-news.org/world/2024/03/01/story"
+PARAGRAPHS = ["Ministers agreed a new budget after weeks of talks in parliament.",
+              "The deal raises spending on health and schools over the next three years."]
+
+
+def article_page(json_ld=None):
+    script = f'<script type="application/ld+json">{json.dumps(json_ld)}</script>' if json_ld else ''
+    return (
+        "<html><head><title>Budget deal | Example News</title>"
+        "<meta property='og:image' content='https://img.example-news.org/budget.jpg'>"
+        f"{script}</head><body><nav><p>{'Home World Business Sport Culture Weather ' * 2}</p></nav>"
+        "<article><time datetime='2024-03-01T08:30:00Z'>1 March</time>"
+        + ''.join(f"<div class='block'><p>{text}</p></div>" for text in PARAGRAPHS)
+        + "</article><footer><p>Copyright Example News, all rights reserved, 2024.</p></footer></body></html>")
+
+
+@pytest.mark.parametrize('url, scraper_class', [
+    ("https://www.bbc.co.uk/news/business-68225189", BBCScraper),
+    ("https://m.youtube.com/watch?v=Le122vas9aM", YouTubeScraper),
+    (URL, GenericScraper),
+])
+def test_get_scraper_dispatches_on_hostname(url, scraper_class):
+    assert type(get_scraper(url)) is scraper_class
+
+
+def test_get_scraper_rejects_non_urls():
+    with pytest.raises(ValueError):
+        get_scraper("not a url")
+
+
+def test_plugins_register_through_entry_points(monkeypatch):
+    class PluginScraper(GenericScraper):
+        pass
+
+    class EntryPoint:
+        name, value = 'example-news.org', 'plugin:PluginScraper'
+
+        def load(self):
+            return PluginScraper
+
+    monkeypatch.setattr(registry, 'SCRAPERS', dict(registry.SCRAPERS))
+    monkeypatch.setattr(registry, '_plugins_loaded', False)
+    monkeypatch.setattr(registry, 'entry_points', lambda group: [EntryPoint()])
+    assert type(get_scraper(URL)) is PluginScraper
+
+
+def test_generic_scraper_finds_the_article_without_json_ld():
+    with requests_mock.Mocker() as m:
+        m.get(URL, text=article_page())
+        scraper = GenericScraper(URL)
+        assert scraper.scrape_title() == "Budget deal | Example News"
+        assert scraper.scrape_transcript() == ' '.join(PARAGRAPHS)
+        assert scraper.scrape_date_published() == "2024-03-01 08:30:00"
+        assert scraper.scrape_publisher() == "example-news.org"
+        assert scraper.scrape_reference_image() == "https://img.example-news.org/budget.jpg"
+
+
+def test_generic_scraper_prefers_json_ld():
+    json_ld = {"@context": "https://schema.org", "@graph": [
+        {"@type": "WebSite", "name": "Example News"},
+        {"@type": ["NewsArticle"], "headline": "Budget deal agreed", "datePublished": "2024-03-01T09:00:00Z",
+         "publisher": {"@type": "Organization", "name": "Example News"}, "articleBody": "The full text."}]}
+    with requests_mock.Mocker() as m:
+        m.get(URL, text=article_page(json_ld))
+        scraper = GenericScraper(URL)
+        assert (scraper.scrape_title(), scraper.scrape_date_published(), scraper.scrape_publisher(),
+                scraper.scrape_transcript()) == ("Budget deal agreed", "2024-03-01 09:00:00", "Example News",
+                                                 "The full text.")
+    assert scraper.get_page()._soup is None
+
+
+@pytest.mark.parametrize('date_published, expected', [
+    (["2024-03-01T09:00:00Z", "2024-03-02T10:00:00Z"], "2024-03-01 09:00:00"),
+    ({"@type": "DateTime", "@value": "2024-03-01T09:00:00Z"}, "2024-03-01 08:30:00"),  # From the <time> tag
+    (20240301, "2024-03-01 08:30:00"),
+])
+def test_generic_scraper_tolerates_non_string_json_ld_dates(date_published, expected):
+    json_ld = {"@type": "NewsArticle", "headline": "Budget deal agreed", "datePublished": date_published}
+    with requests_mock.Mocker() as m:
+        m.get(URL, text=article_page(json_ld))
+        assert GenericScraper(URL).scrape().date_published == expected
+
+
+def test_site_scrapers_must_implement_the_site_specific_fields():
+    class IncompleteScraper(BaseScraper):
+        def scrape_transcript(self):
+            return "Text"
+
+    with pytest.raises(TypeError, match='scrape_date_published'):
+        IncompleteScraper("https://example-news.org/story")
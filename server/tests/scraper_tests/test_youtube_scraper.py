@@ -0,0 +1,71 @@
+# tests/test_youtube_scraper.py
+
+import os
+import threading
+import pytest
+import requests_mock
+from scraper.sources import youtube_scraper
+from scraper.sources.youtube_scraper import YouTubeScraper, extract_player_response
+
+URL = "https://www.youtube.com/watch?v=Le122vas9aM"
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'youtube_watch.html')
+
+
+@pytest.fixture
+def watch_page():
+    """Fixture to provide a saved YouTube watch page."""
+    with open(FIXTURE, encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def transcript_api(monkeypatch):
+    """Fixture replacing the transcript API; records the calls and can be held back."""
+    calls, release = [], threading.Event()
+
+    def get_transcript(video_id, languages):
+        calls.append(video_id)
+        release.wait(5)
+        return [{'text': 'Inflation is falling', 'start': 0.0, 'duration': 2.0},
+                {'text': 'again', 'start': 2.0, 'duration': 1.0}]
+
+    monkeypatch.setattr(youtube_scraper.YouTubeTranscriptApi, 'get_transcript', get_transcript, raising=False)
+    return calls, release
+
+
+def test_extract_player_response(watch_page):
+    player_response = extract_player_response(watch_page)
+    assert player_response['videoDetails']['lengthSeconds'] == "754"
+    assert extract_player_response("<html><script>var x = 1;</script></html>") is None
+
+
+def test_metadata_from_player_response_without_soup(watch_page, transcript_api):
+    """Metadata comes from the embedded JSON while the transcript is fetched alongside."""
+    calls, release = transcript_api
+    with requests_mock.Mocker() as m:
+        m.get(URL, text=watch_page)
+        scraper = YouTubeScraper(URL)
+        assert scraper.scrape_title() == "Why inflation is still falling"
+        assert scraper.scrape_date_published() == "2024-02-09 06:00:12"
+        assert scraper.scrape_publisher() == "CNBC International"
+        assert scraper.scrape_reference_image() == "https://i.ytimg.com/vi/Le122vas9aM/maxresdefault.jpg"
+        assert scraper.scrape_duration() == pytest.approx(754 / 60)
+        assert calls == ['Le122vas9aM']  # Started before the transcript was asked for
+        release.set()
+        assert scraper.scrape_transcript() == "Inflation is falling again"
+    assert scraper._page._soup is None
+    assert calls == ['Le122vas9aM']
+
+
+def test_oembed_fallback(transcript_api):
+    transcript_api[1].set()
+    with requests_mock.Mocker() as m:
+        m.get(URL, text="<html><head><title>YouTube</title></head><body></body></html>")
+        m.get("https://www.youtube.com/oembed", json={
+            'title': "Why inflation is still falling", 'author_name': "CNBC International",
+            'thumbnail_url': "https://i.ytimg.com/vi/Le122vas9aM/hqdefault.jpg"})
+        scraper = YouTubeScraper(URL)
+        assert scraper.scrape_title() == "Why inflation is still falling"
+        assert scraper.scrape_publisher() == "CNBC International"
+        assert scraper.scrape_reference_image() == "https://i.ytimg.com/vi/Le122vas9aM/hqdefault.jpg"
+        assert scraper.scrape_duration() is None
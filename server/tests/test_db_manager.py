@@ -0,0 +1,553 @@
+# tests/test_db_manager.py
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import pytest
+import requests_mock
+from db import db_manager as db_manager_module
+from db.db_manager import DBManager, MAX_STAGE_ATTEMPTS, format_aggregates
+from processor.factory import get_processor
+from scraper.sources import youtube_scraper
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """Fixture to create a DBManager backed by a fresh database file."""
+    manager = DBManager(str(tmp_path / 'narratives.db'))
+    manager.create_library_table()
+    manager.create_publisher_options_table()
+    manager.create_api_keys_table()
+    yield manager
+    manager.close()
+
+
+def test_connections_are_configured(db_manager):
+    """Pooled connections use WAL, synchronous=NORMAL and a busy timeout."""
+    with db_manager.pool.connection() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+
+
+def test_connection_is_reused(db_manager):
+    """Nested checkouts share a connection and released connections go back to the pool."""
+    with db_manager.pool.connection() as outer:
+        with db_manager.pool.connection() as inner:
+            assert inner is outer
+    with db_manager.pool.connection() as again:
+        assert again is outer
+
+
+def test_concurrent_adds(db_manager):
+    """Adding content from many threads at once loses no rows."""
+    def add(start):
+        for i in range(start, start + 25):
+            db_manager.add_content_id(f"https://www.bbc.co.uk/news/{i}")
+
+    threads = [threading.Thread(target=add, args=(n * 25,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert db_manager.query('SELECT COUNT(*) FROM library')[0][0] == 200
+    assert db_manager.add_content_id("https://www.bbc.co.uk/news/0") is False
+
+
+FILTER_VALUES = {
+    'publishers': ['BBC News', 'CNBC'],
+    'platforms': ['Web'],
+    'countries': ['UK', 'US'],
+    'macro_topics': ['Economy'],
+    'dateAddedRange': {'start': '2024-01-01 00:00:00', 'end': '2024-12-31 23:59:59'},
+    'datePublishedRange': {'start': '2024-01-01 00:00:00', 'end': '2024-12-31 23:59:59'},
+}
+
+
+def query_plan(db_manager, query, params):
+    rows = db_manager.query(f"EXPLAIN QUERY PLAN {query}", params)
+    return [row[3] for row in rows]
+
+
+@pytest.mark.parametrize('combination', [
+    combination
+    for size in range(1, len(FILTER_VALUES) + 1)
+    for combination in itertools.combinations(FILTER_VALUES, size)
+])
+def test_filters_use_an_index(db_manager, combination):
+    """Every filter combination is answered from an index, paginated or not."""
+    filters = {key: FILTER_VALUES[key] for key in combination}
+    query_parts, params = db_manager.build_filter_conditions(filters)
+    plans = [
+        query_plan(db_manager, f"SELECT * FROM library WHERE {' AND '.join(query_parts)}", params),
+        query_plan(db_manager, *db_manager.build_page_query(filters, 50)),
+    ]
+    for plan in plans:
+        library_steps = [step for step in plan if 'library' in step]
+        assert library_steps
+        assert all('USING INDEX' in step or 'USING COVERING INDEX' in step for step in library_steps), plan
+
+
+def test_keyset_pagination(db_manager):
+    """Paging through the library visits every row once, in order, including rows without dates."""
+    for i in range(23):
+        db_manager.execute_query(
+            'INSERT INTO library (content_id, date_added, date_published) VALUES (?, ?, ?)',
+            (f"id-{i:02d}", f"2024-01-{i % 5 + 1:02d} 00:00:00",
+             None if i % 4 == 0 else f"2024-02-{i % 7 + 1:02d} 00:00:00"))
+
+    for sort in ('-date_added', 'date_added', '-date_published', 'date_published'):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = db_manager.fetch_filtered_page({}, 5, cursor=cursor, sort=sort)
+            seen.extend(rows)
+            if cursor is None:
+                break
+        column = sort.lstrip('-')
+        expected = sorted(db_manager.fetch_filtered_data({}),
+                          key=lambda row: (row[column] is not None, row[column] or '', row['content_id']),
+                          reverse=sort.startswith('-'))
+        assert [row['content_id'] for row in seen] == [row['content_id'] for row in expected]
+
+    with pytest.raises(ValueError):
+        db_manager.fetch_filtered_page({}, 5, sort='title')
+    with pytest.raises(ValueError, match="sort must be a string"):
+        db_manager.fetch_filtered_page({}, 1, sort=5)
+
+
+def test_projection_and_transcript(db_manager):
+    """The default projection leaves the transcript out; it is loaded on demand."""
+    db_manager.execute_query(
+        'INSERT INTO library (content_id, summary) VALUES (?, ?)', ('id-1', 'A short summary.'))
+    db_manager.store_transcript('id-1', 'word ' * 5000)
+
+    row = db_manager.fetch_filtered_data({})[0]
+    assert 'transcript' not in row
+    assert row['summary'] == 'A short summary.'
+
+    assert db_manager.fetch_filtered_data({}, ['content_id', 'title']) == [{'content_id': 'id-1', 'title': None}]
+    with pytest.raises(ValueError):
+        db_manager.fetch_filtered_data({}, ['content_id', 'password'])
+    for fields in ('title', {'title': 1}, ['title', None]):
+        with pytest.raises(ValueError, match="fields must be a list of column names"):
+            db_manager.fetch_filtered_data({}, fields)
+
+    assert db_manager.fetch_transcript('id-1').startswith('word word')
+    assert db_manager.fetch_transcript('missing') is None
+
+
+# The library table as created before any migration existed.
+ORIGINAL_LIBRARY_SQL = '''
+CREATE TABLE library (
+    content_id VARCHAR(200) PRIMARY KEY, title TEXT, publisher TEXT, author TEXT,
+    date_published DATETIME, date_added DATETIME, duration TEXT, platform TEXT, transcript TEXT,
+    summary TEXT, sentiment_analysis REAL, macro_topic TEXT, publisher_political_orientation TEXT,
+    country TEXT, sent_by TEXT, comments TEXT, reference_image TEXT
+)
+'''
+
+
+def test_summary_preview_migration(tmp_path):
+    """Opening a database created before summary_preview existed adds and backfills it."""
+    db_path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute(ORIGINAL_LIBRARY_SQL)
+    conn.execute("INSERT INTO library (content_id, summary) VALUES ('id-1', ?)", ('lorem ipsum ' * 100,))
+    conn.commit()
+    conn.close()
+
+    manager = DBManager(db_path)
+    manager.create_library_table()
+    preview = manager.fetch_filtered_data({}, ['summary_preview'])[0]['summary_preview']
+    manager.close()
+    assert preview.endswith('...') and len(preview) <= 283
+
+
+def test_iter_filtered_data_batches(db_manager):
+    """Streaming reads the rows in bounded batches and releases the connection afterwards."""
+    db_manager.pool._idle.queue.clear()
+    for i in range(12):
+        db_manager.execute_query('INSERT INTO library (content_id, platform) VALUES (?, ?)',
+                                 (f"id-{i:02d}", 'Web' if i % 3 else 'YouTube'))
+
+    batches = list(db_manager.iter_filtered_data({'platforms': ['Web']}, ['content_id'], batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 3, 2]
+    assert db_manager.pool._idle.qsize() == 1
+
+    with pytest.raises(ValueError):
+        db_manager.iter_filtered_data({}, ['nope'])
+
+
+def test_search_library(db_manager):
+    """Search ranks title hits first, returns snippets, honours filters and follows updates."""
+    rows = [
+        ('id-1', 'Inflation hits new high', 'Prices rise.', 'The central bank spoke.', 'BBC News'),
+        ('id-2', 'Football results', 'Weekend games.', 'Nobody mentioned inflation until the end.', 'BBC News'),
+        ('id-3', 'Markets rally', 'Stocks up as inflation cools.', 'Traders cheered.', 'CNBC'),
+    ]
+    for content_id, title, summary, transcript, publisher in rows:
+        db_manager.execute_query(
+            'INSERT INTO library (content_id, title, summary, publisher) VALUES (?, ?, ?, ?)',
+            (content_id, title, summary, publisher))
+        db_manager.store_transcript(content_id, transcript)
+
+    results = db_manager.search_library('inflation', fields=['content_id'])
+    assert [r['content_id'] for r in results] == ['id-1', 'id-3', 'id-2']
+    assert '<mark>Inflation</mark>' in results[0]['snippet']
+
+    filtered = db_manager.search_library('inflation', {'publishers': ['CNBC']}, fields=['content_id'])
+    assert [r['content_id'] for r in filtered] == ['id-3']
+
+    db_manager.update_content_id_topic('id-1', 'Economy')  # untouched text columns stay indexed
+    db_manager.execute_query("UPDATE library SET title = 'Interest rates' WHERE content_id = 'id-1'")
+    db_manager.execute_query("DELETE FROM library WHERE content_id = 'id-3'")
+    assert [r['content_id'] for r in db_manager.search_library('inflat*', fields=['content_id'])] == ['id-2']
+    assert db_manager.search_library('"rates', fields=['content_id'])[0]['content_id'] == 'id-1'
+
+    db_manager.store_transcript('id-2', 'A replacement transcript about elections.')
+    assert [r['content_id'] for r in db_manager.search_library('elections', fields=['content_id'])] == ['id-2']
+    assert db_manager.search_library('inflation', fields=['content_id']) == []
+    db_manager.execute_query("INSERT INTO library_fts (library_fts) VALUES ('integrity-check')")
+
+
+def test_search_library_raises_errors(db_manager, monkeypatch):
+    """Malformed queries raise ValueError (400) and database errors propagate (500) instead of []."""
+    monkeypatch.setattr(db_manager_module, 'to_fts_query', lambda text: text)
+    with pytest.raises(ValueError, match="Invalid search query"):
+        db_manager.search_library('inflation AND', fields=['content_id'])
+    with pytest.raises(ValueError, match="Invalid search query"):
+        db_manager.search_library('"inflation', fields=['content_id'])
+
+    db_manager.execute_query("DROP TABLE library_fts")
+    with pytest.raises(sqlite3.OperationalError):
+        db_manager.search_library('inflation', fields=['content_id'])
+
+
+def test_add_content_ids(db_manager):
+    """Bulk adds dedupe in memory, ignore existing rows and report the counts."""
+    db_manager.add_content_id('https://www.bbc.co.uk/news/1')
+    counts = db_manager.add_content_ids([
+        'https://www.bbc.co.uk/news/1',
+        'https://www.bbc.co.uk/news/2',
+        ' https://www.bbc.co.uk/news/2 ',
+        '',
+        'https://www.cnbc.com/3',
+    ])
+    assert counts == {'added': 2, 'skipped': 3}
+    assert db_manager.query('SELECT COUNT(*) FROM library')[0][0] == 3
+
+
+def test_transcript_migration(tmp_path):
+    """Inline transcripts from older databases move to compressed storage and stay searchable."""
+    db_path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute(ORIGINAL_LIBRARY_SQL)
+    conn.executemany('INSERT INTO library (content_id, title, transcript, publisher, country) VALUES (?, ?, ?, ?, ?)',
+                     [(f"id-{i}", f"Title {i}", f"transcript number {i} " * 200, 'BBC News', 'UK') for i in range(3)])
+    conn.commit()
+    conn.close()
+
+    manager = DBManager(db_path)
+    manager.create_library_table()
+    assert manager.query('SELECT COUNT(*) FROM library WHERE transcript IS NOT NULL')[0][0] == 0
+    stats = manager.content_storage_stats()
+    assert stats['transcripts'] == 3 and stats['stored_bytes'] * 10 < stats['raw_bytes']
+    assert manager.fetch_transcript('id-1').startswith('transcript number 1')
+    assert manager.fetch_filtered_data({}, ['content_id', 'transcript'])[2]['transcript'].startswith('transcript number 2')
+    manager.execute_query("INSERT INTO library_fts (library_fts) VALUES ('integrity-check')")
+    assert len(manager.search_library('transcript', fields=['content_id'])) == 3
+    assert manager.fetch_aggregates({})['country'][0]['count'] == 3
+    assert manager.fetch_publisher_options() == [
+        {'publisher': 'BBC News', 'publisher_political_orientation': None, 'country': 'UK'}]
+
+    manager.execute_query("DELETE FROM library WHERE content_id = 'id-0'")
+    assert manager.query('SELECT COUNT(*) FROM library_content')[0][0] == 2
+    manager.vacuum()
+    assert [r['content_id'] for r in manager.search_library('number', fields=['content_id'])] == ['id-1', 'id-2']
+    manager.execute_query("INSERT INTO library_fts (library_fts) VALUES ('integrity-check')")
+    manager.close()
+
+
+def test_aggregates_follow_writes(db_manager):
+    """The rollups match a full recount after inserts, scrapes, retopics, deletes and publisher edits."""
+    db_manager.add_content_ids([f"id-{i}" for i in range(6)])
+    for i in range(6):
+        db_manager.execute_query(
+            'UPDATE library SET publisher = ?, date_published = ?, duration = ?, sentiment_analysis = ? '
+            'WHERE content_id = ?',
+            ('BBC News' if i % 2 else 'CNBC', f"2024-0{i % 3 + 1}-10 00:00:00", str(i + 1), i / 10, f"id-{i}"))
+        db_manager.add_publisher_in_publisher_options('BBC News' if i % 2 else 'CNBC')
+    db_manager.update_content_id_topic('id-1', 'Economy')
+    db_manager.update_content_id_topic('id-1', 'Politics')
+    db_manager.execute_query("DELETE FROM library WHERE content_id = 'id-4'")
+    db_manager.edit_publisher_options([
+        {'publisher': 'BBC News', 'publisher_political_orientation': 'Centre', 'country': 'UK'},
+        {'publisher': 'CNBC', 'publisher_political_orientation': None, 'country': 'US'},
+    ])
+
+    def counts(aggregates):
+        return {dimension: [(group['value'], group['count'], pytest.approx(group['total_duration']))
+                            for group in ([groups] if dimension == 'total' else groups)]
+                for dimension, groups in aggregates.items()}
+
+    recount = format_aggregates(db_manager.query(*db_manager.build_aggregate_query({})))
+    aggregates = db_manager.fetch_aggregates({})
+    assert counts(aggregates) == counts(recount)
+    assert aggregates['total']['count'] == 5
+    assert aggregates['total']['total_duration'] == 1 + 2 + 3 + 4 + 6
+    assert {group['value']: group['count'] for group in aggregates['publisher']} == {'BBC News': 3, 'CNBC': 2}
+    assert {group['value']: group['count'] for group in aggregates['country']} == {'UK': 3, 'US': 2}
+    assert [group['value'] for group in aggregates['publisher_political_orientation']] == ['Centre', 'Unknown']
+    assert [group['value'] for group in aggregates['macro_topic']] == ['Unknown', 'Politics']
+    assert [group['value'] for group in aggregates['date_published_month']] == ['2024-01', '2024-02', '2024-03']
+
+    filtered = db_manager.fetch_aggregates({'publishers': ['CNBC']})
+    assert filtered['total']['count'] == 2
+    assert filtered['country'] == [{'value': 'US', 'count': 2, 'total_duration': 4.0,
+                                    'avg_duration': 2.0, 'avg_sentiment': pytest.approx(0.1)}]
+
+
+def test_scrape_content_id_stores_the_scrape_result(db_manager):
+    url = "https://www.bbc.co.uk/news/business-68225189"
+    with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'bbc_article.html'), encoding='utf-8') as f:
+        page = f.read()
+    db_manager.add_content_id(url)
+    with requests_mock.Mocker() as m:
+        m.get(url, text=page)
+        db_manager.scrape_content_id(url)
+
+    row = db_manager.fetch_filtered_data({}, ['title', 'publisher', 'date_published', 'platform'])[0]
+    assert row == {'title': "House price rises highest for a year in January, Halifax says",
+                   'publisher': 'BBC News', 'date_published': '2024-02-07 17:47:56', 'platform': 'Web'}
+    assert db_manager.fetch_transcript(url).startswith(page.split('<p class="ssrcss-1q0x1qg-Paragraph">')[1][:40])
+
+
+def test_edit_publisher_options(db_manager):
+    """Batch edits are atomic and show up in library reads and filters without rewriting library rows."""
+    for i, publisher in enumerate(['BBC News', 'CNBC', 'BBC News']):
+        db_manager.execute_query('INSERT INTO library (content_id, publisher) VALUES (?, ?)', (f"id-{i}", publisher))
+        db_manager.add_publisher_in_publisher_options(publisher)
+
+    fields = ['content_id', 'country', 'publisher_political_orientation']
+    assert db_manager.fetch_filtered_data({}, fields)[0] == {
+        'content_id': 'id-0', 'country': 'Unknown', 'publisher_political_orientation': 'Unknown'}
+
+    with pytest.raises(sqlite3.Error):
+        db_manager.edit_publisher_options([
+            {'publisher': 'BBC News', 'publisher_political_orientation': 'Centre', 'country': 'UK'},
+            {'publisher': 'CNBC', 'publisher_political_orientation': 'Centre', 'country': ['not', 'a', 'string']},
+        ])
+    assert db_manager.fetch_filtered_data({'countries': ['UK']}, fields) == []
+
+    assert db_manager.edit_publisher_options([
+        {'publisher': 'BBC News', 'publisher_political_orientation': 'Centre', 'country': 'UK'},
+        {'publisher': 'Missing', 'publisher_political_orientation': 'Left', 'country': 'US'},
+    ]) == 1
+    assert [row['content_id'] for row in db_manager.fetch_filtered_data({'countries': ['UK']}, fields)] == ['id-0', 'id-2']
+    assert [row['content_id'] for row in db_manager.fetch_filtered_data({'countries': ['Unknown']}, fields)] == ['id-1']
+    assert db_manager.query('SELECT COUNT(*) FROM library WHERE country IS NOT NULL')[0][0] == 0
+
+
+def test_writes_invalidate_cached_results(db_manager):
+    """Every mutating method bumps the write generation, so cached results are recomputed."""
+    calls = []
+
+    def produce():
+        calls.append(1)
+        return str(len(db_manager.fetch_filtered_data({}))).encode()
+
+    assert db_manager.cached_result('count', produce) == b'0'
+    assert db_manager.cached_result('count', produce) == b'0' and len(calls) == 1
+    etag = db_manager.result_etag('count')
+    assert db_manager.result_etag('count') == etag != db_manager.result_etag('other')
+
+    writes = [
+        lambda: db_manager.add_content_id('id-1'),
+        lambda: db_manager.add_content_ids(['id-2']),
+        lambda: db_manager.update_content_id_topic('id-1', 'Economy'),
+        lambda: db_manager.store_transcript('id-1', 'Some words.'),
+        lambda: db_manager.edit_publisher_option('BBC News', 'Centre', 'UK'),
+    ]
+    for write in writes:
+        generation = db_manager.write_generation
+        write()
+        assert db_manager.write_generation > generation
+    assert db_manager.cached_result('count', produce) == b'2' and len(calls) == 2
+    assert db_manager.result_etag('count') != etag
+    assert db_manager.result_cache.stats()['hits'] == 1
+
+
+def test_writes_from_other_connections_invalidate_cached_results(db_manager):
+    """A commit made outside the DBManager, e.g. by another process, changes ETags and cached results."""
+    produce = lambda: str(len(db_manager.fetch_filtered_data({}))).encode()
+    assert db_manager.cached_result('count', produce) == b'0'
+    etag = db_manager.result_etag('count')
+    assert db_manager.result_etag('count') == etag
+
+    other = sqlite3.connect(db_manager.db_name)
+    db_manager.configure_connection(other)  # The library triggers need decompress_text
+    with other:
+        other.execute("INSERT INTO library (content_id) VALUES ('id-1')")
+    other.close()
+
+    assert db_manager.result_etag('count') != etag
+    assert db_manager.cached_result('count', produce) == b'1'
+
+
+def test_rebuilding_rollups_invalidates_cached_aggregates(db_manager):
+    """Aggregates cached before a rollup rebuild get a new ETag and are recomputed."""
+    db_manager.execute_query("INSERT INTO library (content_id, publisher) VALUES ('id-1', 'BBC News')")
+    produce = lambda: json.dumps(db_manager.fetch_aggregates({})).encode()
+    stale = db_manager.cached_result('narratives-aggregates', produce)
+    etag = db_manager.result_etag('narratives-aggregates')
+
+    db_manager.execute_query("DELETE FROM library_rollups")  # Rollups out of step with library
+    db_manager.rebuild_rollups()
+
+    assert db_manager.result_etag('narratives-aggregates') != etag
+    assert db_manager.cached_result('narratives-aggregates', produce) == stale  # Recomputed, same totals
+    assert db_manager.result_cache.stats()['hits'] == 0
+
+
+class FakeSummariser:
+    """Stands in for the OpenAI summariser, failing the first ``failures`` calls."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def process_text(self, text):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("OpenAI is unavailable")
+        return "A summary of the article."
+
+
+def make_due(db_manager):
+    """Move every scheduled retry into the past, as if the backoff had run out."""
+    db_manager.execute_query("UPDATE pipeline_state SET next_retry_at = 0 WHERE status = 'failed'")
+
+
+def test_update_resumes_from_the_failed_stage(db_manager, monkeypatch):
+    """A failed summary is retried after its backoff without scraping the page again."""
+    url = "https://www.bbc.co.uk/news/business-68225189"
+    with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'bbc_article.html'), encoding='utf-8') as f:
+        page = f.read()
+    summariser = FakeSummariser(failures=1)
+    monkeypatch.setattr(db_manager_module, 'get_processor',
+                        lambda name: summariser if name == 'openai_summarisation' else get_processor(name))
+    db_manager.add_content_id(url)
+    assert db_manager.fetch_unprocessed_content_ids() == [url]
+
+    with requests_mock.Mocker() as m:
+        m.get(url, text=page)
+        with pytest.raises(ConnectionError):
+            db_manager.update_content_id(url)
+        state = db_manager.fetch_pipeline_state(url)
+        assert state['scraped']['status'] == 'done'
+        assert state['summarised']['status'] == 'failed' and state['summarised']['attempts'] == 1
+        assert state['summarised']['last_error'] == "ConnectionError: OpenAI is unavailable"
+        assert state['summarised']['next_retry_at'] > time.time()
+        assert db_manager.fetch_unprocessed_content_ids() == []  # Backing off
+
+        make_due(db_manager)
+        assert db_manager.fetch_unprocessed_content_ids() == [url]
+        db_manager.update_content_id(url)
+        assert m.call_count == 1
+
+    assert {stage: row['status'] for stage, row in db_manager.fetch_pipeline_state(url).items()} == \
+        {'scraped': 'done', 'summarised': 'done', 'analysed': 'done'}
+    assert db_manager.fetch_filtered_data({}, ['summary'])[0]['summary'] == "A summary of the article."
+    assert db_manager.fetch_unprocessed_content_ids() == []
+
+
+def test_failing_stages_back_off_and_are_poisoned(db_manager, monkeypatch):
+    def fail(content_id):
+        raise RuntimeError("Page not found")
+
+    monkeypatch.setattr(db_manager, 'scrape_content_id', fail)
+    db_manager.add_content_id("https://example.com/gone")
+    delays = []
+    for _ in range(MAX_STAGE_ATTEMPTS):
+        assert db_manager.fetch_unprocessed_content_ids() == ["https://example.com/gone"]
+        before = time.time()
+        with pytest.raises(RuntimeError):
+            db_manager.update_content_id("https://example.com/gone")
+        state = db_manager.fetch_pipeline_state("https://example.com/gone")['scraped']
+        if state['next_retry_at'] is not None:
+            delays.append(round(state['next_retry_at'] - before, -1))
+        make_due(db_manager)
+
+    assert delays == [60, 120, 240, 480]
+    assert state['status'] == 'poisoned'
+    assert db_manager.fetch_unprocessed_content_ids() == []
+    assert db_manager.fetch_pipeline_summary()['poisoned'][0]['content_id'] == "https://example.com/gone"
+
+    assert db_manager.reset_pipeline_state(["https://example.com/gone"]) == 1
+    assert db_manager.fetch_unprocessed_content_ids() == ["https://example.com/gone"]
+
+
+def test_pipeline_state_is_built_for_existing_rows(db_manager):
+    db_manager.execute_query("INSERT INTO library (content_id, summary, duration) VALUES ('id-0', 'Summary', '3.5')")
+    db_manager.execute_query("INSERT INTO library (content_id) VALUES ('id-1')")
+    db_manager.store_transcript('id-0', "The transcript.")
+    db_manager.execute_query("DROP TABLE pipeline_state")
+    db_manager.create_library_table()
+
+    assert {stage: row['status'] for stage, row in db_manager.fetch_pipeline_state('id-0').items()} == \
+        {'scraped': 'done', 'summarised': 'done', 'analysed': 'done'}
+    assert db_manager.fetch_unprocessed_content_ids() == ['id-1']
+    db_manager.execute_query("DELETE FROM library WHERE content_id = 'id-1'")
+    assert db_manager.fetch_pipeline_state('id-1') == {}
+
+
+def test_content_ids_are_canonicalised(db_manager):
+    assert db_manager.add_content_id("https://youtu.be/Le122vas9aM?t=42") is True
+    assert db_manager.add_content_id("https://www.youtube.com/watch?v=Le122vas9aM&list=PL1") is False
+    counts = db_manager.add_content_ids([
+        "https://www.bbc.co.uk/news/business-68225189?at_medium=RSS",
+        "https://www.bbc.co.uk/news/business-68225189#comments",
+        "https://m.youtube.com/watch?v=Le122vas9aM",
+    ])
+    assert counts == {"added": 1, "skipped": 2}
+    assert sorted(row['content_id'] for row in db_manager.fetch_filtered_data({}, ['content_id'])) == [
+        "https://www.bbc.co.uk/news/business-68225189", "https://www.youtube.com/watch?v=Le122vas9aM"]
+
+
+def test_identical_transcripts_share_a_summary(db_manager, monkeypatch):
+    """A transcript already summarised under another content_id is not sent for summarisation again."""
+    summariser = FakeSummariser()
+    monkeypatch.setattr(db_manager_module, 'get_processor', lambda name: summariser)
+    for content_id, transcript in (("https://a.example/story", "Markets  rallied today."),
+                                   ("https://b.example/syndicated", "Markets rallied\ntoday.")):
+        db_manager.add_content_id(content_id)
+        db_manager.store_transcript(content_id, transcript)
+        db_manager.summarise_content_id(content_id)
+
+    assert summariser.calls == 1
+    assert [row['summary'] for row in db_manager.fetch_filtered_data({}, ['summary'])] == \
+        ["A summary of the article."] * 2
+
+
+def test_scraped_youtube_duration_is_stored(db_manager, monkeypatch):
+    """The length in the watch page is stored, and analysing the transcript doesn't replace it."""
+    url = "https://www.youtube.com/watch?v=Le122vas9aM"
+    with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'youtube_watch.html'), encoding='utf-8') as f:
+        page = f.read()
+    monkeypatch.setattr(youtube_scraper.YouTubeTranscriptApi, 'get_transcript',
+                        lambda video_id, languages: [{'text': 'Inflation is falling', 'start': 0.0, 'duration': 2.0}],
+                        raising=False)
+    db_manager.add_content_id(url)
+    with requests_mock.Mocker() as m:
+        m.get(url, text=page)
+        db_manager.scrape_content_id(url)
+    db_manager.analyse_content_id(url)
+
+    row = db_manager.fetch_filtered_data({}, ['platform', 'duration'])[0]
+    assert row['platform'] == 'YouTube'
+    assert float(row['duration']) == pytest.approx(754 / 60)
+    assert db_manager.fetch_aggregates({})['total']['total_duration'] == pytest.approx(754 / 60)
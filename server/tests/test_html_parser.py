@@ -0,0 +1,84 @@
+# tests/test_html_parser.py
+
+import os
+import pytest
+import requests_mock
+from scraper.sources.bbc_scraper import BBCScraper
+from scraper.sources.cnbc_scraper import CNBCScraper
+from scraper.sources.youtube_scraper import YouTubeScraper
+from scraper.utils import html_parser
+from scraper.utils.html_parser import ParsedPage, extract_metadata
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture(params=['selectolax', 'html.parser'])
+def metadata_backend(request, monkeypatch):
+    """Run a test with each head parser: selectolax when installed, and the html.parser fallback."""
+    if request.param == 'selectolax' and html_parser.SelectolaxParser is None:
+        pytest.skip("selectolax is not installed")
+    if request.param == 'html.parser':
+        monkeypatch.setattr(html_parser, 'SelectolaxParser', None)
+    return request.param
+
+
+def test_extract_metadata_reads_the_head(metadata_backend):
+    metadata = extract_metadata(fixture('bbc_article.html'))
+    assert metadata['meta']['og:title'] == "House price rises highest for a year in January, Halifax says"
+    assert metadata['meta']['og:site_name'] == "BBC News"
+    assert metadata['json_ld'][0]['dateModified'] == "2024-02-07T17:47:56.000Z"
+
+
+def test_body_metadata_falls_back_to_the_full_page(metadata_backend):
+    """YouTube keeps datePublished in the body, so only that lookup builds the soup."""
+    page = ParsedPage(fixture('youtube_watch.html'))
+    assert page.meta_content('og:title') == "Why inflation is still falling"
+    assert page._soup is None
+    assert page.meta_content('datePublished') == "2024-02-09T06:00:12-08:00"
+    assert page._soup is not None
+
+
+@pytest.mark.parametrize('scraper_class, url, name, expected', [
+    (BBCScraper, "https://www.bbc.co.uk/news/business-68225189", 'bbc_article.html',
+     ("House price rises highest for a year in January, Halifax says", "2024-02-07 17:47:56", "BBC News")),
+    (CNBCScraper, "https://www.cnbc.com/2024/02/12/stocks-rally.html", 'cnbc_article.html',
+     ("Stocks rally as inflation cools", "2024-02-12 14:03:22", "CNBC")),
+    (YouTubeScraper, "https://www.youtube.com/watch?v=Le122vas9aM", 'youtube_watch.html',
+     ("Why inflation is still falling", "2024-02-09 06:00:12", "CNBC International")),
+])
+def test_scrapers_on_saved_pages(scraper_class, url, name, expected):
+    with requests_mock.Mocker() as m:
+        m.get(url, text=fixture(name))
+        scraper = scraper_class(url)
+        page = scraper.get_page()
+        result = scraper.scrape()
+    assert (result.title, result.date_published, result.publisher) == expected
+    assert result.reference_image.startswith('https://')
+    assert scraper._page is None and page.html is None and page._soup is None  # The page is freed
+
+
+@pytest.mark.parametrize('scraper_class, url, name', [
+    (BBCScraper, "https://www.bbc.co.uk/news/business-68225189", 'bbc_article.html'),
+    (CNBCScraper, "https://www.cnbc.com/2024/02/12/stocks-rally.html", 'cnbc_article.html'),
+])
+def test_scrape_parses_the_page_once(scraper_class, url, name, monkeypatch):
+    """The head metadata and the full tree are each built at most once for all the fields."""
+    calls = {'extract_metadata': 0, 'make_soup': 0}
+    for function in calls:
+        original = getattr(html_parser, function)
+
+        def counted(*args, _original=original, _name=function, **kwargs):
+            calls[_name] += 1
+            return _original(*args, **kwargs)
+        monkeypatch.setattr(html_parser, function, counted)
+
+    with requests_mock.Mocker() as m:
+        m.get(url, text=fixture(name))
+        result = scraper_class(url).scrape()
+    assert result.title and result.transcript and result.date_published
+    assert calls == {'extract_metadata': 1, 'make_soup': 1}
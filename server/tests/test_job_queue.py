@@ -0,0 +1,115 @@
+# tests/test_job_queue.py
+
+import threading
+import time
+from collections import Counter
+import pytest
+from job_queue import JobQueue
+from scraper.utils.host_limits import HostLimits
+
+
+@pytest.fixture
+def job_queue():
+    """Fixture to create a JobQueue and stop its workers afterwards."""
+    queue = JobQueue(max_workers=2)
+    yield queue
+    queue.shutdown()
+
+
+def test_job_reports_progress_and_errors(job_queue):
+    """Items are processed in order; failures are recorded per item without stopping the job."""
+    processed = []
+
+    def process(item):
+        if item == 'bad':
+            raise ValueError("cannot scrape")
+        processed.append(item)
+
+    job, coalesced = job_queue.submit('update', ['a', 'bad', 'b'], process)
+    assert not coalesced
+    assert job.finished.wait(5)
+
+    report = job.to_dict()
+    assert processed == ['a', 'b']
+    assert report['status'] == 'completed'
+    assert (report['total'], report['done'], report['failed'], report['pending']) == (3, 2, 1, 0)
+    assert report['errors'] == [{'item': 'bad', 'error': 'cannot scrape'}]
+    assert report['eta_seconds'] is None and report['throughput'] > 0
+    assert job_queue.get(job.id) is job
+
+
+def test_concurrent_triggers_coalesce(job_queue):
+    """A second submit while the job runs adds only its new items to the same job."""
+    started, release = threading.Event(), threading.Event()
+    processed = []
+
+    def process(item):
+        started.set()
+        release.wait(5)
+        processed.append(item)
+
+    job, _ = job_queue.submit('update', ['a', 'b'], process)
+    started.wait(5)
+    again, coalesced = job_queue.submit('update', ['b', 'c'], process)
+    other, other_coalesced = job_queue.submit('other', ['x'], lambda item: None)
+    release.set()
+    assert job.finished.wait(5) and other.finished.wait(5)
+
+    assert again is job and coalesced
+    assert other is not job and not other_coalesced
+    assert processed == ['a', 'b', 'c']
+    assert job.to_dict()['done'] == 3
+    fresh, coalesced = job_queue.submit('update', ['a'], process)
+    assert fresh is not job and not coalesced
+
+
+def test_per_host_limits_cap_concurrency(job_queue):
+    """Workers run items of different hosts side by side, never more per host than its limit."""
+    limits = HostLimits({'slow.example': 2}, default_limit=1)
+    lock = threading.Lock()
+    running, peak = Counter(), Counter()
+
+    def process(url):
+        host = limits.host_of(url)
+        with lock:
+            running[host] += 1
+            peak[host] = max(peak[host], running[host])
+        time.sleep(0.02)
+        with lock:
+            running[host] -= 1
+
+    urls = [f'https://www.slow.example/{n}' for n in range(6)] + [f'https://fast.example/{n}' for n in range(3)]
+    job, _ = job_queue.submit('update', urls, process, concurrency=4, limits=limits)
+    assert job.finished.wait(5)
+
+    assert job.to_dict()['done'] == 9
+    assert peak == {'slow.example': 2, 'fast.example': 1}
+
+
+def test_concurrency_overlaps_slow_items(job_queue):
+    """Items of different hosts run side by side, up to the job's concurrency."""
+    urls = [f'https://host{n}.example/' for n in range(8)]
+    lock = threading.Lock()
+
+    def peak_in_flight(concurrency):
+        # Each item waits until `concurrency` items are in flight, so the job only
+        # finishes if the workers really overlap; no wall-clock timing involved.
+        barrier = threading.Barrier(concurrency, timeout=5)
+        running, peak = Counter(), Counter()
+
+        def process(url):
+            with lock:
+                running['all'] += 1
+                peak['all'] = max(peak['all'], running['all'])
+            barrier.wait()
+            with lock:
+                running['all'] -= 1
+
+        job, _ = job_queue.submit(f'update-{concurrency}', urls, process,
+                                  concurrency=concurrency, limits=HostLimits())
+        assert job.finished.wait(10)
+        assert job.to_dict()['done'] == len(urls)
+        return peak['all']
+
+    assert peak_in_flight(1) == 1
+    assert peak_in_flight(4) == 4
@@ -0,0 +1,121 @@
+# tests/test_openai_summarisation.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+from processor.openai_summarisation import OpenAISummariser
+from processor.response_cache import ResponseCache
+
+
+class Calls:
+    """
+    Counts the summary requests in flight across summarisers. Given the pool size
+    and the number of requests, each request also waits until as many as can run
+    at once are in flight, so the peak doesn't depend on how fast the machine is.
+    """
+
+    def __init__(self, width=None, total=None):
+        self.width, self.total = width, total
+        self.running = self.most_running = self.finished = 0
+        self.lock = threading.Condition()
+
+    def __enter__(self):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+            self.lock.notify_all()
+            if self.width:
+                self.lock.wait_for(
+                    lambda: self.running >= min(self.width, self.total - self.finished), timeout=5)
+
+    def __exit__(self, *exc_info):
+        with self.lock:
+            self.running -= 1
+            self.finished += 1
+            self.lock.notify_all()
+
+
+class SlowSummariser(OpenAISummariser):
+    """Answers each request after a delay instead of calling OpenAI."""
+
+    def __init__(self, executor, calls, delay=0.05):
+        super().__init__(executor=executor)
+        self.calls = calls
+        self.delay = delay
+
+    def load_api_key_from_db(self, db_path):
+        return 'sk-test'
+
+    def recursive_summarize(self, text, instructions, temperature=0.3, max_tokens=1000, use_cache=True):
+        with self.calls:
+            # Later chunks finish first, so the results can only be in order if they are put back in order
+            time.sleep(self.delay / (int(text.rsplit('-', 1)[1]) + 1))
+            if text.startswith('bad'):
+                raise ConnectionError("OpenAI is unavailable")
+            return f"<{text}>"
+
+
+def test_chunks_are_summarised_in_parallel_and_in_order():
+    calls = Calls(width=4, total=12)
+    chunks = [f"chunk-{i}" for i in range(12)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        summariser = SlowSummariser(executor, calls)
+        summaries = summariser.summarize_chunks(chunks, 0.5, 300)
+
+    assert summaries == [f"<chunk-{i}>" for i in range(12)]
+    assert calls.most_running == 4  # Four requests at once, bounded by the pool
+
+
+def test_summarisers_share_the_pool():
+    calls = Calls(width=3, total=20)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        summarisers = [SlowSummariser(executor, calls) for _ in range(4)]
+        chunks = [[f"item{n}-{i}" for i in range(5)] for n in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as items:
+            results = list(items.map(lambda pair: pair[0].summarize_chunks(pair[1], 0.5, 300),
+                                     zip(summarisers, chunks)))
+    assert results == [[f"<item{n}-{i}>" for i in range(5)] for n in range(4)]
+    assert calls.most_running == 3  # Four items at once, never more requests than the shared pool allows
+
+
+def test_a_failed_chunk_fails_the_summary():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        summariser = SlowSummariser(executor, Calls())
+        with pytest.raises(ConnectionError):
+            summariser.process_text("bad-0")
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions, answering with the prompt's length."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def create(self, model, messages, **parameters):
+        self.requests += 1
+        content = f"{len(messages[-1]['content'])} characters summarised."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_completions_are_served_from_the_response_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(OpenAISummariser, 'load_api_key_from_db', lambda self, db_path: 'sk-test')
+    cache = ResponseCache(str(tmp_path / 'response_cache.db'))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        summariser = OpenAISummariser(executor=executor, cache=cache)
+        completions = FakeCompletions()
+        summariser.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        text = "Markets rallied today. " * 10
+
+        summary = summariser.process_text(text)
+        assert completions.requests == 2  # One chunk, then the reduce call
+        assert summariser.process_text(text) == summary
+        assert completions.requests == 2
+        assert cache.stats()['hits'] == 2
+
+        summariser.process_text(text, use_cache=False)
+        assert completions.requests == 4
+        summariser.process_text(text, temperature=0.2)  # Different sampling, different requests
+        assert completions.requests == 6
+    cache.close()
@@ -0,0 +1,74 @@
+# tests/test_page_cache.py
+
+import pytest
+import requests_mock
+from scraper.utils.page_cache import PageCache
+from scraper.utils.scraping_utils import cached_json, fetch_page
+
+URL = "https://www.youtube.com/watch?v=Le122vas9aM"
+
+
+@pytest.fixture
+def page_cache(tmp_path):
+    """Fixture to create a PageCache in a temporary directory."""
+    cache = PageCache(str(tmp_path / 'page_cache.db'))
+    yield cache
+    cache.close()
+
+
+def test_fresh_pages_are_served_from_the_cache(page_cache):
+    with requests_mock.Mocker() as m:
+        m.get(URL, text='<html>video</html>', headers={'ETag': '"v1"'})
+        assert fetch_page(URL, page_cache) == '<html>video</html>'
+        assert fetch_page(URL, page_cache) == '<html>video</html>'
+    assert m.call_count == 1
+    assert page_cache.stats()['hits'] == 1
+
+
+def test_stale_pages_are_revalidated(page_cache):
+    """Past the TTL the cached ETag is sent back and a 304 reuses the cached body."""
+    page_cache.ttl = 0
+    with requests_mock.Mocker() as m:
+        m.get(URL, [{'text': '<html>video</html>', 'headers': {'ETag': '"v1"'}}, {'status_code': 304}])
+        fetch_page(URL, page_cache)
+        assert fetch_page(URL, page_cache) == '<html>video</html>'
+    assert m.request_history[1].headers['If-None-Match'] == '"v1"'
+    assert page_cache.stats()['revalidated'] == 1
+
+
+def test_cache_only_mode_never_downloads(page_cache):
+    page_cache.put(URL, '<html>old</html>', etag='"v1"')
+    page_cache.ttl = 0
+    page_cache.cache_only = True
+    with requests_mock.Mocker() as m:
+        assert fetch_page(URL, page_cache) == '<html>old</html>'
+        assert fetch_page("https://www.bbc.co.uk/news/uncached", page_cache) is None
+        with pytest.raises(LookupError):
+            cached_json('youtube-transcript:missing:en', lambda: [], page_cache)
+    assert m.call_count == 0
+
+
+def test_cached_json(page_cache):
+    calls = []
+
+    def produce():
+        calls.append(1)
+        return [{'text': 'hello', 'start': 0.0, 'duration': 1.5}]
+
+    assert cached_json('youtube-transcript:abc:en', produce, page_cache) == produce()
+    assert cached_json('youtube-transcript:abc:en', produce, page_cache) == produce()
+    assert len(calls) == 3  # Two direct calls above and one through the cache
+
+
+def test_identical_bodies_are_stored_once_and_evicted_by_age(page_cache):
+    page_cache.put('a', 'same body')
+    page_cache.put('b', 'same body')
+    assert page_cache.stats()['bodies'] == 1
+
+    page_cache.max_bytes = page_cache.stats()['size_bytes'] + 50
+    page_cache.put('c', 'x' * 1000 + 'incompressible 8f2a91c0d7')
+    page_cache.get('c')
+    page_cache.put('d', 'another 7c1e0b9f, ' * 3)
+    assert page_cache.get('a') is None and page_cache.get('b') is None
+    assert page_cache.stats()['size_bytes'] <= page_cache.max_bytes
+    assert page_cache.get('d') is not None
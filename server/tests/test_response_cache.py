@@ -0,0 +1,52 @@
+# tests/test_response_cache.py
+
+import os
+import pytest
+from processor import response_cache
+from processor.response_cache import ResponseCache, request_key
+
+MESSAGES = [{"role": "system", "content": "You are a highly knowledgeable assistant."},
+            {"role": "user", "content": "Summarize the following text: Markets rallied."}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'response_cache.db'))
+    yield cache
+    cache.close()
+
+
+def test_request_key():
+    key = request_key('gpt-3.5-turbo', MESSAGES, temperature=0.5, max_tokens=300)
+    assert key == request_key('gpt-3.5-turbo', MESSAGES, max_tokens=300, temperature=0.5)
+    assert key != request_key('gpt-3.5-turbo', MESSAGES, temperature=0.3, max_tokens=300)
+    assert key != request_key('gpt-4', MESSAGES, temperature=0.5, max_tokens=300)
+    assert key != request_key('gpt-3.5-turbo', MESSAGES[1:], temperature=0.5, max_tokens=300)
+
+
+def test_hits_and_misses(cache):
+    key = request_key('gpt-3.5-turbo', MESSAGES, temperature=0.5)
+    assert cache.get(key) is None
+    cache.put(key, 'gpt-3.5-turbo', "Markets went up.")
+    assert cache.get(key) == "Markets went up."
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 1, 0.5)
+
+
+def test_completions_expire(cache, monkeypatch):
+    cache.put('key', 'gpt-3.5-turbo', "Markets went up.")
+    now = response_cache.time.time()
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now + cache.ttl)
+    assert cache.get('key') is None
+    assert cache.stats()['expired'] == 1 and cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_are_evicted(cache):
+    text = os.urandom(2000).hex()  # Doesn't compress
+    size = len(response_cache.compress_text(text))
+    cache.max_bytes = 3 * size
+    for key in ('a', 'b', 'c'):
+        cache.put(key, 'gpt-3.5-turbo', text)
+    cache.get('a')
+    cache.put('d', 'gpt-3.5-turbo', text)
+    assert [key for key in 'abcd' if cache.get(key)] == ['a', 'c', 'd']
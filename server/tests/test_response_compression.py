@@ -0,0 +1,54 @@
+# tests/test_response_compression.py
+
+import gzip
+import json
+import pytest
+from flask import Flask, Response, jsonify
+from response_compression import ENCODINGS, MIN_COMPRESS_SIZE, init_compression
+
+ROWS = [{"content_id": f"id-{i}", "summary": "The central bank held rates again."} for i in range(200)]
+
+
+@pytest.fixture
+def client():
+    """Fixture to create a Flask app with compression and a few JSON routes."""
+    app = Flask(__name__)
+    init_compression(app)
+    app.add_url_rule('/large', 'large', lambda: jsonify(ROWS))
+    app.add_url_rule('/small', 'small', lambda: jsonify({"ok": True}))
+    app.add_url_rule('/stream', 'stream', lambda: Response(
+        (json.dumps(row) + '\n' for row in ROWS), mimetype='application/x-ndjson'))
+    return app.test_client()
+
+
+def test_large_json_is_gzipped(client):
+    """Bodies above the threshold are compressed when the client accepts gzip."""
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == ROWS
+    assert int(response.headers['Content-Length']) == len(response.data) < MIN_COMPRESS_SIZE * 4
+
+
+def test_identity_and_small_bodies(client):
+    """No compression without Accept-Encoding or below the size threshold."""
+    assert 'Content-Encoding' not in client.get('/large').headers
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers and response.json == {"ok": True}
+
+
+def test_stream_is_compressed_incrementally(client):
+    """NDJSON streams are compressed chunk by chunk and decode to the same lines."""
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    lines = gzip.decompress(response.data).decode().splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+@pytest.mark.skipif('br' not in ENCODINGS, reason="brotli is not installed")
+def test_brotli_is_preferred(client):
+    """brotli is chosen over gzip when the client accepts both equally."""
+    import brotli
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data)) == ROWS
@@ -0,0 +1,36 @@
+# tests/test_result_cache.py
+
+from db.result_cache import ResultCache, make_cache_key, normalise_filters
+
+
+def test_normalised_filters_share_a_key():
+    """Filter sets that select the same rows map to the same key."""
+    first = {'publishers': ['CNBC', 'BBC News'], 'countries': [], 'dateAddedRange': None}
+    second = {'publishers': ['BBC News', 'CNBC', 'CNBC']}
+    assert make_cache_key('fetch', normalise_filters(first), None) == make_cache_key('fetch', normalise_filters(second), None)
+    assert make_cache_key('fetch', normalise_filters(first), ['title']) != make_cache_key('fetch', normalise_filters(first), None)
+
+
+def test_generation_invalidates_entries():
+    """An entry is only served at the generation it was stored at."""
+    cache = ResultCache()
+    cache.put('key', 1, b'old')
+    assert cache.get('key', 1) == b'old'
+    assert cache.get('key', 2) is None
+    assert cache.get('key', 1) is None  # Dropped once seen to be stale
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+    assert cache.stats()['entries'] == 0 and cache.size == 0
+
+
+def test_lru_eviction_by_size():
+    """The least recently used entries are evicted to stay within max_bytes."""
+    cache = ResultCache(max_bytes=10)
+    cache.put('a', 0, b'1234')
+    cache.put('b', 0, b'1234')
+    cache.get('a', 0)
+    cache.put('c', 0, b'1234')
+    assert cache.get('b', 0) is None
+    assert cache.get('a', 0) == b'1234' and cache.get('c', 0) == b'1234'
+    cache.put('huge', 0, b'x' * 11)
+    assert cache.get('huge', 0) is None
+    assert cache.stats()['evictions'] == 1 and cache.size == 8
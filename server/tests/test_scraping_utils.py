@@ -0,0 +1,63 @@
+# tests/test_scraping_utils.py
+
+import pytest
+import requests
+import requests_mock
+from scraper.utils import scraping_utils
+from scraper.utils.scraping_utils import backoff_delay, get_session, safe_request
+
+URL = "https://www.bbc.co.uk/news/business-68225189"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Fixture recording the backoff delays instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(scraping_utils.time, 'sleep', delays.append)
+    return delays
+
+
+def test_retries_retryable_statuses_with_retry_after(sleeps):
+    """A 503 is retried after the server's Retry-After; the eventual page is returned."""
+    with requests_mock.Mocker() as m:
+        m.get(URL, [{'status_code': 503, 'headers': {'Retry-After': '2'}}, {'text': 'page'}])
+        response = safe_request(URL)
+    assert response.text == 'page'
+    assert m.call_count == 2
+    assert sleeps == [2.0]
+
+
+def test_does_not_retry_client_errors(sleeps):
+    """A 404 will not change on a retry, so it fails after one attempt."""
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=404)
+        assert safe_request(URL) is None
+    assert m.call_count == 1
+    assert sleeps == []
+
+
+def test_backs_off_on_connection_errors(sleeps):
+    """Connection errors are retried with growing, jittered delays up to max_retries attempts."""
+    with requests_mock.Mocker() as m:
+        m.get(URL, exc=requests.exceptions.ConnectionError)
+        assert safe_request(URL, max_retries=3) is None
+    assert m.call_count == 3
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+
+
+def test_gives_up_rather_than_wait_past_the_deadline(sleeps):
+    """A Retry-After beyond the deadline ends the request instead of sleeping."""
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=429, headers={'Retry-After': '120'})
+        assert safe_request(URL, deadline=10) is None
+    assert m.call_count == 1
+    assert sleeps == []
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, base=1, cap=4) <= 4 for attempt in range(10))
+
+
+def test_session_is_shared():
+    assert get_session() is get_session()
@@ -0,0 +1,42 @@
+# tests/test_token_chunker.py
+
+import pytest
+from processor import token_chunker
+from processor.token_chunker import chunk_by_tokens, estimate_tokens, get_token_counter
+
+ARTICLE = "\n\n".join(
+    " ".join(f"Sentence {p}.{s} says something about the markets today." for s in range(8))
+    for p in range(6))
+
+
+@pytest.mark.parametrize('max_tokens', [20, 60, 200, 10000])
+def test_chunks_fit_the_budget_and_keep_every_word(max_tokens):
+    chunks = chunk_by_tokens(ARTICLE, max_tokens)
+    assert all(estimate_tokens(chunk) <= max_tokens for chunk in chunks)
+    assert ' '.join(chunks).split() == ARTICLE.split()
+
+
+def test_chunks_end_on_sentence_boundaries():
+    chunks = chunk_by_tokens(ARTICLE, 60)
+    assert len(chunks) > 1
+    assert all(chunk.endswith('today.') for chunk in chunks)
+    # Each chunk is as full as the next sentence allows
+    assert all(estimate_tokens(chunk) > 60 - estimate_tokens("Sentence 0.0 says something about the markets today.")
+               for chunk in chunks[:-1])
+    assert chunk_by_tokens(ARTICLE, 10000) == [ARTICLE]  # Paragraph breaks are kept
+
+
+def test_unpunctuated_transcripts_split_between_words():
+    transcript = " ".join(f"word{i}" for i in range(1000))
+    chunks = chunk_by_tokens(transcript, 100)
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert ' '.join(chunks) == transcript
+
+
+def test_token_counts_are_estimated_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(token_chunker, 'tiktoken', None)
+    get_token_counter.cache_clear()
+    try:
+        assert get_token_counter('gpt-3.5-turbo') is estimate_tokens
+    finally:
+        get_token_counter.cache_clear()
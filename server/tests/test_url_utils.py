@@ -0,0 +1,26 @@
+# tests/test_url_utils.py
+
+import pytest
+from scraper.utils.url_utils import canonicalize_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ("https://youtu.be/Le122vas9aM?si=abc123&t=42", "https://www.youtube.com/watch?v=Le122vas9aM"),
+    ("https://www.youtube.com/watch?v=Le122vas9aM&t=1m30s&list=PL123", "https://www.youtube.com/watch?v=Le122vas9aM"),
+    ("https://m.youtube.com/watch?feature=share&v=Le122vas9aM", "https://www.youtube.com/watch?v=Le122vas9aM"),
+    ("https://www.youtube.com/shorts/Le122vas9aM", "https://www.youtube.com/watch?v=Le122vas9aM"),
+    ("HTTPS://WWW.BBC.CO.UK:443/news/business-68225189?at_medium=RSS&at_campaign=KARANGA#comments",
+     "https://www.bbc.co.uk/news/business-68225189"),
+    ("https://www.cnbc.com/2024/02/12/stocks-rally.html?utm_source=twitter&fbclid=IwAR0",
+     "https://www.cnbc.com/2024/02/12/stocks-rally.html"),
+    ("https://example.com:8080/story?page=2&id=7&utm_medium=email", "https://example.com:8080/story?id=7&page=2"),
+    ("https://example.com", "https://example.com/"),
+    ("  not a url  ", "not a url"),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_canonical_urls_are_stable():
+    for url in ("https://youtu.be/Le122vas9aM", "https://example.com/a?b=1&a=2&utm_source=x"):
+        assert canonicalize_url(canonicalize_url(url)) == canonicalize_url(url)